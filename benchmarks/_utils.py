@@ -0,0 +1,197 @@
+"""Utilities shared by benchmarks."""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import platform
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeVar
+
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+if TYPE_CHECKING:
+    import argparse
+    from collections.abc import Callable, Sequence
+
+_T = TypeVar("_T")
+
+FORMAT_VERSION = 1
+"""Version of the format of the results file."""
+
+
+class Result(NamedTuple):
+    """Result of a benchmark case."""
+
+    name: str
+    """Unique name of the case."""
+
+    bytes: int
+    """Number of bytes hashed each iteration."""
+
+    items: int
+    """Number of files or file names hashed each iteration."""
+
+    peak_rss: int | None
+    """Peak resident set size of the process running the case in bytes. ``None`` if unsupported."""
+
+    seconds: float
+    """Fastest time of an iteration."""
+
+    @property
+    def items_per_second(self) -> float:
+        """Files or file names hashed per second."""
+        return self.items / self.seconds
+
+    @property
+    def mb_per_second(self) -> float:
+        """Throughput in megabytes (10**6 bytes) per second."""
+        return self.bytes / self.seconds / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a dictionary that can be serialized as JSON."""
+        return {
+            **self._asdict(),
+            "items_per_second": self.items_per_second,
+            "mb_per_second": self.mb_per_second,
+        }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the arguments shared by benchmarks to a parser."""
+    parser.add_argument("--baseline", type=Path, help="results file of a previous run to compare against")
+    parser.add_argument("--output", type=Path, help="write results to this JSON file")
+    parser.add_argument("--repeat", default=3, type=int, help="iterations of each case (default: %(default)s)")
+    parser.add_argument(
+        "--threshold",
+        default=0.1,
+        type=float,
+        help="fraction throughput can decrease or peak RSS can increase before failing (default: %(default)s)",
+    )
+
+
+def compare(results: Sequence[Result], baseline: dict[str, Any], *, threshold: float, title: str) -> list[str]:
+    """Compare results against a baseline and print a table.
+
+    Args:
+        results: Results of the current run.
+        baseline: Results file of a previous run.
+        threshold: Fraction the throughput can decrease or the peak RSS can increase
+            before it is considered a regression.
+        title: Title of the table.
+
+    Returns:
+        Names of the cases that regressed.
+
+    """
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    table = Table(title=title)
+    for column in (
+        "case",
+        "MB/s",
+        "items/s",
+        "peak RSS (MiB)",
+        "baseline MB/s",
+        "MB/s change",
+        "baseline RSS (MiB)",
+        "RSS change",
+    ):
+        table.add_column(column, justify="left" if column == "case" else "right", overflow="fold")
+    regressions: list[str] = []
+    for result in results:
+        row = [
+            escape(result.name),
+            f"{result.mb_per_second:.1f}",
+            f"{result.items_per_second:.0f}",
+            _format_rss(result.peak_rss),
+        ]
+        if result.name not in previous:
+            table.add_row(*row, "-", "-", "-", "-")
+            continue
+        change = result.mb_per_second / previous[result.name]["mb_per_second"] - 1
+        previous_rss: int | None = previous[result.name].get("peak_rss")
+        rss_change = None if not previous_rss or result.peak_rss is None else result.peak_rss / previous_rss - 1
+        style = ""
+        if change < -threshold or (rss_change is not None and rss_change > threshold):
+            regressions.append(result.name)
+            style = "red"
+        table.add_row(
+            *row,
+            f"{previous[result.name]['mb_per_second']:.1f}",
+            f"{change:+.1%}",
+            _format_rss(previous_rss),
+            "-" if rss_change is None else f"{rss_change:+.1%}",
+            style=style,
+        )
+    Console().print(table)
+    return regressions
+
+
+def _format_rss(peak_rss: int | None) -> str:
+    """Format a peak RSS in MiB."""
+    return "-" if peak_rss is None else f"{peak_rss / 1024**2:.1f}"
+
+
+def get_peak_rss() -> int | None:
+    """Get the peak resident set size of the current process in bytes."""
+    try:
+        import resource  # noqa: PLC0415
+    except ImportError:  # not available on Windows
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024  # kilobytes everywhere else
+
+
+def report(results: Sequence[Result], args: argparse.Namespace, *, title: str) -> int:
+    """Print results, compare them against the baseline, and write them to the output file.
+
+    Args:
+        results: Results of the current run.
+        args: Parsed arguments added by :func:`add_arguments`.
+        title: Title of the table.
+
+    Returns:
+        Exit code. ``1`` if any case regressed compared to the baseline.
+
+    """
+    baseline: dict[str, Any] = {}
+    if args.baseline and args.baseline.is_file():
+        baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results, baseline, threshold=args.threshold, title=title)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps(
+                {
+                    "platform": platform.platform(),
+                    "python": platform.python_version(),
+                    "results": [result.to_dict() for result in results],
+                    "version": FORMAT_VERSION,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+    if regressions:
+        Console(stderr=True).print(f"[red]{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def run_isolated(func: Callable[[_T, int], Result], cases: Sequence[_T], *, repeat: int) -> list[Result]:
+    """Run each benchmark case in a new process so its peak RSS is not affected by other cases.
+
+    Args:
+        func: Function that runs a case. It must be importable from a module.
+        cases: Cases to run.
+        repeat: Number of iterations of each case.
+
+    """
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=1
+    ) as executor:
+        return [executor.submit(func, case, repeat).result() for case in cases]
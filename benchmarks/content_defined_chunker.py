@@ -0,0 +1,106 @@
+"""Benchmark :class:`~f_lib.utils.ContentDefinedChunker`.
+
+Measures the throughput and peak resident set size (RSS) of chunking a file
+with several average chunk sizes and algorithms. Each case runs in a new
+process. The file is written to a temporary directory.
+
+.. rubric:: Example
+.. code-block:: console
+
+    $ python -m benchmarks.content_defined_chunker --output .benchmarks/content_defined_chunker.json
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+from f_lib.utils import ContentDefinedChunker, FileHash
+
+from ._utils import Result, add_arguments, get_peak_rss, report, run_isolated
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+ALGORITHMS = ("sha256", "blake2b")
+"""Algorithms used to calculate the digest of each chunk."""
+
+AVG_SIZES = (16 * 1024, 64 * 1024, 1024**2)
+"""Average chunk sizes benchmarked."""
+
+FILE_SIZE = 32 * 1024**2
+"""Size of the file that is chunked."""
+
+
+class Case(NamedTuple):
+    """Benchmark case."""
+
+    algorithm: str
+    """Name of the hash algorithm."""
+
+    avg_size: int
+    """Average chunk size."""
+
+    path: str
+    """Path of the file to chunk."""
+
+    @property
+    def name(self) -> str:
+        """Unique name of the case used to compare results."""
+        return f"chunk_file[{self.algorithm},{self.avg_size // 1024}KiB]"
+
+
+def run_case(case: Case, repeat: int) -> Result:
+    """Run a benchmark case. This is run in a new process.
+
+    Args:
+        case: Case to run.
+        repeat: Number of iterations. The fastest is reported.
+
+    """
+    chunker = ContentDefinedChunker(FileHash(hashlib.new(case.algorithm)), avg_size=case.avg_size)
+    seconds = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in chunker.chunk_file(case.path))
+        seconds = min(seconds, time.perf_counter() - start)
+    return Result(case.name, Path(case.path).stat().st_size, count, get_peak_rss(), seconds)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the benchmark.
+
+    Returns:
+        Exit code. ``1`` if any case regressed compared to the baseline.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.content_defined_chunker", description="Benchmark ContentDefinedChunker."
+    )
+    parser.add_argument("--algorithm", action="append", dest="algorithms", help="hash algorithm (repeatable)")
+    parser.add_argument("--size", default=FILE_SIZE, type=int, help="size of the file in bytes (default: %(default)s)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="f-lib-benchmark-") as tmp_dir:
+        path = Path(tmp_dir) / "data.bin"
+        path.write_bytes(os.urandom(args.size))
+        cases = [
+            Case(algorithm, avg_size, str(path))
+            for algorithm in args.algorithms or ALGORITHMS
+            for avg_size in AVG_SIZES
+        ]
+        results = run_isolated(run_case, cases, repeat=args.repeat)
+    return report(results, args, title="ContentDefinedChunker benchmark (items are chunks)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
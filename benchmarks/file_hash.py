@@ -0,0 +1,159 @@
+"""Benchmark :class:`~f_lib.utils.FileHash`.
+
+Measures the throughput and peak resident set size (RSS) of ``add_file``,
+``add_files``, and ``add_file_name`` across file sizes, file counts, and
+algorithms. Each case runs in a new process so its peak RSS is not affected by
+other cases. All files are written to a temporary directory.
+
+.. rubric:: Example
+.. code-block:: console
+
+    $ python -m benchmarks.file_hash --output .benchmarks/file_hash.json
+    $ python -m benchmarks.file_hash --baseline .benchmarks/file_hash.json
+
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Literal, NamedTuple
+
+from f_lib.utils import FileHash
+
+from ._utils import Result, add_arguments, get_peak_rss, report, run_isolated
+
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+ALGORITHMS = ("md5", "sha1", "sha256", "blake2b")
+"""Algorithms benchmarked by default."""
+
+FILE_COUNTS = (100, 1000)
+"""Number of files hashed by ``add_files``."""
+
+FILE_SIZES = {"tiny": 64, "1MiB": 1024**2, "1GiB": 1024**3}
+"""Size of the files hashed by ``add_file``. The largest file is sparse."""
+
+NAME_COUNTS = (1000, 100_000)
+"""Number of file names hashed by ``add_file_name``."""
+
+QUICK_MAX_SIZE = 1024**2
+"""Largest file size benchmarked when running with ``--quick``."""
+
+TINY_FILE_SIZE = FILE_SIZES["tiny"]
+"""Size of the files hashed by ``add_files``."""
+
+Method = Literal["add_file", "add_file_name", "add_files"]
+
+
+class Case(NamedTuple):
+    """Benchmark case."""
+
+    method: Method
+    """Method of :class:`~f_lib.utils.FileHash` being benchmarked."""
+
+    algorithm: str
+    """Name of the hash algorithm."""
+
+    label: str
+    """Describes the size or number of files."""
+
+    paths: list[str]
+    """Paths passed to the method."""
+
+    @property
+    def name(self) -> str:
+        """Unique name of the case used to compare results."""
+        return f"{self.method}[{self.algorithm},{self.label}]"
+
+
+def build_cases(tmp_dir: Path, *, algorithms: Sequence[str], quick: bool = False) -> list[Case]:
+    """Write the files used by the benchmark and build the cases.
+
+    Args:
+        tmp_dir: Directory where files are written.
+        algorithms: Names of the hash algorithms to benchmark.
+        quick: Skip large files and large numbers of files.
+
+    """
+    cases: list[Case] = []
+    for label, size in FILE_SIZES.items():
+        if quick and size > QUICK_MAX_SIZE:
+            continue
+        path = tmp_dir / f"{label}.bin"
+        with path.open("wb") as file_obj:
+            if size > QUICK_MAX_SIZE:
+                file_obj.truncate(size)  # sparse so it doesn't use disk space
+            else:
+                file_obj.write(os.urandom(size))
+        cases.extend(Case("add_file", algorithm, label, [str(path)]) for algorithm in algorithms)
+    for count in FILE_COUNTS[:1] if quick else FILE_COUNTS:
+        files_dir = tmp_dir / f"files-{count}"
+        files_dir.mkdir()
+        paths = [files_dir / f"{index:06}.txt" for index in range(count)]
+        for path in paths:
+            path.write_bytes(os.urandom(TINY_FILE_SIZE))
+        cases.extend(
+            Case("add_files", algorithm, str(count), [str(path) for path in paths]) for algorithm in algorithms
+        )
+    for count in NAME_COUNTS[:1] if quick else NAME_COUNTS:
+        paths = [str(tmp_dir / "names" / f"{index // 100:04}" / f"{index:06}.txt") for index in range(count)]
+        cases.extend(Case("add_file_name", algorithm, str(count), paths) for algorithm in algorithms)
+    return cases
+
+
+def run_case(case: Case, repeat: int) -> Result:
+    """Run a benchmark case. This is run in a new process.
+
+    Args:
+        case: Case to run.
+        repeat: Number of iterations. The fastest is reported.
+
+    """
+    paths = [Path(path) for path in case.paths]
+    if case.method == "add_file_name":
+        size = sum(len(path.as_posix().encode()) + 1 for path in paths)
+    else:
+        size = sum(path.stat().st_size for path in paths)
+    seconds = float("inf")
+    for _ in range(repeat):
+        file_hash = FileHash(hashlib.new(case.algorithm))
+        start = time.perf_counter()
+        if case.method == "add_file":
+            file_hash.add_file(paths[0])
+        elif case.method == "add_files":
+            file_hash.add_files(paths)
+        else:
+            for path in paths:
+                file_hash.add_file_name(path)
+        seconds = min(seconds, time.perf_counter() - start)
+    return Result(case.name, size, len(paths), get_peak_rss(), seconds)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Run the benchmark.
+
+    Returns:
+        Exit code. ``1`` if any case regressed compared to the baseline.
+
+    """
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.file_hash", description="Benchmark FileHash.")
+    parser.add_argument("--algorithm", action="append", dest="algorithms", help="hash algorithm (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="skip large files and large numbers of files")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="f-lib-benchmark-") as tmp_dir:
+        cases = build_cases(Path(tmp_dir), algorithms=args.algorithms or ALGORITHMS, quick=args.quick)
+        results = run_isolated(run_case, cases, repeat=args.repeat)
+    return report(results, args, title="FileHash benchmark")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
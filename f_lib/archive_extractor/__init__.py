@@ -1,8 +1,24 @@
 """Archive extractors."""
 
 from . import exceptions
-from ._archive_extractor import ArchiveExtractor
+from ._archive_extractor import ArchiveExtractor, MemberFilter
+from ._extraction_cache import ExtractionCache
+from ._registry import EXTRACTORS, get_extractor, register_extractor
 from ._tar_extractor import TarExtractor
+from ._tar_index import TarIndex, TarIndexCheckpoint, TarIndexMember
 from ._zip_extractor import ZipExtractor
 
-__all__ = ["ArchiveExtractor", "TarExtractor", "ZipExtractor", "exceptions"]
+__all__ = [
+    "EXTRACTORS",
+    "ArchiveExtractor",
+    "ExtractionCache",
+    "MemberFilter",
+    "TarExtractor",
+    "TarIndex",
+    "TarIndexCheckpoint",
+    "TarIndexMember",
+    "ZipExtractor",
+    "exceptions",
+    "get_extractor",
+    "register_extractor",
+]
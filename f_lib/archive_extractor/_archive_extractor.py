@@ -2,16 +2,96 @@
 
 from __future__ import annotations
 
+import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import ClassVar, Literal
+from typing import TYPE_CHECKING, ClassVar, Literal
 
+from ..utils._walk import PathPatternList
 from .exceptions import ArchiveTypeError
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+class MemberFilter:
+    """Select members of an archive to extract by name or gitignore-style pattern.
+
+    A member is selected if no ``members`` or ``include`` are provided, if it is one
+    of ``members`` (or is in a directory that is), or if it matches ``include``.
+    Members that match ``exclude`` are never selected. Names are compared without
+    a leading ``./`` or ``/`` and trailing ``/``.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        members: Iterable[str] | None = None,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            members: Names of members to include.
+
+        """
+        self.exclude = PathPatternList(exclude or [])
+        self.include = PathPatternList(include or [])
+        self.members = {self.normalize(name) for name in members or []}
+        self._found: set[str] = set()
+
+    @property
+    def done(self) -> bool:
+        """Whether no more members can be selected because every one of ``members`` was found as a file.
+
+        Always ``False`` if ``include`` was provided since any member could match it.
+
+        """
+        return bool(self.members) and not self.include and self._found >= self.members
+
+    def __bool__(self) -> bool:
+        """Whether any members would not be selected."""
+        return bool(self.exclude or self.include or self.members)
+
+    def __call__(self, name: str, *, is_dir: bool = False) -> bool:
+        """Determine if a member is selected.
+
+        Args:
+            name: Name of the member in the archive.
+            is_dir: Whether the member is a directory.
+
+        """
+        path = self.normalize(name)
+        if self.exclude.matches_or_parent_matches(path, is_dir=is_dir):
+            return False
+        if not self.members and not self.include:
+            return True
+        if path in self.members:
+            if not is_dir:
+                self._found.add(path)
+            return True
+        if any(path.startswith(f"{member}/") for member in self.members):
+            return True
+        return bool(self.include) and self.include.matches_or_parent_matches(path, is_dir=is_dir)
+
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Normalize the name of a member so it can be compared."""
+        while name.startswith("./"):
+            name = name[2:]
+        return name.strip("/")
+
 
 class ArchiveExtractor(ABC):
     """Abstract base class for archive extractors."""
 
+    MAGIC: ClassVar[tuple[tuple[int, bytes], ...]] = ()
+    """Offset and value of magic bytes that identify archives supported by the extractor."""
+
     SUFFIX: ClassVar[tuple[str, ...]] = ()
     """File extension/suffix supported by the extractor."""
 
@@ -36,17 +116,64 @@ class ArchiveExtractor(ABC):
             raise ArchiveTypeError(self.archive, self.SUFFIX)
 
     @abstractmethod
-    def extract(self, destination: Path) -> Path:
+    def extract(
+        self,
+        destination: Path,
+        *,
+        delete: bool = False,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        incremental: bool = False,
+        members: Iterable[str] | None = None,
+    ) -> Path:
         """Extract the archive file.
 
+        Members are selected using :class:`MemberFilter` before their data is read.
+
         Args:
             destination: Where the archive file will be extracted to.
+            delete: Delete files (and directories left empty) in ``destination`` that
+                are not members of the archive. Files that would not be selected if
+                they were members (e.g. they match ``exclude``) are kept.
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            incremental: Only write members that differ from the files already in
+                ``destination`` so extracting an archive that changed slightly into
+                the same directory again only costs as much as the change.
+            members: Names of members (or directories of members) to include.
 
         Returns:
             Path to the extraction.
 
         """
 
+    @staticmethod
+    def _delete_stale(destination: Path, names: Iterable[str], member_filter: MemberFilter) -> None:
+        """Delete files and empty directories that are not members of the archive.
+
+        Args:
+            destination: Where the archive file was extracted to.
+            names: Relative path of each member of the archive that was selected.
+            member_filter: Used to select members. Paths it would not select are kept.
+
+        """
+        keep = set(names)
+        keep.update([parent for name in keep for parent in _parents(name)])
+        for root, dirs, files in os.walk(destination, topdown=False):
+            root_path = Path(root)
+            prefix = root_path.relative_to(destination).as_posix() + "/"
+            prefix = prefix.removeprefix("./")
+            for name in [*files, *(name for name in dirs if (root_path / name).is_symlink())]:
+                if prefix + name not in keep and member_filter(prefix + name):
+                    (root_path / name).unlink()
+            if (
+                prefix
+                and prefix[:-1] not in keep
+                and member_filter(prefix[:-1], is_dir=True)
+                and not any(root_path.iterdir())
+            ):
+                root_path.rmdir()
+
     @classmethod
     def can_extract(cls, archive: Path | str) -> bool:
         """Determine if the extractor can attempt to extract the file.
@@ -60,8 +187,26 @@ class ArchiveExtractor(ABC):
             return False
         return any(True for suffix in cls.SUFFIX if "".join(path.suffixes).endswith(suffix))
 
+    @classmethod
+    def sniff(cls, header: bytes) -> bool:
+        """Determine if the extractor supports an archive from its magic bytes.
+
+        Args:
+            header: Bytes read from the start of an archive file.
+
+        """
+        return any(header[offset : offset + len(magic)] == magic for offset, magic in cls.MAGIC)
+
     def __bool__(self) -> Literal[True]:
         return True
 
     def __str__(self) -> str:
         return str(self.archive)
+
+
+def _parents(path: str) -> Iterator[str]:
+    """Get each directory containing a relative path, from the deepest."""
+    parent, sep, _ = path.rpartition("/")
+    while sep:
+        yield parent
+        parent, sep, _ = parent.rpartition("/")
@@ -0,0 +1,449 @@
+"""Cache of extracted archives."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, Literal, NoReturn
+
+from .._os_info import OsInfo
+from ..utils._file_hash import FileHash
+
+FICLONE = 0x40049409  # from <linux/fs.h>; fcntl.FICLONE was added in Python 3.12
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Generator, Iterable
+
+    from _typeshed import StrPath
+
+    from ._archive_extractor import ArchiveExtractor
+
+
+class ExtractionCache:
+    """Cache of extracted archives keyed by the digest of the archive file.
+
+    Each archive is extracted once into the cache. Extracting it again, to any
+    destination, materializes the cached tree instead of decompressing the archive.
+
+    An archive is extracted into a temporary directory in the cache which is then
+    renamed into place so other threads and processes never see a partially
+    extracted tree. When more than one extracts the same archive at the same time,
+    the first to finish is kept.
+
+    When ``max_size`` is exceeded after an archive is extracted into the cache, the
+    least recently used trees are evicted. A lock file is held for each tree while
+    it is extracted or materialized so it is not evicted by another thread or
+    process in the meantime.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        from pathlib import Path
+
+        from f_lib.archive_extractor import ExtractionCache, ZipExtractor
+
+        cache = ExtractionCache(max_size=10 * 1024**3)
+        cache.extract(ZipExtractor("bundle.zip"), Path("build/bundle"))
+
+    """
+
+    DIRECTORY_NAME: ClassVar[str] = "extraction_cache"
+    """Name of the cache directory when a path is not provided."""
+
+    LINK_TYPES: ClassVar[tuple[str, ...]] = ("hardlink", "reflink", "symlink")
+    """Supported ways of materializing a cached tree."""
+
+    file_hash: FileHash
+    """Used to calculate the digest of each archive."""
+
+    link: Literal["hardlink", "reflink", "symlink"]
+    """How a cached tree is materialized."""
+
+    max_size: int | None
+    """Maximum total size, in bytes, of the files in the cache."""
+
+    root: Path
+    """Path to the cache directory."""
+
+    def __init__(
+        self,
+        root: StrPath | None = None,
+        *,
+        file_hash: FileHash | None = None,
+        link: Literal["hardlink", "reflink", "symlink"] = "hardlink",
+        max_size: int | None = None,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            root: Path to the cache directory. Defaults to a directory in :attr:`f_lib.OsInfo.user_data_dir`.
+            file_hash: Used to calculate the digest of each archive. Providing one with
+                a ``cache`` avoids reading archives that have not changed. Defaults to SHA-256.
+            link: How a cached tree is materialized at the destination.
+
+                - ``hardlink``: Each file is hard linked to the cached file. Falls back
+                  to copying when that is not possible (e.g. different filesystems).
+                  Files must not be modified in place since that would modify the cache.
+                - ``reflink``: Each file is a copy-on-write clone of the cached file
+                  (e.g. Btrfs, XFS). Falls back to copying when that is not possible.
+                - ``symlink``: The destination is a symbolic link to the cached tree.
+                  It must not already exist as a directory and breaks if the tree is evicted.
+
+            max_size: Maximum total size, in bytes, of the files in the cache.
+                If ``None``, trees are never evicted.
+
+        Raises:
+            ValueError: ``link`` is not supported.
+
+        """
+        if link not in self.LINK_TYPES:
+            msg = f"link must be one of {', '.join(self.LINK_TYPES)}; got {link}"
+            raise ValueError(msg)
+        self.file_hash = file_hash or FileHash(hashlib.sha256())
+        self.link = link
+        self.max_size = max_size
+        self.root = Path(root) if root else OsInfo().user_data_dir / self.DIRECTORY_NAME
+
+    def evict(self, *, keep: Collection[str] = ()) -> list[str]:
+        """Remove the least recently used trees until the cache is no larger than ``max_size``.
+
+        Args:
+            keep: Keys of trees that must not be removed.
+
+        Trees that are being used by another thread or process are not removed.
+        Temporary directories left behind by extractions that did not finish
+        (e.g. the process was killed) are also removed.
+
+        Returns:
+            Keys of the trees that were removed.
+
+        """
+        if self.max_size is None or not self.root.is_dir():
+            return []
+        self._remove_staging()
+        entries = sorted(
+            (self._read_metadata(path.name) for path in self.root.iterdir() if path.is_dir() and path.name[0] != "."),
+            key=lambda entry: entry[2],
+        )
+        total = sum(size for _, size, _ in entries)
+        removed: list[str] = []
+        for key, size, _ in entries:
+            if total <= self.max_size:
+                break
+            if key in keep:
+                continue
+            with self._lock(key, blocking=False) as locked:
+                if not locked:
+                    continue  # in use
+                self._remove(key)
+                with suppress(OSError):  # e.g. Windows can't remove an open file
+                    (self.root / ".locks" / key).unlink()
+            removed.append(key)
+            total -= size
+        return removed
+
+    def extract(
+        self,
+        extractor: ArchiveExtractor,
+        destination: Path,
+        *,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        members: Iterable[str] | None = None,
+    ) -> Path:
+        """Extract an archive, using the cached tree if it was already extracted.
+
+        Trees are only evicted when the archive was not already cached since using
+        a cached tree does not change the size of the cache.
+
+        Args:
+            extractor: Extractor of the archive.
+            destination: Where the archive will be extracted to.
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            members: Names of members (or directories of members) to include.
+
+        Returns:
+            Path to the extraction.
+
+        """
+        exclude, include, members = list(exclude or []), list(include or []), list(members or [])
+        key = self.key(extractor.archive, exclude=exclude, include=include, members=members)
+        entry = self.root / key
+        populated = False
+        with self._lock(key, shared=True):
+            if entry.is_dir():
+                self._touch(key)
+            if not entry.is_dir():  # not cached or removed without holding the lock
+                self._populate(extractor, key, exclude=exclude, include=include, members=members)
+                populated = True
+            self._materialize(entry, destination)
+        if populated:
+            self.evict(keep=(key,))
+        return destination
+
+    def key(
+        self,
+        archive: StrPath,
+        *,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        members: Iterable[str] | None = None,
+    ) -> str:
+        """Get the key of the cached tree of an archive.
+
+        Args:
+            archive: Path to the archive file.
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            members: Names of members (or directories of members) to include.
+
+        Returns:
+            Name of the algorithm and hex digest of the archive. When members are
+            selected, a digest of how they are selected is appended since the tree differs.
+
+        """
+        key = f"{self.file_hash.algorithm}-{self.file_hash.hash_file(archive).hex()}"
+        options = {"exclude": exclude, "include": include, "members": members}
+        if not any(options.values()):
+            return key
+        options_hash = self.file_hash.new_hash()
+        options_hash.update(json.dumps({name: list(value or []) for name, value in options.items()}).encode())
+        return f"{key}-{options_hash.hexdigest()[:16]}"
+
+    @contextmanager
+    def _lock(self, key: str, *, blocking: bool = True, shared: bool = False) -> Generator[bool]:
+        """Hold the lock file of a cached tree.
+
+        The lock file is removed when the tree is evicted. If it was removed while
+        waiting for the lock, the lock is released and the new lock file is locked instead.
+
+        Args:
+            key: Key of the cached tree.
+            blocking: Wait for the lock to be released by other threads and processes.
+            shared: Allow other threads and processes to hold a shared lock at the
+                same time. Windows only supports exclusive locks.
+
+        Yields:
+            Whether the lock was acquired. Always ``True`` when ``blocking``.
+
+        """
+        lock_dir = self.root / ".locks"
+        lock_dir.mkdir(parents=True, exist_ok=True)
+        path = lock_dir / key
+        while True:
+            with path.open("a+b") as file_obj:
+                if not _lock_file(file_obj.fileno(), blocking=blocking, shared=shared):
+                    yield False
+                    return
+                try:
+                    if _is_same_file(file_obj.fileno(), path):
+                        yield True
+                        return
+                finally:
+                    _unlock_file(file_obj.fileno())
+
+    def _materialize(self, entry: Path, destination: Path) -> None:
+        """Materialize a cached tree at the destination."""
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if self.link == "symlink":
+            if destination.is_symlink():
+                destination.unlink()
+            destination.symlink_to(entry.resolve(), target_is_directory=True)
+            return
+        destination.mkdir(exist_ok=True)
+        for root, dirs, files in os.walk(entry, onerror=_raise):
+            root_path = Path(root)
+            target = destination / root_path.relative_to(entry)
+            for name in dirs:
+                if (root_path / name).is_symlink():
+                    _copy_symlink(root_path / name, target / name)
+                else:
+                    (target / name).mkdir(exist_ok=True)
+            for name in files:
+                self._link_file(root_path / name, target / name)
+
+    def _link_file(self, source: Path, target: Path) -> None:
+        """Link or copy a cached file to a path, replacing it if it exists."""
+        if source.is_symlink():
+            _copy_symlink(source, target)
+            return
+        target.unlink(missing_ok=True)
+        if self.link == "hardlink":
+            try:
+                target.hardlink_to(source)
+            except OSError:
+                pass  # e.g. different filesystems or too many links; fall back to copying
+            else:
+                return
+        elif _reflink(source, target):
+            return
+        shutil.copy2(source, target)
+
+    def _populate(
+        self,
+        extractor: ArchiveExtractor,
+        key: str,
+        *,
+        exclude: Iterable[str] | None,
+        include: Iterable[str] | None,
+        members: Iterable[str] | None,
+    ) -> None:
+        """Extract an archive into the cache."""
+        staging_dir = self.root / ".tmp"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=staging_dir, prefix=f"{key}."))
+        try:
+            extractor.extract(staging, exclude=exclude, include=include, members=members)
+            self._write_metadata(key, _tree_size(staging))
+            try:
+                staging.rename(self.root / key)  # atomic so a partially extracted tree is never used
+            except OSError:
+                if not (self.root / key).is_dir():
+                    raise
+                # extracted by another thread or process at the same time
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _read_metadata(self, key: str) -> tuple[str, int, float]:
+        """Read the size and last use of a cached tree, recreating the metadata file if it is missing.
+
+        Returns:
+            Key, total size of the files in the tree, and when it was last used.
+
+        """
+        path = self.root / f"{key}.json"
+        try:
+            return key, json.loads(path.read_text())["size"], path.stat().st_mtime
+        except (KeyError, OSError, ValueError):
+            size = _tree_size(self.root / key)
+            self._write_metadata(key, size)
+            return key, size, path.stat().st_mtime
+
+    def _remove(self, key: str) -> None:
+        """Remove a cached tree.
+
+        It is renamed before it is deleted so it is never seen partially deleted.
+
+        """
+        staging_dir = self.root / ".tmp"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=staging_dir, prefix=f"{key}."))
+        with suppress(FileNotFoundError):  # already removed by another thread or process
+            (self.root / key).rename(staging / key)
+        (self.root / f"{key}.json").unlink(missing_ok=True)
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def _remove_staging(self) -> None:
+        """Remove temporary directories of trees that are not being extracted or removed."""
+        staging_dir = self.root / ".tmp"
+        if not staging_dir.is_dir():
+            return
+        for path in staging_dir.iterdir():
+            with self._lock(path.name.rpartition(".")[0], blocking=False) as locked:
+                if locked:
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def _touch(self, key: str) -> None:
+        """Record that a cached tree was used."""
+        try:
+            os.utime(self.root / f"{key}.json")
+        except FileNotFoundError:
+            self._write_metadata(key, _tree_size(self.root / key))
+
+    def _write_metadata(self, key: str, size: int) -> None:
+        """Write the metadata file of a cached tree. Its modification time is when the tree was last used."""
+        path = self.root / f"{key}.json"
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"size": size}))
+        tmp_path.replace(path)  # atomic so a partially written file is never read
+
+
+def _copy_symlink(source: Path, target: Path) -> None:
+    """Create a symbolic link with the same target as another, replacing the path if it is a file or link."""
+    if target.is_symlink() or target.is_file():
+        target.unlink()
+    target.symlink_to(source.readlink())
+
+
+def _is_same_file(fileno: int, path: Path) -> bool:
+    """Whether an open file is the file at a path (i.e. it was not removed or replaced)."""
+    try:
+        return os.path.samestat(os.fstat(fileno), path.stat())
+    except FileNotFoundError:
+        return False
+
+
+def _lock_file(fileno: int, *, blocking: bool, shared: bool) -> bool:
+    """Lock an open file.
+
+    Returns:
+        Whether the file was locked.
+
+    """
+    if sys.platform == "win32":  # cov: ignore
+        import msvcrt  # noqa: PLC0415
+
+        try:
+            msvcrt.locking(fileno, msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            return False
+        return True
+    import fcntl  # noqa: PLC0415 # not available on Windows
+
+    try:
+        fcntl.flock(fileno, (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _raise(error: OSError) -> NoReturn:
+    """Raise an error passed to a callback (e.g. ``onerror`` of :func:`os.walk`)."""
+    raise error
+
+
+def _reflink(source: Path, target: Path) -> bool:
+    """Clone a file using copy-on-write if supported by the filesystem.
+
+    Returns:
+        Whether the file was cloned.
+
+    """
+    if sys.platform != "linux":
+        return False  # cov: ignore
+    import fcntl  # noqa: PLC0415 # not available on Windows
+
+    with source.open("rb") as source_obj, target.open("wb") as target_obj:
+        try:
+            fcntl.ioctl(target_obj.fileno(), FICLONE, source_obj.fileno())
+        except OSError:
+            return False
+    shutil.copystat(source, target)
+    return True
+
+
+def _tree_size(root: Path) -> int:
+    """Get the total size of the files in a directory tree."""
+    return sum((Path(path) / name).lstat().st_size for path, _, files in os.walk(root) for name in files)
+
+
+def _unlock_file(fileno: int) -> None:
+    """Unlock a file locked by :func:`_lock_file`."""
+    if sys.platform == "win32":  # cov: ignore
+        import msvcrt  # noqa: PLC0415
+
+        os.lseek(fileno, 0, os.SEEK_SET)
+        msvcrt.locking(fileno, msvcrt.LK_UNLCK, 1)
+        return
+    import fcntl  # noqa: PLC0415 # not available on Windows
+
+    fcntl.flock(fileno, fcntl.LOCK_UN)
@@ -0,0 +1,71 @@
+"""Select an extractor for an archive."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
+
+from ._tar_extractor import TarExtractor
+from ._zip_extractor import ZipExtractor
+from .exceptions import ArchiveTypeError
+
+if TYPE_CHECKING:
+    from ._archive_extractor import ArchiveExtractor
+
+_ExtractorT = TypeVar("_ExtractorT", bound="type[ArchiveExtractor]")
+
+EXTRACTORS: list[type[ArchiveExtractor]] = [ZipExtractor, TarExtractor]
+"""Extractors that can be selected by :func:`get_extractor`, in order of precedence."""
+
+
+def get_extractor(archive: Path | str) -> ArchiveExtractor:
+    """Get an extractor for an archive.
+
+    The extractor is selected by the magic bytes at the start of the archive file,
+    read using a single small read, so the archive does not need to have the expected
+    file extension/suffix. If no extractor recognizes the magic bytes (e.g. a self
+    extracting ``.zip`` archive), it is selected by suffix instead.
+
+    Args:
+        archive: Path to the archive file.
+
+    Returns:
+        Extractor of the first of :data:`EXTRACTORS` that supports the archive.
+
+    Raises:
+        ArchiveTypeError: No extractor supports the archive.
+        FileNotFoundError: The archive file does not exist.
+
+    """
+    path = Path(archive)
+    size = max((offset + len(magic) for extractor in EXTRACTORS for offset, magic in extractor.MAGIC), default=0)
+    with path.open("rb") as file_obj:
+        header = file_obj.read(size)
+    for extractor in EXTRACTORS:
+        if extractor.sniff(header):
+            return extractor(path, strict=False)
+    for extractor in EXTRACTORS:
+        if extractor.can_extract(path):
+            return extractor(path)
+    raise ArchiveTypeError(path, [suffix for extractor in EXTRACTORS for suffix in extractor.SUFFIX])
+
+
+def register_extractor(extractor: _ExtractorT) -> _ExtractorT:
+    """Register an extractor so it can be selected by :func:`get_extractor`.
+
+    Registered extractors take precedence over those already registered. Can be
+    used as a class decorator.
+
+    Args:
+        extractor: Subclass of :class:`~f_lib.archive_extractor.ArchiveExtractor`.
+            Its :attr:`~f_lib.archive_extractor.ArchiveExtractor.MAGIC` is used to
+            recognize archives it supports.
+
+    Returns:
+        The extractor.
+
+    """
+    if extractor in EXTRACTORS:
+        EXTRACTORS.remove(extractor)
+    EXTRACTORS.insert(0, extractor)
+    return extractor
@@ -2,45 +2,258 @@
 
 from __future__ import annotations
 
+import stat
 import tarfile
-from typing import TYPE_CHECKING, ClassVar
+from contextlib import suppress
+from typing import IO, TYPE_CHECKING, ClassVar
 
-from ._archive_extractor import ArchiveExtractor
-from .exceptions import Pep706Error
+from ._archive_extractor import ArchiveExtractor, MemberFilter
+from ._tar_index import COMPRESSION_MAGIC, TarIndex
+from .exceptions import CompressionUnavailableError, Pep706Error
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
     from pathlib import Path
 
 
 class TarExtractor(ArchiveExtractor):
     """Extractor for ``.tar`` archives.
 
-    Supports bz2, gz, and xz compression types.
+    Supports bz2, gz, and xz compression types. zstd is also supported when
+    :mod:`tarfile` supports it (Python 3.14+).
 
     """
 
+    MAGIC: ClassVar[tuple[tuple[int, bytes], ...]] = (
+        *((0, magic) for magic in COMPRESSION_MAGIC.values()),
+        (257, b"ustar"),  # POSIX and GNU tar headers
+    )
+    """Offset and value of magic bytes that identify archives supported by the extractor."""
+
     SUFFIX: ClassVar[tuple[str, ...]] = (
         ".gzip",
         ".tar",
         ".tar.gz",
         ".tar.bz2",
         ".tar.xz",
+        ".tar.zst",
+        ".zst",
     )
     """File extension/suffix supported by the extractor."""
 
-    def extract(self, destination: Path) -> Path:
+    _index: TarIndex | None = None
+    """Seek index of the archive, kept until the archive changes."""
+
+    def extract(
+        self,
+        destination: Path,
+        *,
+        delete: bool = False,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        incremental: bool = False,
+        members: Iterable[str] | None = None,
+    ) -> Path:
         """Extract the archive file.
 
+        When ``members`` are selected, the archive is only read until each of them
+        has been found. The data of members that are not selected is skipped.
+
+        When ``incremental``, a file is not written if the file already in ``destination``
+        has the same size and modification time (to the second) as the member.
+
         Args:
             destination: Where the archive file will be extracted to.
+            delete: Delete files (and directories left empty) in ``destination`` that
+                are not members of the archive. Files that would not be selected if
+                they were members (e.g. they match ``exclude``) are kept.
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            incremental: Only write members that differ from the files already in ``destination``.
+            members: Names of members (or directories of members) to include.
 
         Returns:
             Path to the extraction.
 
+        Raises:
+            CompressionUnavailableError: The archive is compressed using zstd and the
+                current version of Python does not support it.
+
         """
         if not hasattr(tarfile, "data_filter"):
             raise Pep706Error
+        self._check_compression()
         destination.mkdir(exist_ok=True, parents=True)
         with tarfile.open(self.archive, mode="r:*") as file_obj:
-            file_obj.extractall(destination.resolve(), filter="data")
+            self._extractall(
+                file_obj,
+                destination,
+                MemberFilter(exclude=exclude, include=include, members=members),
+                delete=delete,
+                incremental=incremental,
+            )
+        return destination
+
+    def index(self, *, checkpoint_interval: int | None = None, rebuild: bool = False) -> TarIndex:
+        """Get the seek index of the archive.
+
+        The index is kept by the instance until the archive changes. Otherwise, it is
+        loaded from its sidecar file next to the archive. If it was not saved or the
+        archive changed since it was indexed, it is built and saved. The index is
+        still returned if it can't be saved (e.g. the directory is read-only).
+
+        Args:
+            checkpoint_interval: Minimum number of uncompressed bytes between checkpoints.
+                See :meth:`TarIndex.build`.
+            rebuild: Build the index even if it was saved.
+
+        Returns:
+            Seek index of the archive.
+
+        """
+        if not rebuild and self._index is not None and not self._index.stale:
+            return self._index
+        if rebuild or (index := TarIndex.load(self.archive)) is None:
+            index = TarIndex.build(self.archive, checkpoint_interval=checkpoint_interval)
+            with suppress(OSError):  # only makes indexing faster next time
+                index.save()
+        self._index = index
+        return index
+
+    def read_member(self, name: str) -> bytes:
+        """Read the data of a file in the archive using its seek index.
+
+        Decompression starts at the last checkpoint before the file instead of at
+        the start of the archive. See :class:`TarIndex`.
+
+        Args:
+            name: Name of the file in the archive.
+
+        Raises:
+            KeyError: The file is not in the archive.
+
+        """
+        return self.index().read(name)
+
+    @classmethod
+    def extract_stream(
+        cls,
+        stream: IO[bytes],
+        destination: Path,
+        *,
+        delete: bool = False,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        incremental: bool = False,
+        members: Iterable[str] | None = None,
+    ) -> Path:
+        """Extract an archive read from a stream.
+
+        The stream is read once, from start to end, using the streaming mode of
+        :mod:`tarfile` so it does not need to support seeking (e.g. ``sys.stdin.buffer``,
+        the ``stdout`` of a subprocess, :meth:`socket.makefile`). Each member is
+        written to disk as it is read so the archive is never stored. Compression
+        is detected automatically. The ``data`` filter is used, the same as :meth:`extract`.
+
+        .. rubric:: Example
+        .. code-block:: python
+
+            import subprocess
+            from pathlib import Path
+
+            from f_lib.archive_extractor import TarExtractor
+
+            url = "https://example.com/bundle.tar.gz"
+            with subprocess.Popen(["curl", "-sL", url], stdout=subprocess.PIPE) as process:
+                TarExtractor.extract_stream(process.stdout, Path("bundle"))
+
+        Args:
+            stream: Binary stream containing the archive.
+            destination: Where the archive will be extracted to.
+            delete: Delete files (and directories left empty) in ``destination`` that
+                are not members of the archive. See :meth:`extract`.
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            incremental: Only write members that differ from the files already in
+                ``destination``. See :meth:`extract`. The data of members that are
+                not written is still read from the stream.
+            members: Names of members (or directories of members) to include.
+                The rest of the stream is not read once each of them has been found.
+
+        Returns:
+            Path to the extraction.
+
+        """
+        if not hasattr(tarfile, "data_filter"):
+            raise Pep706Error
+        destination.mkdir(exist_ok=True, parents=True)
+        with tarfile.open(fileobj=stream, mode="r|*") as file_obj:
+            cls._extractall(
+                file_obj,
+                destination,
+                MemberFilter(exclude=exclude, include=include, members=members),
+                delete=delete,
+                incremental=incremental,
+            )
         return destination
+
+    def _check_compression(self) -> None:
+        """Check that :mod:`tarfile` supports the compression of the archive.
+
+        Raises:
+            CompressionUnavailableError: The archive is compressed with zstd and the
+                current version of Python does not support it.
+
+        """
+        compression = "zst"
+        if compression in tarfile.TarFile.OPEN_METH:
+            return
+        with self.archive.open("rb") as file_obj:
+            if file_obj.read(len(COMPRESSION_MAGIC[compression])) == COMPRESSION_MAGIC[compression]:
+                raise CompressionUnavailableError(compression)
+
+    @classmethod
+    def _extractall(
+        cls,
+        file_obj: tarfile.TarFile,
+        destination: Path,
+        member_filter: MemberFilter,
+        *,
+        delete: bool = False,
+        incremental: bool = False,
+    ) -> None:
+        """Extract the selected members of an archive using the ``data`` filter."""
+        if not (member_filter or delete or incremental):
+            file_obj.extractall(destination.resolve(), filter="data")
+            return
+        names: set[str] = set()
+
+        def selected() -> Iterator[tarfile.TarInfo]:
+            # members are read from the archive as they are extracted so it can stop early
+            for member in file_obj:
+                if member_filter(member.name, is_dir=member.isdir()):
+                    name = MemberFilter.normalize(member.name)
+                    names.add(name)
+                    if not (incremental and _is_unchanged(destination / name, member)):
+                        yield member
+                    if member_filter.done:
+                        return
+
+        file_obj.extractall(destination.resolve(), members=selected(), filter="data")
+        if delete:
+            cls._delete_stale(destination, names, member_filter)
+
+
+def _is_unchanged(path: Path, member: tarfile.TarInfo) -> bool:
+    """Whether a member of an archive is already extracted to a path, judging by its size and modification time."""
+    if not member.isfile():
+        return False
+    try:
+        file_stat = path.lstat()
+    except OSError:
+        return False
+    return (
+        stat.S_ISREG(file_stat.st_mode)
+        and file_stat.st_size == member.size
+        and int(file_stat.st_mtime) == int(member.mtime)
+    )
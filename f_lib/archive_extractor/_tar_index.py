@@ -0,0 +1,520 @@
+"""Seek index of ``.tar`` archives."""
+
+from __future__ import annotations
+
+import bisect
+import bz2
+import importlib
+import io
+import json
+import lzma
+import os
+import tarfile
+import zlib
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, ClassVar, NamedTuple, cast
+
+from ._archive_extractor import MemberFilter
+from .exceptions import CompressionUnavailableError
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from typing import Protocol
+
+    from _typeshed import StrPath, WriteableBuffer
+
+    class _Decompressor(Protocol):
+        """Decompressor of one compressed stream (e.g. :class:`lzma.LZMADecompressor`)."""
+
+        @property
+        def eof(self) -> bool:
+            """Whether the end of the stream was reached."""
+            ...
+
+        @property
+        def unused_data(self) -> bytes:
+            """Data found after the end of the stream."""
+            ...
+
+        def decompress(self, data: bytes, /) -> bytes:
+            """Decompress data."""
+            ...
+
+
+COMPRESSION_MAGIC: dict[str, bytes] = {
+    "bz2": b"BZh",
+    "gz": b"\x1f\x8b",
+    "xz": b"\xfd7zXZ\x00",
+    "zst": b"\x28\xb5\x2f\xfd",
+}
+"""Magic bytes at the start of each compressed stream, keyed by compression type."""
+
+try:
+    _zstd: Any = importlib.import_module("compression.zstd")  # Python >=3.14
+except ImportError:
+    _zstd = None
+
+
+class TarIndexCheckpoint(NamedTuple):
+    """Position in an archive where decompression can start."""
+
+    compressed_offset: int
+    """Offset of the checkpoint in the archive file."""
+
+    uncompressed_offset: int
+    """Offset of the checkpoint in the uncompressed ``.tar`` stream."""
+
+
+class TarIndexMember(NamedTuple):
+    """Location of the data of a file in an archive."""
+
+    name: str
+    """Name of the member, normalized using :meth:`MemberFilter.normalize`."""
+
+    offset_data: int
+    """Offset of the data of the member in the uncompressed ``.tar`` stream."""
+
+    size: int
+    """Size of the data of the member."""
+
+
+class TarIndex:
+    """Seek index of a ``.tar`` archive, stored in a sidecar file.
+
+    The index records where the data of each file is in the uncompressed ``.tar``
+    stream along with checkpoints where decompression can start. To read a file,
+    decompression starts at the last checkpoint before it instead of at the start
+    of the archive.
+
+    Checkpoints are only possible where the compressed data does not depend on
+    what came before it:
+
+    - ``.tar``: Files are read directly.
+    - ``.tar.xz``: The start of each block, listed in the index of the xz stream.
+      ``xz`` splits its output into blocks when compressing with more than one thread
+      (the default since xz 5.6) or with ``--block-size``.
+    - ``.tar.gz``: The start of each gzip member, at least ``checkpoint_interval``
+      apart. Archives compressed as a series of members (e.g. ``bgzip``, ``pigz
+      --independent`` with concatenation) have many. An archive compressed as one
+      member only has a checkpoint at the start since the state of the decompressor
+      can't be restored in the middle of a deflate stream using :mod:`zlib`.
+    - ``.tar.bz2``: The start of each bz2 stream (e.g. ``pbzip2``), at least
+      ``checkpoint_interval`` apart.
+    - ``.tar.zst``: The start of each zstd frame (e.g. ``pzstd``), at least
+      ``checkpoint_interval`` apart. Requires :mod:`compression.zstd` (Python 3.14+).
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        from f_lib.archive_extractor import TarIndex
+
+        index = TarIndex.load("dataset.tar.xz") or TarIndex.build("dataset.tar.xz")
+        index.save()
+        data = index.read("dataset/part-0999.csv")
+
+    """
+
+    CHECKPOINT_INTERVAL: ClassVar[int] = 4 * 1024 * 1024  # 4 MiB
+    """Default minimum number of uncompressed bytes between checkpoints."""
+
+    FORMAT_VERSION: ClassVar[int] = 1
+    """Version of the format of the sidecar file."""
+
+    READ_SIZE: ClassVar[int] = 64 * 1024  # 64 KiB
+    """Number of bytes read from the archive at a time."""
+
+    SUFFIX: ClassVar[str] = ".index.json"
+    """Appended to the name of the archive to get the name of the sidecar file."""
+
+    archive: Path
+    """Resolved path to the archive file."""
+
+    checkpoints: list[TarIndexCheckpoint]
+    """Positions where decompression can start, in order."""
+
+    compression: str
+    """Compression of the archive. One of :data:`COMPRESSION_MAGIC` or an empty string."""
+
+    members: dict[str, TarIndexMember]
+    """Location of the data of each file in the archive, keyed by normalized name."""
+
+    mtime_ns: int
+    """Modification time of the archive file when it was indexed."""
+
+    size: int
+    """Size of the archive file when it was indexed."""
+
+    def __init__(
+        self,
+        archive: StrPath,
+        *,
+        checkpoints: list[TarIndexCheckpoint],
+        compression: str,
+        members: dict[str, TarIndexMember],
+        mtime_ns: int,
+        size: int,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            archive: Path to the archive file.
+            checkpoints: Positions where decompression can start, in order.
+            compression: Compression of the archive.
+            members: Location of the data of each file in the archive.
+            mtime_ns: Modification time of the archive file when it was indexed.
+            size: Size of the archive file when it was indexed.
+
+        """
+        self.archive = Path(archive).resolve()
+        self.checkpoints = checkpoints
+        self.compression = compression
+        self.members = members
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    @property
+    def path(self) -> Path:
+        """Default path of the sidecar file."""
+        return self.archive.with_name(self.archive.name + self.SUFFIX)
+
+    @property
+    def stale(self) -> bool:
+        """Whether the archive file changed since it was indexed."""
+        try:
+            file_stat = self.archive.stat()
+        except FileNotFoundError:
+            return True
+        return (file_stat.st_size, file_stat.st_mtime_ns) != (self.size, self.mtime_ns)
+
+    @classmethod
+    def build(cls, archive: StrPath, *, checkpoint_interval: int | None = None) -> TarIndex:
+        """Build the index of an archive.
+
+        The archive is decompressed once, from start to end.
+
+        Args:
+            archive: Path to the archive file.
+            checkpoint_interval: Minimum number of uncompressed bytes between checkpoints
+                at the start of gzip members and bz2 streams. Defaults to :attr:`CHECKPOINT_INTERVAL`.
+
+        Raises:
+            tarfile.ReadError: The archive can't be read.
+
+        """
+        archive = Path(archive).resolve()
+        file_stat = archive.stat()
+        members: dict[str, TarIndexMember] = {}
+        with archive.open("rb") as file_obj:
+            compression = _detect_compression(file_obj)
+            reader = _DecompressingReader(
+                file_obj, compression, checkpoint_interval=checkpoint_interval or cls.CHECKPOINT_INTERVAL
+            )
+            with tarfile.open(fileobj=cast("IO[bytes]", reader), mode="r|") as tar_obj:
+                for member in tar_obj:
+                    if member.isreg() and not member.issparse():
+                        name = MemberFilter.normalize(member.name)
+                        members[name] = TarIndexMember(name, member.offset_data, member.size)
+            checkpoints = _xz_checkpoints(file_obj) if compression == "xz" else reader.checkpoints
+        return cls(
+            archive,
+            checkpoints=checkpoints,
+            compression=compression,
+            members=members,
+            mtime_ns=file_stat.st_mtime_ns,
+            size=file_stat.st_size,
+        )
+
+    @classmethod
+    def load(cls, archive: StrPath, *, path: StrPath | None = None) -> TarIndex | None:
+        """Load the index of an archive from its sidecar file.
+
+        Args:
+            archive: Path to the archive file.
+            path: Path to the sidecar file. Defaults to :attr:`path`.
+
+        Returns:
+            The index or ``None`` if it was not saved, can't be read, or the archive
+            file changed since it was indexed.
+
+        """
+        archive = Path(archive).resolve()
+        path = Path(path) if path else archive.with_name(archive.name + cls.SUFFIX)
+        try:
+            data: dict[str, Any] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != cls.FORMAT_VERSION:
+            return None
+        index = cls(
+            archive,
+            checkpoints=[TarIndexCheckpoint(*checkpoint) for checkpoint in data["checkpoints"]],
+            compression=data["compression"],
+            members={member[0]: TarIndexMember(*member) for member in data["members"]},
+            mtime_ns=data["mtime_ns"],
+            size=data["size"],
+        )
+        return None if index.stale else index
+
+    def read(self, name: str) -> bytes:
+        """Read the data of a file in the archive.
+
+        Args:
+            name: Name of the file in the archive.
+
+        Raises:
+            KeyError: The file is not in the index.
+            tarfile.ReadError: The archive changed since it was indexed or ended unexpectedly.
+
+        """
+        member = self.members[MemberFilter.normalize(name)]
+        if self.stale:
+            msg = f"archive {self.archive.name} changed since it was indexed"
+            raise tarfile.ReadError(msg)
+        with self.archive.open("rb") as file_obj:
+            if not self.compression:
+                file_obj.seek(member.offset_data)
+                data = file_obj.read(member.size)
+            else:
+                data = self._read_compressed(file_obj, member)
+        if len(data) != member.size:
+            msg = f"unexpected end of archive {self.archive.name} reading {member.name}"
+            raise tarfile.ReadError(msg)
+        return data
+
+    def save(self, path: StrPath | None = None) -> Path:
+        """Save the index to its sidecar file.
+
+        Args:
+            path: Path to the sidecar file. Defaults to :attr:`path`.
+
+        Returns:
+            Path to the sidecar file.
+
+        """
+        path = Path(path) if path else self.path
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "checkpoints": self.checkpoints,
+                    "compression": self.compression,
+                    "members": list(self.members.values()),
+                    "mtime_ns": self.mtime_ns,
+                    "size": self.size,
+                    "version": self.FORMAT_VERSION,
+                },
+                separators=(",", ":"),
+            )
+        )
+        tmp_path.replace(path)  # atomic so a partially written file is never read
+        return path
+
+    def _decompress(self, file_obj: IO[bytes], index: int) -> Iterator[bytes]:
+        """Decompress the archive starting at a checkpoint."""
+        if self.compression == "xz":
+            for checkpoint in self.checkpoints[index:]:  # blocks are decompressed individually
+                file_obj.seek(checkpoint.compressed_offset)
+                decompressor = lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=_read_xz_block_header(file_obj))
+                while not decompressor.eof and (data := file_obj.read(self.READ_SIZE)):
+                    yield decompressor.decompress(data)
+            return
+        file_obj.seek(self.checkpoints[index].compressed_offset)
+        reader = _DecompressingReader(file_obj, self.compression)
+        while data := reader.read(self.READ_SIZE):
+            yield data
+
+    def _read_compressed(self, file_obj: IO[bytes], member: TarIndexMember) -> bytes:
+        """Read the data of a member from the last checkpoint before it."""
+        index = bisect.bisect_right(self.checkpoints, member.offset_data, key=lambda cp: cp.uncompressed_offset) - 1
+        skip = member.offset_data - self.checkpoints[index].uncompressed_offset
+        data = bytearray()
+        for chunk in self._decompress(file_obj, index):
+            if skip >= len(chunk):
+                skip -= len(chunk)
+                continue
+            data += chunk[skip : skip + member.size - len(data)]
+            skip = 0
+            if len(data) == member.size:
+                break
+        return bytes(data)
+
+
+class _DecompressingReader(io.RawIOBase):
+    """Decompress a series of compressed streams, recording where each starts."""
+
+    def __init__(self, file_obj: IO[bytes], compression: str, *, checkpoint_interval: int | None = None) -> None:
+        """Instantiate class.
+
+        Args:
+            file_obj: Archive file, positioned at the start of a compressed stream.
+            compression: Compression of the archive.
+            checkpoint_interval: Minimum number of uncompressed bytes between recorded
+                checkpoints. If ``None``, checkpoints are not recorded.
+
+        """
+        super().__init__()
+        self.checkpoints = [TarIndexCheckpoint(0, 0)]
+        self._buffer = memoryview(b"")
+        self._checkpoint_interval = checkpoint_interval
+        self._compression = compression
+        self._consumed = 0  # number of bytes read from the file
+        self._decompressor = _new_decompressor(compression) if compression else None
+        self._file_obj = file_obj
+        self._pending = b""  # compressed data not yet decompressed
+        self._position = 0  # number of uncompressed bytes returned
+
+    def readable(self) -> bool:
+        """Whether the stream can be read."""
+        return True
+
+    def readinto(self, buffer: WriteableBuffer) -> int:
+        """Read decompressed data into a buffer."""
+        while not self._buffer:
+            if not self._fill():
+                return 0
+        view = memoryview(buffer).cast("B")
+        size = min(len(view), len(self._buffer))
+        view[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._position += size
+        return size
+
+    def _fill(self) -> bool:
+        """Decompress more data into the buffer.
+
+        Returns:
+            ``False`` at the end of the file.
+
+        """
+        if not self._pending:
+            self._pending = self._file_obj.read(TarIndex.READ_SIZE)
+            self._consumed += len(self._pending)
+            if not self._pending:
+                return False
+        if self._decompressor is None:
+            self._buffer, self._pending = memoryview(self._pending), b""
+            return True
+        if self._decompressor.eof:  # the rest of the data is another compressed stream
+            if self._compression == "xz":
+                self._pending = self._pending.lstrip(b"\0")  # stream padding
+                if not self._pending:
+                    return True
+            if (
+                self._checkpoint_interval is not None
+                and self._position - self.checkpoints[-1].uncompressed_offset >= self._checkpoint_interval
+            ):
+                self.checkpoints.append(TarIndexCheckpoint(self._consumed - len(self._pending), self._position))
+            self._decompressor = _new_decompressor(self._compression)
+        self._buffer = memoryview(self._decompressor.decompress(self._pending))
+        self._pending = self._decompressor.unused_data if self._decompressor.eof else b""
+        return True
+
+
+def _detect_compression(file_obj: IO[bytes]) -> str:
+    """Detect the compression of an archive file from its magic bytes, leaving the file at its start."""
+    magic = file_obj.read(max(len(value) for value in COMPRESSION_MAGIC.values()))
+    file_obj.seek(0)
+    return next((name for name, value in COMPRESSION_MAGIC.items() if magic.startswith(value)), "")
+
+
+def _new_decompressor(compression: str) -> _Decompressor:
+    """Create a decompressor for one compressed stream.
+
+    Raises:
+        CompressionUnavailableError: The compression is not supported by the current version of Python.
+
+    """
+    if compression == "bz2":
+        return bz2.BZ2Decompressor()
+    if compression == "gz":
+        return zlib.decompressobj(wbits=31)
+    if compression == "zst":
+        if _zstd is None:
+            raise CompressionUnavailableError(compression)
+        return _zstd.ZstdDecompressor()
+    return lzma.LZMADecompressor(lzma.FORMAT_XZ)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    """Read a variable-length integer used by the xz format.
+
+    Returns:
+        The integer and the position after it.
+
+    """
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def _read_xz_block_header(file_obj: IO[bytes]) -> list[dict[str, Any]]:
+    """Read the header of an xz block.
+
+    Returns:
+        Filter chain used to decompress the block.
+
+    """
+    header = file_obj.read(1)
+    header += file_obj.read((header[0] + 1) * 4 - 1)
+    flags = header[1]
+    position = 2
+    if flags & 0x40:  # compressed size
+        _, position = _read_varint(header, position)
+    if flags & 0x80:  # uncompressed size
+        _, position = _read_varint(header, position)
+    filters: list[dict[str, Any]] = []
+    for _ in range((flags & 0x03) + 1):
+        filter_id, position = _read_varint(header, position)
+        size, position = _read_varint(header, position)
+        # also used by zipfile; not included in type stubs
+        filters.append(cast("Any", lzma)._decode_filter_properties(filter_id, header[position : position + size]))  # noqa: SLF001
+        position += size
+    return filters
+
+
+def _xz_checkpoints(file_obj: IO[bytes]) -> list[TarIndexCheckpoint]:
+    """Get the start of each block of an xz file from the index at the end of each stream.
+
+    Raises:
+        tarfile.ReadError: The file is not a valid xz file.
+
+    """
+    streams: list[list[tuple[int, int]]] = []
+    end = file_obj.seek(0, os.SEEK_END)
+    while end > 0:
+        file_obj.seek(end - 12)
+        footer = file_obj.read(12)
+        if footer[-4:] == b"\0\0\0\0":  # stream padding
+            end -= 4
+            continue
+        if len(footer) != 12 or footer[-2:] != b"YZ":
+            msg = "invalid xz stream footer"
+            raise tarfile.ReadError(msg)
+        backward_size = (int.from_bytes(footer[4:8], "little") + 1) * 4
+        file_obj.seek(end - 12 - backward_size)
+        index = file_obj.read(backward_size)
+        count, position = _read_varint(index, 1)
+        blocks: list[tuple[int, int]] = []  # padded size and uncompressed size of each block
+        for _ in range(count):
+            unpadded_size, position = _read_varint(index, position)
+            uncompressed_size, position = _read_varint(index, position)
+            blocks.append(((unpadded_size + 3) & ~3, uncompressed_size))
+        offset = end - 12 - backward_size - sum(size for size, _ in blocks)  # after the stream header
+        end = offset - 12
+        stream: list[tuple[int, int]] = []
+        for size, uncompressed_size in blocks:
+            stream.append((offset, uncompressed_size))
+            offset += size
+        streams.append(stream)
+    checkpoints: list[TarIndexCheckpoint] = []
+    uncompressed_offset = 0
+    for stream in reversed(streams):
+        for offset, uncompressed_size in stream:
+            checkpoints.append(TarIndexCheckpoint(offset, uncompressed_offset))
+            uncompressed_offset += uncompressed_size
+    return checkpoints
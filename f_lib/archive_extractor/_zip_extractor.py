@@ -2,32 +2,255 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, ClassVar
+import heapq
+import os
+import stat
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, ClassVar, cast
 from zipfile import ZipFile
 
-from ._archive_extractor import ArchiveExtractor
+from ._archive_extractor import ArchiveExtractor, MemberFilter
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from pathlib import Path
+    from zipfile import ZipInfo
 
 
 class ZipExtractor(ArchiveExtractor):
     """Extractor for ``.zip`` archives."""
 
+    MAGIC: ClassVar[tuple[tuple[int, bytes], ...]] = ((0, b"PK\x03\x04"), (0, b"PK\x05\x06"))
+    """Offset and value of magic bytes that identify archives supported by the extractor."""
+
     SUFFIX: ClassVar[tuple[str, ...]] = (".zip",)
     """File extension/suffix supported by the extractor."""
 
-    def extract(self, destination: Path) -> Path:
+    def extract(
+        self,
+        destination: Path,
+        *,
+        delete: bool = False,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        incremental: bool = False,
+        max_workers: int | None = None,
+        members: Iterable[str] | None = None,
+        parallel: bool = False,
+    ) -> Path:
         """Extract the archive file.
 
+        Members are selected using the central directory of the archive so only
+        the data of selected members is read.
+
+        When ``incremental``, a file is not written if the file already in ``destination``
+        has the same size and modification time as the member. If the members of the
+        archive all have the same modification time (e.g. it was built with fixed
+        timestamps for reproducible builds), the modification time can't tell whether
+        a member changed so a file with the same size is read to compare its CRC-32
+        instead, making this ``O(total size)`` of those files. The modification time
+        of each file is set to that of the member.
+
         Args:
             destination: Where the archive file will be extracted to.
+            delete: Delete files (and directories left empty) in ``destination`` that
+                are not members of the archive. Files that would not be selected if
+                they were members (e.g. they match ``exclude``) are kept.
+            exclude: Gitignore-style patterns of members to exclude.
+            include: Gitignore-style patterns of members to include.
+            incremental: Only write members that differ from the files already in ``destination``.
+            max_workers: Maximum number of threads used to extract members when ``parallel``.
+            parallel: Extract members in parallel. Directories are created first, then
+                files are split into one batch per worker, balanced by size, and each
+                worker extracts its batch using its own handle to the archive. The
+                result is the same as extracting serially, including when the archive
+                contains more than one member with the same name.
+            members: Names of members (or directories of members) to include.
 
         Returns:
             Path to the extraction.
 
         """
         destination.mkdir(exist_ok=True, parents=True)
+        member_filter = MemberFilter(exclude=exclude, include=include, members=members)
         with ZipFile(self.archive, mode="r") as file_obj:
-            file_obj.extractall(destination)
+            if not (parallel or member_filter or delete or incremental):
+                file_obj.extractall(destination)
+                return destination
+            selected = [
+                member for member in file_obj.infolist() if member_filter(member.filename, is_dir=member.is_dir())
+            ]
+            names = [_member_path(destination, member).relative_to(destination).as_posix() for member in selected]
+            if incremental:
+                selected = _changed_members(destination, selected)
+            if not parallel:
+                file_obj.extractall(destination, members=selected)
+            else:
+                self._extract_parallel(
+                    destination, self._prepare_parallel(file_obj, destination, selected), max_workers=max_workers
+                )
+        if incremental:
+            for member in selected:
+                if not member.is_dir():
+                    mtime = _member_mtime(member)
+                    os.utime(_member_path(destination, member), (mtime, mtime))
+        if delete:
+            self._delete_stale(destination, names, member_filter)
         return destination
+
+    def _extract_parallel(self, destination: Path, files: list[ZipInfo], *, max_workers: int | None) -> None:
+        """Extract files in parallel, one batch per worker.
+
+        Args:
+            destination: Where the archive file will be extracted to.
+            files: Files to extract. Their parent directories must already exist.
+            max_workers: Maximum number of threads used to extract files.
+
+        """
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        batches = _split_members(files, max_workers)
+        if batches:
+            with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix="ZipExtractor") as executor:
+                for future in [executor.submit(self._extract_members, destination, batch) for batch in batches]:
+                    future.result()
+
+    def _extract_members(self, destination: Path, members: list[ZipInfo]) -> None:
+        """Extract members of the archive using a new handle to it.
+
+        Args:
+            destination: Where the archive file will be extracted to.
+            members: Members to extract. Their parent directories must already exist.
+
+        """
+        with ZipFile(self.archive, mode="r") as file_obj:
+            for member in members:
+                file_obj.extract(member, destination)
+
+    @staticmethod
+    def _prepare_parallel(file_obj: ZipFile, destination: Path, members: list[ZipInfo]) -> list[ZipInfo]:
+        """Extract directories and create the parent directory of each file so files can be extracted in parallel.
+
+        Args:
+            file_obj: Handle to the archive.
+            destination: Where the archive file will be extracted to.
+            members: Members to extract.
+
+        Returns:
+            Files to extract. When more than one member would be extracted to the same
+            path, only the last is included since it is the one left after extracting serially.
+
+        """
+        files: dict[Path, ZipInfo] = {}
+        parents: set[Path] = set()
+        for member in members:
+            if member.is_dir():
+                file_obj.extract(member, destination)
+                continue
+            path = _member_path(destination, member)
+            files.pop(path, None)  # keep the position of the last member with the same path
+            files[path] = member
+            if path.parent not in parents:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                parents.add(path.parent)
+        return list(files.values())
+
+
+def _changed_members(destination: Path, members: list[ZipInfo]) -> list[ZipInfo]:
+    """Get the members that differ from the files already extracted.
+
+    Args:
+        destination: Where the archive file will be extracted to.
+        members: Members to extract.
+
+    Returns:
+        Directories and files that differ. When more than one member would be extracted
+        to the same path, only the last is compared since it is the one left after extracting.
+
+    """
+    files: dict[Path, ZipInfo] = {}
+    for member in members:
+        if not member.is_dir():
+            path = _member_path(destination, member)
+            files.pop(path, None)  # keep the position of the last member with the same path
+            files[path] = member
+    # timestamps are fixed if every file has the same one so they can't identify changes
+    fixed_timestamps = len({member.date_time for member in files.values()}) <= 1
+    changed = {
+        id(member)
+        for path, member in files.items()
+        if not _is_unchanged(path, member, fixed_timestamps=fixed_timestamps)
+    }
+    return [member for member in members if member.is_dir() or id(member) in changed]
+
+
+def _crc32(path: Path) -> int:
+    """Calculate the CRC-32 of the contents of a file."""
+    crc = 0
+    with path.open("rb") as file_obj:
+        while chunk := file_obj.read(1024 * 1024):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _is_unchanged(path: Path, member: ZipInfo, *, fixed_timestamps: bool) -> bool:
+    """Whether a member of an archive is already extracted to a path.
+
+    The size is compared first. If it matches, the file is unchanged if its
+    modification time matches the member. Otherwise, or when the archive was built
+    with ``fixed_timestamps`` (which can change a file without changing its size or
+    modification time), the CRC-32 of the file is compared. The modification time
+    of an unchanged file is set to that of the member if it differs.
+
+    """
+    try:
+        file_stat = path.lstat()
+    except OSError:
+        return False
+    if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size != member.file_size:
+        return False
+    mtime = _member_mtime(member)
+    same_mtime = int(file_stat.st_mtime) == int(mtime)
+    if (fixed_timestamps or not same_mtime) and _crc32(path) != member.CRC:
+        return False
+    if not same_mtime:
+        os.utime(path, (mtime, mtime))
+    return True
+
+
+def _member_mtime(member: ZipInfo) -> float:
+    """Get the modification time of a member as a timestamp. Zip archives store it in local time."""
+    return time.mktime((*member.date_time, 0, 0, -1))
+
+
+def _member_path(destination: Path, member: ZipInfo) -> Path:
+    """Get the path a member is extracted to, the same way as :meth:`zipfile.ZipFile.extract`."""
+    arcname = member.filename.replace("/", os.path.sep)
+    if os.path.altsep:  # cov: ignore
+        arcname = arcname.replace(os.path.altsep, os.path.sep)
+    arcname = os.path.splitdrive(arcname)[1]
+    arcname = os.path.sep.join(part for part in arcname.split(os.path.sep) if part not in ("", os.curdir, os.pardir))
+    if os.path.sep == "\\":
+        # filter characters that are not valid on Windows; not included in type stubs
+        arcname: str = cast("Any", ZipFile)._sanitize_windows_name(arcname, os.path.sep)  # noqa: SLF001 # cov: ignore
+    return destination / arcname
+
+
+def _split_members(members: list[ZipInfo], count: int) -> list[list[ZipInfo]]:
+    """Split members into batches with about the same total size.
+
+    Args:
+        members: Members to split.
+        count: Maximum number of batches.
+
+    Returns:
+        Non-empty batches. Members in each batch are in the order they are stored in the archive.
+
+    """
+    heap: list[tuple[int, int, list[ZipInfo]]] = [(0, index, []) for index in range(min(count, len(members)))]
+    for member in sorted(members, key=lambda member: member.file_size, reverse=True):
+        size, index, batch = heapq.heappop(heap)  # smallest batch
+        batch.append(member)
+        heapq.heappush(heap, (size + member.file_size, index, batch))
+    return [sorted(batch, key=lambda member: member.header_offset) for _, _, batch in sorted(heap)]
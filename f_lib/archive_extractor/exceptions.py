@@ -35,6 +35,25 @@ class ArchiveTypeError(Exception):
         return self.__class__, (self.archive, self.supported_suffix)
 
 
+class CompressionUnavailableError(Exception):
+    """Raised when an archive uses a compression that the current version of Python does not support."""
+
+    compression: str
+
+    def __init__(self, compression: str) -> None:
+        """Instantiate class."""
+        self.compression = compression
+        super().__init__(f"{compression} compression is not supported by the current version of Python")
+
+    def __reduce__(self) -> tuple[type[Exception], tuple[Any, ...]]:
+        """Exception pickling support.
+
+        https://github.com/python/cpython/issues/44791
+
+        """
+        return self.__class__, (self.compression,)
+
+
 class Pep706Error(Exception):
     """Raised when the current version of Python contains a security vulnerability."""
 
@@ -7,7 +7,18 @@ import shlex
 import subprocess
 from typing import TYPE_CHECKING, Any, cast
 
-from ._file_hash import FileHash
+from ._chunk_index import ChunkIndex
+from ._content_defined_chunker import Chunk, ContentDefinedChunker
+from ._digest_cache import DigestCache
+from ._directory_watcher import DirectoryWatcher
+from ._file_hash import FileHash, FileTreeDigest
+from ._find_duplicates import find_duplicates
+from ._hash_calibration import HASH_SECURITY, HashAlgorithmSpeed, calibrate_hash_algorithms
+from ._manifest import ManifestEntry, ManifestFormat, ManifestMismatch, read_manifest, verify_manifest, write_manifest
+from ._merkle_tree import MerkleTree, MerkleTreeChanges, MerkleTreeFile
+from ._multi_file_hash import MultiFileHash, MultiHash
+from ._tree_diff import TreeDiff, diff_trees
+from ._walk import WalkEntry, walk_files
 
 if TYPE_CHECKING:
     import pathlib
@@ -47,8 +58,33 @@ def convert_to_cli_flag(arg_name: str, *, prefix: str = "--") -> str:
 
 
 __all__ = [
+    "HASH_SECURITY",
+    "Chunk",
+    "ChunkIndex",
+    "ContentDefinedChunker",
+    "DigestCache",
+    "DirectoryWatcher",
     "FileHash",
+    "FileTreeDigest",
+    "HashAlgorithmSpeed",
+    "ManifestEntry",
+    "ManifestFormat",
+    "ManifestMismatch",
+    "MerkleTree",
+    "MerkleTreeChanges",
+    "MerkleTreeFile",
+    "MultiFileHash",
+    "MultiHash",
+    "TreeDiff",
+    "WalkEntry",
+    "calibrate_hash_algorithms",
     "convert_kwargs_to_shell_list",
     "convert_list_to_shell_str",
     "convert_to_cli_flag",
+    "diff_trees",
+    "find_duplicates",
+    "read_manifest",
+    "verify_manifest",
+    "walk_files",
+    "write_manifest",
 ]
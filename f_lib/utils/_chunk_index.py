@@ -0,0 +1,237 @@
+"""Persistent index of the chunks of files."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, Self
+
+from .._os_info import OsInfo
+from ._content_defined_chunker import Chunk
+
+if TYPE_CHECKING:
+    from collections.abc import Generator, Iterable
+    from types import TracebackType
+
+    from _typeshed import StrPath
+
+
+class ChunkIndex:
+    """Persistent index of the chunks of files, such as those found by :class:`~f_lib.utils.ContentDefinedChunker`.
+
+    The index records the digest and size of each unique chunk and the list of
+    chunks that make up each named file (e.g. each version of an artifact). It can
+    be used to find which chunks of a file are new and need to be stored or
+    transferred, and which are shared with another file.
+
+    The index is stored in a SQLite database so it can safely be used by multiple
+    threads and processes at the same time.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        import hashlib
+
+        from f_lib.utils import ChunkIndex, ContentDefinedChunker, FileHash
+
+        chunker = ContentDefinedChunker(FileHash(hashlib.sha256()))
+        with ChunkIndex() as index:
+            new_chunks = index.add("bundle-v2", chunker.chunk_file("bundle-v2.tar"))
+
+    """
+
+    FILE_NAME: ClassVar[str] = "chunk_index.sqlite3"
+    """Name of the database file when a path is not provided."""
+
+    path: Path
+    """Path to the database file."""
+
+    def __init__(self, path: StrPath | None = None, *, timeout: float = 30.0) -> None:
+        """Instantiate class.
+
+        Args:
+            path: Path to the database file. Defaults to a file in :attr:`f_lib.OsInfo.user_data_dir`.
+            timeout: Number of seconds to wait for another process to release a lock on the database.
+
+        """
+        self.path = Path(path) if path else OsInfo().user_data_dir / self.FILE_NAME
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (digest BLOB NOT NULL PRIMARY KEY, size INTEGER NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "name TEXT NOT NULL, position INTEGER NOT NULL, digest BLOB NOT NULL, "
+            "PRIMARY KEY (name, position))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS files_digest ON files (digest)")
+
+    def __contains__(self, digest: object) -> bool:
+        """Whether a chunk with the digest is in the index."""
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM chunks WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        """Number of unique chunks in the index."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def add(self, name: str, chunks: Iterable[Chunk]) -> list[Chunk]:
+        """Add a file to the index, replacing it if it already exists.
+
+        Args:
+            name: Name of the file.
+            chunks: Each chunk of the file, in order. These are collected before the
+                index is locked so other threads and processes are not blocked while
+                they are calculated (e.g. by :class:`~f_lib.utils.ContentDefinedChunker`).
+
+        Returns:
+            Chunks that were not in the index before the file was added. A chunk
+            that appears more than once in the file is only returned the first time.
+
+        """
+        chunks = list(chunks)
+        new_chunks: list[Chunk] = []
+        with self._transaction():
+            previous = self._delete_file(name)
+            for position, chunk in enumerate(chunks):
+                if self._connection.execute(
+                    "INSERT OR IGNORE INTO chunks VALUES (?, ?)", (chunk.digest, chunk.size)
+                ).rowcount:
+                    new_chunks.append(chunk)
+                self._connection.execute("INSERT INTO files VALUES (?, ?, ?)", (name, position, chunk.digest))
+            self._delete_unused_chunks(previous)
+        return new_chunks
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def diff(self, name: str, other: str) -> list[Chunk]:
+        """Find the chunks of a file that are not in another file.
+
+        For example, the chunks that must be transferred to build a new version
+        of a file from an old version.
+
+        Args:
+            name: Name of the file the chunks are found in (e.g. the new version).
+            other: Name of the file to compare against (e.g. the old version).
+
+        Returns:
+            Chunks of ``name`` whose digest is not a chunk of ``other``.
+
+        """
+        other_digests = {chunk.digest for chunk in self.get(other)}
+        return [chunk for chunk in self.get(name) if chunk.digest not in other_digests]
+
+    def get(self, name: str) -> list[Chunk]:
+        """Get the chunks of a file.
+
+        Args:
+            name: Name of the file.
+
+        Returns:
+            Each chunk of the file, in order. Empty if the file is not in the index.
+
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT files.digest, chunks.size FROM files JOIN chunks ON chunks.digest = files.digest "
+                "WHERE files.name = ? ORDER BY files.position",
+                (name,),
+            ).fetchall()
+        result: list[Chunk] = []
+        offset = 0
+        for digest, size in rows:
+            result.append(Chunk(offset, size, digest))
+            offset += size
+        return result
+
+    def missing(self, chunks: Iterable[Chunk]) -> list[Chunk]:
+        """Find chunks that are not in the index without changing it.
+
+        Args:
+            chunks: Chunks to look up.
+
+        Returns:
+            Chunks whose digest is not in the index. A digest that appears more
+            than once is only returned the first time.
+
+        """
+        result: list[Chunk] = []
+        seen: set[bytes] = set()
+        for chunk in chunks:
+            if chunk.digest not in seen and chunk.digest not in self:
+                result.append(chunk)
+            seen.add(chunk.digest)
+        return result
+
+    def names(self) -> list[str]:
+        """Names of the files in the index, sorted."""
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT DISTINCT name FROM files ORDER BY name")]
+
+    def remove(self, name: str) -> None:
+        """Remove a file and any chunks no other file uses from the index.
+
+        Args:
+            name: Name of the file.
+
+        """
+        with self._transaction():
+            self._delete_unused_chunks(self._delete_file(name))
+
+    def _delete_file(self, name: str) -> set[bytes]:
+        """Delete the chunks of a file, keeping the chunks themselves. Must be called in a transaction.
+
+        Returns:
+            Digest of each chunk the file used.
+
+        """
+        digests = {row[0] for row in self._connection.execute("SELECT digest FROM files WHERE name = ?", (name,))}
+        self._connection.execute("DELETE FROM files WHERE name = ?", (name,))
+        return digests
+
+    def _delete_unused_chunks(self, digests: Iterable[bytes]) -> None:
+        """Delete chunks that are not part of any file. Must be called in a transaction.
+
+        Args:
+            digests: Digest of each chunk to delete if it is unused.
+
+        """
+        self._connection.executemany(
+            "DELETE FROM chunks WHERE digest = ? AND NOT EXISTS (SELECT 1 FROM files WHERE digest = ?)",
+            ((digest, digest) for digest in digests),
+        )
+
+    @contextmanager
+    def _transaction(self) -> Generator[None]:
+        """Hold the lock and run statements in a transaction, rolling it back if an exception is raised."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def __enter__(self) -> Self:
+        """Enter a context manager."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit a context manager, closing the database connection."""
+        self.close()
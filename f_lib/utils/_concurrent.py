@@ -0,0 +1,75 @@
+"""Helpers for running functions concurrently."""
+
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from concurrent.futures import Executor, Future
+
+_R = TypeVar("_R")
+_T = TypeVar("_T")
+
+
+def map_bounded(
+    executor: Executor,
+    func: Callable[[_T], _R],
+    items: Iterable[_T],
+    *,
+    max_pending: int,
+    ordered: bool = True,
+) -> Iterator[tuple[_T, _R]]:
+    """Call a function for each item on an executor, limiting the number of pending calls.
+
+    Unlike :meth:`Executor.map() <concurrent.futures.Executor.map>`, items are
+    consumed lazily so memory use does not grow with the number of items.
+
+    Args:
+        executor: Executor used to call the function.
+        func: Function called with each item.
+        items: Items to pass to the function.
+        max_pending: Maximum number of calls submitted to the executor at a time.
+        ordered: Yield results in the order the items were provided. If ``False``,
+            results are yielded as soon as each call completes.
+
+    Yields:
+        Each item and the result of calling the function with it.
+
+    """
+    if ordered:
+        queue: deque[tuple[_T, Future[_R]]] = deque()
+        for item in items:
+            queue.append((item, executor.submit(func, item)))
+            if len(queue) >= max_pending:
+                yield _pop_result(queue)
+        while queue:
+            yield _pop_result(queue)
+        return
+    pending: dict[Future[_R], _T] = {}
+    for item in items:
+        pending[executor.submit(func, item)] = item
+        if len(pending) >= max_pending:
+            yield from _wait_results(pending)
+    while pending:
+        yield from _wait_results(pending)
+
+
+def _pop_result(queue: deque[tuple[_T, Future[_R]]]) -> tuple[_T, _R]:
+    """Remove the first call from a queue and wait for its result."""
+    item, future = queue.popleft()
+    return item, future.result()
+
+
+def _wait_results(pending: dict[Future[_R], _T]) -> Iterator[tuple[_T, _R]]:
+    """Wait for at least one pending call to complete and remove completed calls.
+
+    Yields:
+        Each item and the result of calling the function with it.
+
+    """
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield pending.pop(future), future.result()
@@ -0,0 +1,195 @@
+"""Split files into variable-size chunks at boundaries defined by their contents."""
+
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, ClassVar, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from _typeshed import ReadableBuffer, StrPath
+
+    from ._file_hash import FileHash
+
+
+class Chunk(NamedTuple):
+    """Chunk of a file."""
+
+    offset: int
+    """Position of the first byte of the chunk in the file."""
+
+    size: int
+    """Number of bytes in the chunk."""
+
+    digest: bytes
+    """Digest of the chunk's contents."""
+
+    @property
+    def end(self) -> int:
+        """Position after the last byte of the chunk in the file."""
+        return self.offset + self.size
+
+
+class ContentDefinedChunker:
+    """Split files into variable-size chunks at boundaries defined by their contents.
+
+    Boundaries are found using a FastCDC-style rolling "gear" hash with normalized
+    chunking. Because a boundary only depends on the bytes immediately before it,
+    inserting or removing data only changes the chunks around the change and the
+    rest of the chunks of two similar files are the same. This makes it possible
+    to compare, store, or transfer similar files by the chunks they share.
+
+    The hash is updated for each byte after the first ``min_size`` bytes of a chunk::
+
+        hash = (hash >> 1) + GEAR[byte]
+
+    A boundary is placed after a byte when ``hash & mask == 0``. A mask with more
+    bits is used until the chunk reaches ``avg_size`` bytes and a mask with fewer
+    bits is used after that, so the size of most chunks is close to ``avg_size``.
+    Boundaries are stable: the same data and sizes always result in the same chunks.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        import hashlib
+
+        from f_lib.utils import ContentDefinedChunker, FileHash
+
+        chunker = ContentDefinedChunker(FileHash(hashlib.sha256()))
+        for chunk in chunker.chunk_file("bundle.tar"):
+            print(chunk.offset, chunk.size, chunk.digest.hex())
+
+    """
+
+    DEFAULT_AVG_SIZE: ClassVar[int] = 64 * 1024  # 64 KiB
+    """Default target size of a chunk."""
+
+    GEAR: ClassVar[tuple[int, ...]] = tuple(
+        int.from_bytes(hashlib.sha256(bytes([value])).digest()[:4], "big") >> 3 for value in range(256)
+    )
+    """Random 29-bit integer for each byte value, derived from its SHA256 digest.
+
+    The values are small enough that the hash is always less than ``2**30``, which
+    CPython handles much faster than larger integers.
+
+    """
+
+    MAX_AVG_SIZE: ClassVar[int] = 2**27
+    """Largest supported ``avg_size``. Larger sizes would need more bits than the hash has."""
+
+    NORMALIZATION: ClassVar[int] = 2
+    """Number of bits added to (or removed from) the mask before (or after) ``avg_size``."""
+
+    def __init__(
+        self,
+        file_hash: FileHash,
+        *,
+        avg_size: int = DEFAULT_AVG_SIZE,
+        max_size: int | None = None,
+        min_size: int | None = None,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            file_hash: Used to calculate the digest of each chunk. Its running hash is not changed.
+            avg_size: Target size of a chunk. Must be a power of 2 from 64 to :attr:`MAX_AVG_SIZE`.
+            max_size: Maximum size of a chunk. Defaults to ``avg_size * 4``.
+            min_size: Minimum size of a chunk, except for the last chunk of a file.
+                Defaults to ``avg_size // 4``. Bytes before this are not hashed so
+                larger values are faster.
+
+        """
+        if not 64 <= avg_size <= self.MAX_AVG_SIZE or avg_size & (avg_size - 1):
+            msg = f"avg_size must be a power of 2 from 64 to {self.MAX_AVG_SIZE}, not {avg_size}"
+            raise ValueError(msg)
+        self.avg_size = avg_size
+        self.file_hash = file_hash
+        self.max_size = max_size or avg_size * 4
+        self.min_size = avg_size // 4 if min_size is None else min_size
+        if not 0 < self.min_size <= avg_size <= self.max_size:
+            msg = "sizes must satisfy 0 < min_size <= avg_size <= max_size"
+            raise ValueError(msg)
+        bits = avg_size.bit_length() - 1
+        self._mask_small = (1 << (bits + self.NORMALIZATION)) - 1
+        self._mask_large = (1 << (bits - self.NORMALIZATION)) - 1
+
+    def chunk_file(self, file_path: StrPath) -> Iterator[Chunk]:
+        """Split a file into chunks.
+
+        Args:
+            file_path: Path of the file.
+
+        Yields:
+            Each chunk of the file, in order.
+
+        """
+        with Path(file_path).open("rb") as stream:
+            yield from self.chunk_stream(stream)
+
+    def chunk_stream(self, stream: BinaryIO) -> Iterator[Chunk]:
+        """Split the contents of a stream into chunks.
+
+        The stream is read incrementally so memory use does not depend on its size.
+
+        Args:
+            stream: Binary stream to read until it is exhausted.
+
+        Yields:
+            Each chunk of the stream, in order.
+
+        """
+        buffer = bytearray()
+        offset = 0
+        read_size = max(self.max_size, self.file_hash.chunk_size or self.file_hash.DEFAULT_CHUNK_SIZE)
+        eof = False
+        while True:
+            while not eof and len(buffer) < self.max_size:
+                data = stream.read(read_size)
+                eof = not data
+                buffer += data
+            if not buffer:
+                return
+            size = self.find_boundary(buffer)
+            hash_obj = self.file_hash.new_hash()
+            with memoryview(buffer) as view, view[:size] as chunk:
+                hash_obj.update(chunk)
+            yield Chunk(offset, size, hash_obj.digest())
+            del buffer[:size]
+            offset += size
+
+    def find_boundary(self, data: ReadableBuffer) -> int:
+        """Find the end of the first chunk of data.
+
+        Args:
+            data: Data starting at the beginning of a chunk. To find the same boundary
+                as :meth:`chunk_stream`, it must contain at least ``max_size`` bytes
+                unless it is the end of the stream.
+
+        Returns:
+            Size of the first chunk.
+
+        """
+        with memoryview(data) as view:
+            size = view.nbytes
+            if size <= self.min_size:
+                return size
+            end = min(size, self.max_size)
+            normal = min(end, self.avg_size)
+            gear = self.GEAR
+            hash_value = 0
+            mask = self._mask_small
+            position = self.min_size
+            for value in view[self.min_size : normal].tobytes():
+                hash_value = (hash_value >> 1) + gear[value]
+                position += 1
+                if not hash_value & mask:
+                    return position
+            mask = self._mask_large
+            for value in view[normal:end].tobytes():
+                hash_value = (hash_value >> 1) + gear[value]
+                position += 1
+                if not hash_value & mask:
+                    return position
+        return end
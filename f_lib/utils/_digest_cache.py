@@ -0,0 +1,222 @@
+"""Persistent cache of file digests."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, ClassVar, Self
+
+from .._os_info import OsInfo
+
+if TYPE_CHECKING:
+    import os
+    from types import TracebackType
+
+    from _typeshed import StrPath
+
+
+class DigestCache:
+    """Persistent cache of file content digests keyed by the result of ``stat``.
+
+    Entries are keyed by the device, inode, size, and modification time of a file
+    along with the hash algorithm used to calculate the digest. If any of these
+    change, the cached digest is not used.
+
+    The cache is stored in a SQLite database so it can safely be used by multiple
+    threads and processes at the same time.
+
+    """
+
+    ACCESS_UPDATE_INTERVAL: ClassVar[int] = 1_000
+    """Number of cache hits between writes of when entries were last used.
+
+    When each entry was last used is kept in memory until then so a lookup does
+    not need to write to the database. Pending updates are also written before
+    entries are evicted and when the cache is closed.
+
+    """
+
+    DEFAULT_MAX_ENTRIES: ClassVar[int] = 100_000
+    """Default maximum number of entries retained in the cache."""
+
+    EVICTION_INTERVAL: ClassVar[int] = 1_000
+    """Number of new entries stored between checks for entries to evict."""
+
+    FILE_NAME: ClassVar[str] = "digest_cache.sqlite3"
+    """Name of the database file when a path is not provided."""
+
+    RACY_WINDOW_NS: ClassVar[int] = 2_000_000_000
+    """Digests of files modified this recently (in nanoseconds) are not stored.
+
+    A file could be modified again without changing its size or modification time
+    if the timestamp granularity of the filesystem is too coarse.
+
+    """
+
+    hits: int
+    """Number of lookups that returned a cached digest."""
+
+    misses: int
+    """Number of lookups that did not return a cached digest."""
+
+    path: Path
+    """Path to the database file."""
+
+    def __init__(
+        self,
+        path: StrPath | None = None,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        timeout: float = 30.0,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            path: Path to the database file. Defaults to a file in :attr:`f_lib.OsInfo.user_data_dir`.
+            max_entries: Maximum number of entries to retain. When exceeded, the
+                least recently used entries are removed.
+            timeout: Number of seconds to wait for another process to release a lock on the database.
+
+        """
+        self.path = Path(path) if path else OsInfo().user_data_dir / self.FILE_NAME
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._accessed: dict[tuple[int, int, int, int, str], int] = {}
+        self._lock = threading.Lock()
+        self._stored = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            "device INTEGER NOT NULL, inode INTEGER NOT NULL, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, algorithm TEXT NOT NULL, digest BLOB NOT NULL, "
+            "accessed_ns INTEGER NOT NULL, "
+            "PRIMARY KEY (device, inode, size, mtime_ns, algorithm))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS digests_accessed_ns ON digests (accessed_ns)")
+
+    def __len__(self) -> int:
+        """Number of entries in the cache."""
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM digests").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove all entries from the cache and reset counters."""
+        with self._lock:
+            self._accessed.clear()
+            self._connection.execute("DELETE FROM digests")
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._write_accessed()
+            self._connection.close()
+
+    def evict(self) -> int:
+        """Remove the least recently used entries until at most ``max_entries`` remain.
+
+        Returns:
+            Number of entries removed.
+
+        """
+        with self._lock:
+            self._write_accessed()
+            return self._connection.execute(
+                "DELETE FROM digests WHERE accessed_ns <= "
+                "(SELECT accessed_ns FROM digests ORDER BY accessed_ns DESC LIMIT 1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+
+    def get(self, file_stat: os.stat_result, algorithm: str) -> bytes | None:
+        """Get the cached digest of a file.
+
+        Args:
+            file_stat: Result of ``stat`` for the file.
+            algorithm: Identifier of the hash algorithm used to calculate the digest.
+
+        Returns:
+            The cached digest or ``None`` if it is not cached.
+
+        """
+        key = self._key(file_stat, algorithm)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest FROM digests WHERE device = ? AND inode = ? AND size = ? "
+                "AND mtime_ns = ? AND algorithm = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._accessed[key] = time.time_ns()
+            if len(self._accessed) >= self.ACCESS_UPDATE_INTERVAL:
+                self._write_accessed()
+        return row[0]
+
+    def set(self, file_stat: os.stat_result, algorithm: str, digest: bytes) -> None:
+        """Store the digest of a file.
+
+        Digests of files that were modified very recently are not stored.
+
+        Args:
+            file_stat: Result of ``stat`` for the file. This should be retrieved
+                before the file was read to calculate the digest.
+            algorithm: Identifier of the hash algorithm used to calculate the digest.
+            digest: Digest of the file's contents.
+
+        """
+        now = time.time_ns()
+        if now - file_stat.st_mtime_ns < self.RACY_WINDOW_NS:
+            return
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (*self._key(file_stat, algorithm), digest, now),
+            )
+            self._stored += 1
+            should_evict = self._stored % self.EVICTION_INTERVAL == 0
+        if should_evict:
+            self.evict()
+
+    def _write_accessed(self) -> None:
+        """Write when entries were last used to the database.
+
+        Must be called while holding the lock.
+
+        """
+        if not self._accessed:
+            return
+        self._connection.execute("BEGIN")
+        with self._connection:  # commits the transaction, or rolls it back if there is an error
+            self._connection.executemany(
+                "UPDATE digests SET accessed_ns = ? WHERE device = ? AND inode = ? AND size = ? "
+                "AND mtime_ns = ? AND algorithm = ?",
+                [(accessed_ns, *key) for key, accessed_ns in self._accessed.items()],
+            )
+        self._accessed.clear()
+
+    @staticmethod
+    def _key(file_stat: os.stat_result, algorithm: str) -> tuple[int, int, int, int, str]:
+        """Create the key of an entry."""
+        return (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns, algorithm)
+
+    def __enter__(self) -> Self:
+        """Enter a context manager."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit a context manager, closing the database connection."""
+        self.close()
@@ -0,0 +1,385 @@
+"""Keep the digest of a directory tree current using Linux inotify."""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import selectors
+import struct
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, ClassVar, Self
+
+from ._merkle_tree import MerkleTree
+from ._walk import PathPatternList
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from types import TracebackType
+
+    from _typeshed import StrPath
+
+    from ._file_hash import FileHash
+    from ._merkle_tree import MerkleTreeChanges
+
+LOGGER = logging.getLogger(__name__)
+
+# from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal wrapper of the Linux inotify API using ctypes."""
+
+    def __init__(self) -> None:
+        """Instantiate class.
+
+        Raises:
+            OSError: inotify is not available.
+
+        """
+        if not sys.platform.startswith("linux"):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._check(self._libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK))
+
+    def add_watch(self, path: StrPath, mask: int) -> int:
+        """Watch a directory.
+
+        Returns:
+            Watch descriptor.
+
+        """
+        return self._check(self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask))
+
+    def close(self) -> None:
+        """Close the inotify file descriptor, removing all watches."""
+        os.close(self.fd)
+
+    def read_events(self) -> Iterator[tuple[int, int, str]]:
+        """Read the events that are available without blocking.
+
+        Yields:
+            Watch descriptor, mask, and name of each event.
+
+        """
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, name
+
+    def remove_watch(self, wd: int) -> None:
+        """Stop watching a directory. Errors are ignored since the watch may already have been removed."""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    @staticmethod
+    def _check(result: int) -> int:
+        """Raise an exception if a libc function failed."""
+        if result < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        return result
+
+
+class DirectoryWatcher:
+    """Keep the digest of a directory tree current using Linux inotify.
+
+    A :class:`~f_lib.utils.MerkleTree` of the directory tree is created when the
+    watcher is started. A background thread then receives inotify events for each
+    directory in the tree and only hashes the files that changed. Events are
+    collected until none are received for ``debounce`` seconds so a file being
+    written is not hashed repeatedly. Changes are processed at least every
+    ``max_delay`` seconds so a continuous stream of events (e.g. a build writing
+    files) does not keep the digest out of date. Reading :attr:`digest` never
+    blocks or performs I/O.
+
+    When a directory is created, removed, or moved (or events are lost because
+    the kernel's queue overflowed), the tree is walked again but only files whose
+    size or modification time changed are hashed.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        import hashlib
+
+        from f_lib.utils import DirectoryWatcher, FileHash
+
+        with DirectoryWatcher("config", FileHash(hashlib.sha256())) as watcher:
+            ...
+            watcher.hexdigest  # always current
+
+    """
+
+    EVENT_MASK: ClassVar[int] = (
+        IN_ATTRIB
+        | IN_CLOSE_WRITE
+        | IN_CREATE
+        | IN_DELETE
+        | IN_DELETE_SELF
+        | IN_MODIFY
+        | IN_MOVE_SELF
+        | IN_MOVED_FROM
+        | IN_MOVED_TO
+    )
+    """Events watched for each directory."""
+
+    tree: MerkleTree
+    """Tree of the digests of the directory tree. Only modified by the background thread."""
+
+    def __init__(
+        self,
+        root: StrPath,
+        file_hash: FileHash,
+        *,
+        debounce: float = 0.05,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        max_delay: float = 1.0,
+        on_change: Callable[[MerkleTreeChanges], None] | None = None,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            root: Root directory of the tree.
+            file_hash: Used to calculate digests. Its running hash is not changed.
+            debounce: Number of seconds without events to wait before hashing changed files.
+            exclude: Gitignore-style patterns of files and directories to exclude.
+            include: Gitignore-style patterns of files to include.
+            max_delay: Maximum number of seconds to wait after the first event before
+                hashing changed files, even if events are still being received.
+            on_change: Called from the background thread with the changes each time
+                the digest of the tree changes.
+
+        """
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.on_change = on_change
+        self.tree = MerkleTree(root, file_hash, exclude=exclude, include=include)
+        self._digest = self.tree.digest
+        self._exclude = PathPatternList(self.tree.exclude)
+        self._inotify: _Inotify | None = None
+        self._thread: threading.Thread | None = None
+        self._wake_r, self._wake_w = -1, -1
+        self._watches: dict[int, str] = {}
+
+    @property
+    def digest(self) -> bytes:
+        """Digest of the directory tree as of the last change that was processed."""
+        return self._digest
+
+    @property
+    def hexdigest(self) -> str:
+        """Digest of the directory tree as a string of hexadecimal digits."""
+        return self._digest.hex()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background thread is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> Self:
+        """Start watching the directory tree.
+
+        The tree is hashed before this returns.
+
+        Raises:
+            OSError: inotify is not available or a directory could not be watched.
+            RuntimeError: The watcher is already running.
+
+        """
+        if self._thread is not None:
+            msg = "watcher is already running"
+            raise RuntimeError(msg)
+        inotify = _Inotify()
+        try:
+            self._add_watches(inotify, "")  # before hashing so changes made while hashing are not missed
+            self._update(full=True)
+        except BaseException:
+            inotify.close()
+            self._watches.clear()
+            raise
+        self._inotify = inotify
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, args=(inotify,), name="DirectoryWatcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop watching the directory tree. Changes that have not been processed are discarded."""
+        if self._thread is None:
+            return
+        os.write(self._wake_w, b"\0")
+        self._thread.join()
+        self._thread = None
+        for fd in (self._wake_r, self._wake_w):
+            os.close(fd)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+
+    def _add_watches(self, inotify: _Inotify, path: str) -> None:
+        """Watch a directory and all directories below it that are not excluded.
+
+        Args:
+            inotify: Used to add watches.
+            path: Relative path of the directory.
+
+        """
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            try:
+                wd = inotify.add_watch(self.tree.root / current, self.EVENT_MASK | IN_DONT_FOLLOW | IN_ONLYDIR)
+                self._watches[wd] = current
+                with os.scandir(self.tree.root / current) as entries:
+                    for entry in entries:
+                        rel_path = f"{current}/{entry.name}" if current else entry.name
+                        if entry.is_dir(follow_symlinks=False) and not self._exclude.matches(rel_path, is_dir=True):
+                            stack.append(rel_path)
+            except (FileNotFoundError, NotADirectoryError):
+                if not current:
+                    raise
+                # removed before it could be watched; an event for its parent triggers a full update
+
+    def _handle_event(self, inotify: _Inotify, wd: int, mask: int, name: str, paths: set[str]) -> bool:
+        """Handle an inotify event.
+
+        Args:
+            inotify: Used to add and remove watches.
+            wd: Watch descriptor.
+            mask: Event mask.
+            name: Name of the file or directory the event is for.
+            paths: Paths of files that may have changed. Updated in place.
+
+        Returns:
+            Whether the whole tree needs to be updated.
+
+        """
+        if mask & IN_Q_OVERFLOW:
+            return True
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return False
+        directory = self._watches.get(wd)
+        if directory is None:
+            return False
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            return not directory  # the root directory was removed or moved
+        path = f"{directory}/{name}" if directory else name
+        if not mask & IN_ISDIR:
+            paths.add(path)
+            return False
+        if mask & (IN_CREATE | IN_MOVED_TO) and not self._exclude.matches(path, is_dir=True):
+            self._add_watches(inotify, path)
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            self._remove_watches(inotify, path)
+        return bool(mask & (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO))
+
+    def _remove_watches(self, inotify: _Inotify, path: str) -> None:
+        """Stop watching a directory and all directories below it."""
+        for wd, directory in list(self._watches.items()):
+            if directory == path or directory.startswith(path + "/"):
+                del self._watches[wd]
+                inotify.remove_watch(wd)
+
+    def _run(self, inotify: _Inotify) -> None:
+        """Receive events until stopped. Run in the background thread."""
+        paths: set[str] = set()
+        full = False
+        deadline = 0.0  # monotonic time when pending changes are processed even if events are still received
+        with selectors.DefaultSelector() as selector:
+            selector.register(inotify.fd, selectors.EVENT_READ)
+            selector.register(self._wake_r, selectors.EVENT_READ)
+            while True:
+                timeout = None
+                if paths or full:
+                    timeout = max(0.0, min(self.debounce, deadline - time.monotonic()))
+                ready = selector.select(timeout)
+                if any(key.fd == self._wake_r for key, _ in ready):
+                    return
+                if ready:
+                    if not (paths or full):
+                        deadline = time.monotonic() + self.max_delay
+                    for wd, mask, name in inotify.read_events():
+                        full = self._handle_event(inotify, wd, mask, name, paths) or full
+                # no events for debounce seconds or events received for max_delay seconds
+                if (paths or full) and (not ready or time.monotonic() >= deadline):
+                    if self._update(paths, full=full):
+                        paths.clear()
+                        full = False
+                    else:  # walk the whole tree next time in case changes were missed
+                        deadline = time.monotonic() + self.max_delay
+                        full = True
+
+    def _update(self, paths: Iterable[str] = (), *, full: bool = False) -> bool:
+        """Update the tree and the digest.
+
+        In the background thread, errors updating the tree and errors raised by
+        ``on_change`` are logged instead of stopping the thread.
+
+        Args:
+            paths: Paths of files that may have changed.
+            full: Walk the whole tree instead of only checking ``paths``.
+
+        Returns:
+            Whether the tree was updated. If ``False``, the update should be retried.
+
+        """
+        try:
+            changes = self.tree.update() if full else self.tree.update_paths(paths)
+        except OSError:
+            if not self._thread:
+                raise
+            LOGGER.warning("failed to update digest of %s", self.tree.root, exc_info=True)
+            return False
+        self._digest = self.tree.digest
+        if changes and self.on_change:
+            try:
+                self.on_change(changes)
+            except Exception:
+                if not self._thread:
+                    raise
+                LOGGER.exception("error in on_change callback of watcher for %s", self.tree.root)
+        return True
+
+    def __enter__(self) -> Self:
+        """Enter a context manager, starting the watcher."""
+        return self.start()
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Exit a context manager, stopping the watcher."""
+        self.stop()
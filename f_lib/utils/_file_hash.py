@@ -2,43 +2,132 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import mmap
+import os
+import stat
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, partial
 from pathlib import Path
-from typing import TYPE_CHECKING, ClassVar
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple, Self
+
+from ._hash_calibration import calibrate_hash_algorithms
+from ._walk import walk_files
 
 if TYPE_CHECKING:
-    import hashlib
-    from collections.abc import Iterable
+    from collections.abc import Callable, Iterable, Iterator
+    from concurrent.futures import Executor, Future
+    from io import FileIO
+
+    from _typeshed import ReadableBuffer, StrPath, SupportsRead
+
+    from ._digest_cache import DigestCache
+
+
+class FileTreeDigest(NamedTuple):
+    """Result of hashing a file as a tree of fixed-size leaves."""
+
+    root: bytes
+    """Digest calculated from the digest of each leaf."""
+
+    leaves: tuple[bytes, ...]
+    """Digest of each leaf, in the order they appear in the file."""
 
-    from _typeshed import StrPath
+    leaf_size: int
+    """Number of bytes in each leaf. The last leaf may be smaller."""
+
+    size: int
+    """Size of the file in bytes."""
+
+    @property
+    def hexdigest(self) -> str:
+        """Root digest as a string of hexadecimal digits."""
+        return self.root.hex()
 
 
 class FileHash:
     """Wrapper for hashlib to easily calculate file hashes.
 
     Attributes:
-        DEFAULT_CHUNK_SIZE: Default chunk size if not defined.
+        COMBINED_DIGEST_VERSION: Version of the combined digest format used by
+            :meth:`add_files_parallel`.
+        ASYNC_CONCURRENCY: Default maximum number of files hashed at the same time
+            by :meth:`add_files_async`.
+        DEFAULT_CHUNK_SIZE: Default chunk size if not defined. When possible, this
+            is rounded up to a multiple of the block size of the file being read.
+        MMAP_THRESHOLD: Default minimum file size, in bytes, for a file to be
+            memory-mapped instead of being read into a buffer.
+        READAHEAD_SIZE: Default number of bytes ahead of the current position that
+            the kernel is asked to read when ``fadvise`` is enabled.
+        TREE_LEAF_SIZE: Default size, in bytes, of each leaf when hashing a file as a tree.
 
     Note:
         Does not support algorithms with variable length digests (e.g. SHAKE).
 
     """
 
-    DEFAULT_CHUNK_SIZE: ClassVar[int] = (
-        1024 * 10_000_000  # 10mb - number of bytes in each read operation
-    )
+    ASYNC_CONCURRENCY: ClassVar[int] = 8
+
+    COMBINED_DIGEST_VERSION: ClassVar[int] = 1
+
+    DEFAULT_CHUNK_SIZE: ClassVar[int] = 1024 * 1024  # 1 MiB - number of bytes in each read operation
+
+    MMAP_THRESHOLD: ClassVar[int] = 64 * 1024 * 1024  # 64 MiB
 
-    def __init__(self, hash_alg: hashlib._Hash, *, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    READAHEAD_SIZE: ClassVar[int] = 8 * 1024 * 1024  # 8 MiB
+
+    TREE_LEAF_SIZE: ClassVar[int] = 64 * 1024 * 1024  # 64 MiB
+
+    def __init__(
+        self,
+        hash_alg: hashlib._Hash,
+        *,
+        cache: DigestCache | None = None,
+        chunk_size: int | None = None,
+        fadvise: bool = False,
+        mmap_threshold: int | None = MMAP_THRESHOLD,
+        readahead: int | None = None,
+    ) -> None:
         """Instantiate class.
 
         Args:
             hash_alg: Instance of a hashlib algorithm.
+            cache: Optional cache of file digests. When provided, the digest of a
+                file that has not changed since it was last hashed is reused instead
+                of reading the file again. Only methods that use the digest of each
+                file (e.g. :meth:`hash_file`, :meth:`add_files_parallel`) can use the
+                cache since other methods add the contents of the file to the hash.
+                The cache is not used if ``hash_alg`` was created with parameters that
+                change its digest (e.g. the ``key`` or ``person`` of BLAKE2) or already
+                contains data since :attr:`algorithm` does not identify them.
             chunk_size: When reading a file, it will be read this many bytes at
                 a time. Larger values are more time efficient while smaller
-                values or more memory efficient.
+                values or more memory efficient. If not provided, it is derived
+                from :attr:`DEFAULT_CHUNK_SIZE` and the block size of each file.
+            fadvise: Keep files that are hashed from filling the page cache. The kernel
+                is told (using ``posix_fadvise``) that each file is read sequentially,
+                to read ahead of the current position, and to drop each chunk from the
+                page cache once it is hashed. This is intended for hashing large files
+                once (e.g. backups) without evicting the working set of other processes.
+                Files are not memory-mapped unless requested. Ignored where
+                ``posix_fadvise`` is not available (e.g. macOS, Windows).
+            mmap_threshold: Files that are at least this many bytes are memory-mapped
+                instead of being read into a buffer. This avoids copying the contents
+                of large files. If ``None``, files are only memory-mapped when requested.
+            readahead: Number of bytes ahead of the current position the kernel is asked
+                to read when ``fadvise`` is enabled. Defaults to :attr:`READAHEAD_SIZE`.
 
         """
         self._hash = hash_alg  # protected to discourage direct access
+        # pristine copy used to create a new hash object for each file when hashing in parallel
+        self._hash_template = hash_alg.copy()
+        self.cache = cache
         self.chunk_size = chunk_size
+        self.fadvise = fadvise
+        self.mmap_threshold = mmap_threshold
+        self.readahead = readahead
 
     @property
     def digest(self) -> bytes:
@@ -51,6 +140,15 @@ class FileHash:
         """
         return self._hash.digest()
 
+    @property
+    def algorithm(self) -> str:
+        """Identifier of the hash algorithm used to calculate the digest of each file.
+
+        Used to identify digests in a :class:`~f_lib.utils.DigestCache`.
+
+        """
+        return f"{self._hash.name}-{self._hash.digest_size * 8}"
+
     @property
     def digest_size(self) -> int:
         """Size of the resulting hash in bytes."""
@@ -67,17 +165,134 @@ class FileHash:
         """
         return self._hash.hexdigest()
 
-    def add_file(self, file_path: StrPath) -> None:
+    @classmethod
+    def fastest(
+        cls,
+        *,
+        cache: DigestCache | None = None,
+        chunk_size: int | None = None,
+        fadvise: bool = False,
+        min_security: int = 0,
+        mmap_threshold: int | None = MMAP_THRESHOLD,
+        readahead: int | None = None,
+    ) -> Self:
+        """Create an instance using the fastest hash algorithm on this host.
+
+        Algorithms are ranked by :func:`~f_lib.utils.calibrate_hash_algorithms`,
+        which measures their speed the first time it is used on a host. The
+        default is intended for change detection, where security does not matter.
+
+        Args:
+            cache: Optional cache of file digests. Only passed to the class when provided
+                so subclasses that do not support a cache can be created.
+            chunk_size: When reading a file, it will be read this many bytes at a time.
+            fadvise: Keep files that are hashed from filling the page cache.
+            min_security: Minimum collision resistance of the algorithm in bits
+                (e.g. ``128`` to exclude MD5 and SHA-1). See :data:`~f_lib.utils.HASH_SECURITY`.
+            mmap_threshold: Files that are at least this many bytes are memory-mapped
+                instead of being read into a buffer.
+            readahead: Number of bytes ahead of the current position the kernel is asked
+                to read when ``fadvise`` is enabled.
+
+        Raises:
+            ValueError: No available algorithm is secure enough.
+
+        """
+        kwargs: dict[str, Any] = {"cache": cache} if cache is not None else {}
+        for speed in calibrate_hash_algorithms():
+            if speed.security >= min_security:
+                return cls(
+                    hashlib.new(speed.name),
+                    chunk_size=chunk_size,
+                    fadvise=fadvise,
+                    mmap_threshold=mmap_threshold,
+                    readahead=readahead,
+                    **kwargs,
+                )
+        msg = f"no available hash algorithm has a security of at least {min_security} bits"
+        raise ValueError(msg)
+
+    def add_file(self, file_path: StrPath, *, use_mmap: bool | None = None) -> None:
         """Add file contents to the hash.
 
         Args:
             file_path: Path of the file to add.
+            use_mmap: Whether to memory-map the file instead of reading it into a buffer.
+                If not provided, this is determined by ``mmap_threshold``.
+                Files that can't be memory-mapped (e.g. pipes, empty files) are
+                always read into a buffer.
+
+        """
+        self._update_from_file(self._hash, file_path, use_mmap=use_mmap)
+
+    def add_buffer(self, buffer: ReadableBuffer) -> None:
+        """Add the contents of a buffer to the hash.
+
+        Any object that supports the buffer protocol (e.g. :class:`bytes`,
+        :class:`bytearray`, :class:`memoryview`, :class:`mmap.mmap`, NumPy arrays)
+        is hashed in place without being copied.
+
+        Args:
+            buffer: C-contiguous buffer to add.
+
+        """
+        with memoryview(buffer) as view:
+            self._hash.update(view)
+
+    def add_directory(
+        self,
+        root: StrPath,
+        *,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+        max_workers: int | None = None,
+        parallel: bool = False,
+    ) -> None:
+        """Add all files in a directory tree to the hash.
+
+        The tree is walked with :func:`~f_lib.utils.walk_files` and files are added
+        in the canonical order it returns. The name of each file is its path relative
+        to ``root`` using ``/`` as the separator, regardless of the operating system.
+        Otherwise, the result is the same as :meth:`add_files` (or :meth:`add_files_parallel`
+        if ``parallel``) with ``relative_to=root``.
+
+        Args:
+            root: Root directory of the tree.
+            exclude: Gitignore-style patterns of files and directories to exclude.
+            include: Gitignore-style patterns of files to include.
+            max_workers: Maximum number of threads used to hash files when ``parallel``.
+            parallel: Read and hash files in parallel.
+
+        """
+        entries = walk_files(root, exclude=exclude, include=include)
+        if parallel:
+            self._add_digests_parallel(
+                (((entry.path + "\0").encode(), partial(self._hash_dir_entry, entry.entry)) for entry in entries),
+                max_workers=max_workers,
+            )
+            return
+        for entry in entries:
+            self._hash.update((entry.path + "\0").encode())
+            self._update_from_file(self._hash, entry.entry.path)
+            self._hash.update(b"\0")
+
+    async def add_file_async(self, file_path: StrPath, *, executor: Executor | None = None) -> None:
+        """Add file contents to the hash without blocking the event loop.
+
+        Each chunk is read and hashed in ``executor``. The contents are hashed
+        into a copy of the hash which replaces it once the whole file has been
+        hashed so, if the task is cancelled, the hash is not changed. Concurrent
+        calls on the same instance are not supported.
+
+        Args:
+            file_path: Path of the file to add.
+            executor: Executor used to read and hash the file.
+                Defaults to the event loop's default executor.
 
         """
-        with Path.open(Path(file_path), "rb") as stream:
-            while chunk := stream.read(self.chunk_size):
-                self._hash.update(chunk)
-                chunk = stream.read(self.chunk_size)  # read in new chunk
+        hash_obj = self._hash.copy()
+        await self._update_from_file_async(hash_obj, file_path, executor=executor)
+        self._hash = hash_obj
 
     def add_file_name(
         self,
@@ -98,9 +313,27 @@ class FileHash:
                 this one. It is recommended that both paths be absolute.
 
         """
-        self._hash.update(
-            (str(Path(file_path).relative_to(relative_to) if relative_to else Path(file_path)) + end_character).encode()
-        )
+        self._hash.update(self._encode_file_name(file_path, end_character=end_character, relative_to=relative_to))
+
+    def add_file_tree(
+        self, file_path: StrPath, *, leaf_size: int | None = None, max_workers: int | None = None
+    ) -> FileTreeDigest:
+        """Add the root digest of a file, hashed as a tree, to the hash.
+
+        See :meth:`hash_file_tree` for details.
+
+        Args:
+            file_path: Path of the file to add.
+            leaf_size: Number of bytes in each leaf.
+            max_workers: Maximum number of threads used to hash leaves.
+
+        Returns:
+            Result of hashing the file as a tree.
+
+        """
+        result = self.hash_file_tree(file_path, leaf_size=leaf_size, max_workers=max_workers)
+        self._hash.update(result.root)
+        return result
 
     def add_files(
         self,
@@ -123,3 +356,518 @@ class FileHash:
             self.add_file(fp)
             # end of file contents; only necessary with multiple files
             self._hash.update(b"\0")
+
+    def add_files_parallel(
+        self,
+        file_paths: Iterable[StrPath],
+        *,
+        max_workers: int | None = None,
+        relative_to: StrPath | None = None,
+    ) -> None:
+        r"""Add files to the hash, reading and hashing their contents in parallel.
+
+        Each file is hashed into its own hash object on a bounded thread pool.
+        The results are then combined, in the order the files were provided,
+        using the combined digest format below. The result does not depend on
+        the number of workers but it does differ from the result of :meth:`add_files`.
+
+        Combined digest format (version 1)::
+
+            b"f-lib.FileHash.v1\0"
+            for each file:
+                <file name> b"\0" <digest of file contents>
+
+        ``<file name>`` is encoded the same way as :meth:`add_file_name` and
+        ``<digest of file contents>`` is the raw digest (``digest_size`` bytes)
+        of a copy of the hash object provided when the class was instantiated.
+
+        Args:
+            file_paths: Paths of the files to add. The full path (or relative) is
+                included when adding it to the hash. This is not resolved prior
+                to use. It is used as-is unless another argument acts up it.
+            max_workers: Maximum number of threads used to hash files.
+                Defaults to the same value as :class:`~concurrent.futures.ThreadPoolExecutor`.
+            relative_to: Optionally, convert the file_path to path relative to
+                this one. It is recommended that both paths be absolute.
+
+        """
+        self._add_digests_parallel(
+            ((self._encode_file_name(fp, relative_to=relative_to), partial(self.hash_file, fp)) for fp in file_paths),
+            max_workers=max_workers,
+        )
+
+    async def add_files_async(
+        self,
+        file_paths: Iterable[StrPath],
+        *,
+        concurrency: int | None = None,
+        executor: Executor | None = None,
+        relative_to: StrPath | None = None,
+    ) -> None:
+        """Add files to the hash, hashing their contents concurrently without blocking the event loop.
+
+        The result is the same as :meth:`add_files_parallel`. If the task is
+        cancelled, the hash is not changed and files still being hashed are cancelled.
+
+        Args:
+            file_paths: Paths of the files to add.
+            concurrency: Maximum number of files hashed at the same time.
+                Defaults to :attr:`ASYNC_CONCURRENCY`.
+            executor: Executor used to read and hash files.
+                Defaults to the event loop's default executor.
+            relative_to: Optionally, convert the file_path to path relative to
+                this one. It is recommended that both paths be absolute.
+
+        """
+        hash_obj = self._hash.copy()
+        hash_obj.update(f"f-lib.FileHash.v{self.COMBINED_DIGEST_VERSION}\0".encode())
+        concurrency = concurrency or self.ASYNC_CONCURRENCY
+        pending: deque[tuple[bytes, asyncio.Task[bytes]]] = deque()
+        try:
+            for fp in file_paths:
+                name = self._encode_file_name(fp, relative_to=relative_to)
+                pending.append((name, asyncio.create_task(self.hash_file_async(fp, executor=executor))))
+                if len(pending) >= concurrency:
+                    name, task = pending.popleft()
+                    hash_obj.update(name + await task)
+            while pending:
+                name, task = pending.popleft()
+                hash_obj.update(name + await task)
+        finally:
+            for _, task in pending:
+                task.cancel()
+            await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+        self._hash = hash_obj
+
+    def add_iter(self, chunks: Iterable[ReadableBuffer]) -> None:
+        """Add each chunk of data produced by an iterable to the hash.
+
+        Chunks are hashed as they are produced (e.g. by a generator) so the
+        data never needs to be held in memory or written to disk.
+
+        Args:
+            chunks: Iterable of buffers to add, in order.
+
+        """
+        for chunk in chunks:
+            self.add_buffer(chunk)
+
+    def add_stream(self, stream: SupportsRead[bytes], *, chunk_size: int | None = None) -> int:
+        """Add the contents of a binary stream to the hash.
+
+        The stream is read until it is exhausted, at most ``chunk_size`` bytes
+        at a time, so memory use does not depend on the amount of data. Streams
+        that don't support seeking (e.g. pipes, ``subprocess`` output,
+        :meth:`socket.makefile`) can be hashed while the data is being produced.
+        If the stream has a ``readinto`` method, a single buffer is reused for every read.
+
+        Args:
+            stream: Blocking binary stream to read.
+            chunk_size: Maximum number of bytes to read at a time.
+                Defaults to ``chunk_size`` of this object or :attr:`DEFAULT_CHUNK_SIZE`.
+
+        Returns:
+            Number of bytes read from the stream.
+
+        """
+        return self._update_from_readable(self._hash, stream, chunk_size or self.chunk_size or self.DEFAULT_CHUNK_SIZE)
+
+    def hash_file(
+        self, file_path: StrPath, *, file_stat: os.stat_result | None = None, use_mmap: bool | None = None
+    ) -> bytes:
+        """Calculate the digest of a single file's contents.
+
+        The file is hashed using a new copy of the hash object provided when the
+        class was instantiated. The hash of this object is not changed.
+        If a ``cache`` was provided, it is used to avoid reading unchanged files.
+
+        Args:
+            file_path: Path of the file to hash.
+            file_stat: Result of ``stat`` for the file, if already known.
+                Used to look up the digest in the ``cache``.
+            use_mmap: Whether to memory-map the file instead of reading it into a buffer.
+                If not provided, this is determined by ``mmap_threshold``.
+
+        Returns:
+            Digest of the file's contents.
+
+        """
+        if self.cache is None or not self._cacheable:
+            file_hash = self.new_hash()
+            self._update_from_file(file_hash, file_path, use_mmap=use_mmap)
+            return file_hash.digest()
+        if (digest := self.cache.get(file_stat or Path(file_path).stat(), self.algorithm)) is not None:
+            return digest
+        file_hash = self.new_hash()
+        file_stat = self._update_from_file(file_hash, file_path, use_mmap=use_mmap)
+        digest = file_hash.digest()
+        self.cache.set(file_stat, self.algorithm, digest)
+        return digest
+
+    async def hash_file_async(self, file_path: StrPath, *, executor: Executor | None = None) -> bytes:
+        """Calculate the digest of a single file's contents without blocking the event loop.
+
+        The async counterpart of :meth:`hash_file`. Each chunk is read and hashed in
+        ``executor`` so the task can be cancelled between chunks.
+
+        Args:
+            file_path: Path of the file to hash.
+            executor: Executor used to read and hash the file.
+                Defaults to the event loop's default executor.
+
+        Returns:
+            Digest of the file's contents.
+
+        """
+        loop = asyncio.get_running_loop()
+        if self.cache is None or not self._cacheable:
+            hash_obj = self.new_hash()
+            await self._update_from_file_async(hash_obj, file_path, executor=executor)
+            return hash_obj.digest()
+        file_stat = await loop.run_in_executor(executor, os.stat, file_path)
+        if (digest := await loop.run_in_executor(executor, self.cache.get, file_stat, self.algorithm)) is not None:
+            return digest
+        hash_obj = self.new_hash()
+        file_stat = await self._update_from_file_async(hash_obj, file_path, executor=executor)
+        digest = hash_obj.digest()
+        await loop.run_in_executor(executor, self.cache.set, file_stat, self.algorithm, digest)
+        return digest
+
+    def hash_file_tree(
+        self, file_path: StrPath, *, leaf_size: int | None = None, max_workers: int | None = None
+    ) -> FileTreeDigest:
+        r"""Calculate the digest of a file by hashing fixed-size leaves of it in parallel.
+
+        Each leaf is hashed on a thread pool using a new copy of the hash object
+        provided when the class was instantiated. The root digest is then calculated
+        from the digest of each leaf (version 1)::
+
+            b"f-lib.FileHash.tree.v1\0" <leaf_size> <size> <digest of leaf 0> ... <digest of leaf n>
+
+        ``<leaf_size>`` and ``<size>`` (the size of the file) are 8 byte, big-endian,
+        unsigned integers. An empty file has no leaves. The root digest depends on
+        ``leaf_size`` but not the number of workers and is different from the digest
+        of the file's contents. The hash of this object is not changed.
+
+        Args:
+            file_path: Path of the file to hash.
+            leaf_size: Number of bytes in each leaf. Defaults to :attr:`TREE_LEAF_SIZE`.
+            max_workers: Maximum number of threads used to hash leaves.
+
+        Returns:
+            Result of hashing the file as a tree. The digest of each leaf can be used
+            with :meth:`verify_file_tree` to verify parts of the file.
+
+        """
+        leaf_size = leaf_size or self.TREE_LEAF_SIZE
+        size = Path(file_path).stat().st_size
+        leaves = tuple(
+            self._hash_leaves(file_path, range(-(-size // leaf_size)), leaf_size=leaf_size, max_workers=max_workers)
+        )
+        root = self.new_hash()
+        root.update(b"f-lib.FileHash.tree.v1\0")
+        root.update(leaf_size.to_bytes(8, "big") + size.to_bytes(8, "big"))
+        for leaf in leaves:
+            root.update(leaf)
+        return FileTreeDigest(root.digest(), leaves, leaf_size, size)
+
+    def new_hash(self) -> hashlib._Hash:
+        """Create a new hash object.
+
+        Returns:
+            A copy of the hash object provided when the class was instantiated.
+
+        """
+        return self._hash_template.copy()
+
+    def verify_file_tree(
+        self,
+        file_path: StrPath,
+        tree: FileTreeDigest,
+        *,
+        leaves: Iterable[int] | None = None,
+        max_workers: int | None = None,
+    ) -> list[int]:
+        """Verify leaves of a file against the result of :meth:`hash_file_tree`.
+
+        Only the requested leaves are read from the file.
+
+        Args:
+            file_path: Path of the file to verify.
+            tree: Previous result of hashing the file as a tree.
+            leaves: Index of each leaf to verify. Defaults to all leaves.
+            max_workers: Maximum number of threads used to hash leaves.
+
+        Returns:
+            Index of each leaf that does not match. If the size of the file changed,
+            every requested leaf is considered to not match.
+
+        """
+        indexes = sorted(set(range(len(tree.leaves)) if leaves is None else leaves))
+        if Path(file_path).stat().st_size != tree.size:
+            return indexes
+        invalid = [index for index in indexes if not 0 <= index < len(tree.leaves)]
+        indexes = [index for index in indexes if 0 <= index < len(tree.leaves)]
+        digests = self._hash_leaves(file_path, indexes, leaf_size=tree.leaf_size, max_workers=max_workers)
+        return sorted(
+            invalid + [index for index, digest in zip(indexes, digests, strict=True) if digest != tree.leaves[index]]
+        )
+
+    @cached_property
+    def _cacheable(self) -> bool:
+        """Whether digests are identified by :attr:`algorithm` so they can be cached.
+
+        The digest of a probe is compared with that of a new hash object created
+        using only the name and digest size of the algorithm.
+
+        """
+        try:
+            standard: hashlib._Hash = hashlib.new(self._hash.name)
+            if standard.digest_size != self._hash.digest_size:  # e.g. BLAKE2 with a digest_size
+                standard = getattr(hashlib, self._hash.name)(digest_size=self._hash.digest_size)
+        except (AttributeError, TypeError, ValueError):  # not available or does not accept digest_size
+            return False
+        probe = self.new_hash()
+        probe.update(b"f_lib")
+        standard.update(b"f_lib")
+        return probe.digest() == standard.digest()
+
+    def _add_digests_parallel(
+        self, files: Iterable[tuple[bytes, Callable[[], bytes]]], *, max_workers: int | None = None
+    ) -> None:
+        """Add files to the hash using the combined digest format.
+
+        Args:
+            files: Encoded name of each file and a function that returns its digest.
+                The functions are called on a thread pool.
+            max_workers: Maximum number of threads used to hash files.
+
+        """
+        self._hash.update(f"f-lib.FileHash.v{self.COMBINED_DIGEST_VERSION}\0".encode())
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        # limit the number of pending futures so memory use does not grow with the number of files
+        max_pending = max_workers * 2
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="FileHash") as executor:
+            pending: deque[tuple[bytes, Future[bytes]]] = deque()
+            for name, func in files:
+                pending.append((name, executor.submit(func)))
+                if len(pending) >= max_pending:
+                    self._add_digest_result(*pending.popleft())
+            while pending:
+                self._add_digest_result(*pending.popleft())
+
+    def _add_digest_result(self, name: bytes, future: Future[bytes]) -> None:
+        """Add the result of hashing a file in parallel to the hash."""
+        self._hash.update(name)
+        self._hash.update(future.result())
+
+    @staticmethod
+    def _encode_file_name(
+        file_path: StrPath, *, end_character: str = "\0", relative_to: StrPath | None = None
+    ) -> bytes:
+        """Encode a file name to be added to the hash."""
+        return (
+            str(Path(file_path).relative_to(relative_to) if relative_to else Path(file_path)) + end_character
+        ).encode()
+
+    def _hash_leaf(self, file_path: StrPath, index: int, leaf_size: int) -> bytes:
+        """Calculate the digest of one leaf of a file.
+
+        Each call opens its own handle to the file so leaves can be read in parallel.
+
+        """
+        hash_obj = self.new_hash()
+        with Path(file_path).open("rb", buffering=0) as stream:
+            stream.seek(index * leaf_size)
+            buffer = bytearray(min(self._get_chunk_size(os.fstat(stream.fileno())), leaf_size))
+            view = memoryview(buffer)
+            remaining = leaf_size
+            while remaining and (size := stream.readinto(view[: min(remaining, len(buffer))])):
+                hash_obj.update(view[:size])
+                remaining -= size
+        return hash_obj.digest()
+
+    def _hash_leaves(
+        self, file_path: StrPath, indexes: Iterable[int], *, leaf_size: int, max_workers: int | None = None
+    ) -> Iterator[bytes]:
+        """Calculate the digest of leaves of a file in parallel.
+
+        Returns:
+            Digest of each leaf in the order of ``indexes``.
+
+        """
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="FileHash") as executor:
+            yield from executor.map(partial(self._hash_leaf, file_path, leaf_size=leaf_size), indexes)
+
+    def _hash_dir_entry(self, entry: os.DirEntry[str]) -> bytes:
+        """Calculate the digest of a file found when walking a directory tree."""
+        return self.hash_file(entry.path, file_stat=entry.stat() if self.cache else None)
+
+    def _get_chunk_size(self, file_stat: os.stat_result) -> int:
+        """Get the number of bytes to read at a time from a file.
+
+        Args:
+            file_stat: Result of ``stat`` for the file being read.
+
+        """
+        if self.chunk_size:
+            return self.chunk_size
+        block_size = getattr(file_stat, "st_blksize", 0)  # not available on Windows
+        if block_size <= 0:
+            return self.DEFAULT_CHUNK_SIZE
+        return max(1, -(-self.DEFAULT_CHUNK_SIZE // block_size)) * block_size
+
+    def _should_mmap(self, file_stat: os.stat_result, *, use_mmap: bool | None = None) -> bool:
+        """Determine if a file should be memory-mapped.
+
+        Args:
+            file_stat: Result of ``stat`` for the file being read.
+            use_mmap: Explicit choice made by the caller.
+
+        """
+        if use_mmap is False or not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size <= 0:
+            return False
+        if use_mmap:
+            return True
+        return not self.fadvise and self.mmap_threshold is not None and file_stat.st_size >= self.mmap_threshold
+
+    def _update_from_file(
+        self, hash_obj: hashlib._Hash, file_path: StrPath, *, use_mmap: bool | None = None
+    ) -> os.stat_result:
+        """Update a hash object with the contents of a file.
+
+        A single buffer is allocated and reused for every read so memory use
+        does not depend on the size of the file.
+
+        Returns:
+            Result of ``stat`` for the file before it was read.
+
+        """
+        with Path(file_path).open("rb", buffering=0) as stream:
+            file_stat = os.fstat(stream.fileno())
+            if self._should_mmap(file_stat, use_mmap=use_mmap) and self._update_from_mmap(hash_obj, stream, file_stat):
+                return file_stat
+            if self.fadvise and hasattr(os, "posix_fadvise") and stat.S_ISREG(file_stat.st_mode):
+                self._update_from_file_fadvise(hash_obj, stream, file_stat)
+            else:
+                self._update_from_readable(hash_obj, stream, self._get_chunk_size(file_stat))
+        return file_stat
+
+    def _update_from_file_fadvise(self, hash_obj: hashlib._Hash, stream: FileIO, file_stat: os.stat_result) -> None:
+        """Update a hash object with the contents of a file without leaving them in the page cache.
+
+        The kernel is asked to keep ``readahead`` bytes ahead of the current position
+        in the page cache and to drop each chunk once it has been hashed.
+
+        """
+        fd = stream.fileno()
+        readahead = self.readahead or self.READAHEAD_SIZE
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(fd, 0, readahead, os.POSIX_FADV_WILLNEED)
+        view = memoryview(bytearray(self._get_chunk_size(file_stat)))
+        offset = 0
+        while size := stream.readinto(view):
+            hash_obj.update(view[:size])
+            os.posix_fadvise(fd, offset, size, os.POSIX_FADV_DONTNEED)
+            os.posix_fadvise(fd, offset + readahead, size, os.POSIX_FADV_WILLNEED)  # keep the window full
+            offset += size
+
+    async def _update_from_file_async(
+        self, hash_obj: hashlib._Hash, file_path: StrPath, *, executor: Executor | None = None
+    ) -> os.stat_result:
+        """Update a hash object with the contents of a file without blocking the event loop.
+
+        Returns:
+            Result of ``stat`` for the file before it was read.
+
+        """
+        loop = asyncio.get_running_loop()
+        stream = await loop.run_in_executor(executor, partial(Path(file_path).open, "rb", buffering=0))
+        pending: asyncio.Future[int] | None = None
+        try:
+            file_stat = os.fstat(stream.fileno())
+            view = memoryview(bytearray(self._get_chunk_size(file_stat)))
+            while True:
+                pending = loop.run_in_executor(executor, self._update_from_stream, hash_obj, stream, view)
+                # shielded so cancelling the task does not mark the read as done while it is still running
+                if not await asyncio.shield(pending):
+                    return file_stat
+        finally:
+            if pending and not pending.done():
+                # the stream can't be closed while it is being read (e.g. the task was cancelled)
+                pending.add_done_callback(lambda _: stream.close())
+            else:
+                stream.close()
+
+    @staticmethod
+    def _update_from_readable(hash_obj: hashlib._Hash, stream: SupportsRead[bytes], chunk_size: int) -> int:
+        """Update a hash object with the contents of a stream until it is exhausted.
+
+        Returns:
+            Number of bytes read.
+
+        """
+        total = 0
+        readinto: Callable[[memoryview], int | None] | None = getattr(stream, "readinto", None)
+        if readinto is None:
+            while data := stream.read(chunk_size):
+                hash_obj.update(data)
+                total += len(data)
+            return total
+        view = memoryview(bytearray(chunk_size))
+        while size := readinto(view):
+            hash_obj.update(view[:size])
+            total += size
+        return total
+
+    @staticmethod
+    def _update_from_stream(hash_obj: hashlib._Hash, stream: FileIO, view: memoryview) -> int:
+        """Read the next chunk of a stream into a buffer and update a hash object with it.
+
+        Returns:
+            Number of bytes read.
+
+        """
+        if size := stream.readinto(view):
+            hash_obj.update(view[:size])
+        return size
+
+    def _update_from_mmap(self, hash_obj: hashlib._Hash, stream: FileIO, file_stat: os.stat_result) -> bool:
+        """Update a hash object with the contents of a file by memory-mapping it.
+
+        Slices of the mapped file are passed directly to the hash object so the
+        contents are never copied into a buffer. Pages are released once they are
+        hashed so memory use does not grow with the size of the file.
+
+        Accessing a page past the end of a file that was truncated while it is mapped
+        kills the process (``SIGBUS``), so the size of the file is checked before
+        each slice is hashed. If the file is now shorter, the rest of it is read
+        into a buffer instead.
+
+        Returns:
+            Whether the file could be memory-mapped. If ``False``, the hash object was not updated.
+
+        """
+        try:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # e.g. filesystem does not support mmap
+            return False
+        with mapped:
+            if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):  # not available on Windows
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            release = hasattr(mapped, "madvise") and hasattr(mmap, "MADV_DONTNEED")  # not available on Windows
+            released = 0
+            chunk_size = self._get_chunk_size(file_stat)
+            with memoryview(mapped) as view:
+                for offset in range(0, len(view), chunk_size):
+                    if os.fstat(stream.fileno()).st_size < min(offset + chunk_size, len(view)):  # truncated
+                        stream.seek(offset)
+                        self._update_from_readable(hash_obj, stream, chunk_size)
+                        break
+                    hash_obj.update(view[offset : offset + chunk_size])
+                    # the start of the range must be aligned to a page
+                    end = min(offset + chunk_size, len(view)) // mmap.PAGESIZE * mmap.PAGESIZE
+                    if release and end > released:
+                        mapped.madvise(mmap.MADV_DONTNEED, released, end - released)
+                        released = end
+        return True
@@ -0,0 +1,163 @@
+"""Find files with the same contents."""
+
+from __future__ import annotations
+
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING, TypeVar
+
+from ._concurrent import map_bounded
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from concurrent.futures import Executor
+
+    from _typeshed import StrPath
+
+    from ._file_hash import FileHash
+
+_T = TypeVar("_T")
+
+PARTIAL_SIZE = 4 * 1024  # 4 KiB
+"""Default number of bytes read from the start and end of a file for the partial hash."""
+
+
+def find_duplicates(
+    file_paths: Iterable[StrPath],
+    file_hash: FileHash,
+    *,
+    max_workers: int | None = None,
+    partial_size: int = PARTIAL_SIZE,
+) -> Iterator[list[Path]]:
+    """Find files with the same contents.
+
+    Files are compared in stages so that as few bytes as possible are read:
+
+    1. Files are grouped by size. Files with a unique size are not read.
+    2. Files in each group are hashed using the first and last ``partial_size``
+       bytes. Files with a unique partial digest are not read any further.
+       Files no larger than ``partial_size * 2`` are read completely by this
+       stage so their groups are final.
+    3. Files that still share a partial digest are hashed completely using
+       :meth:`FileHash.hash_file() <f_lib.utils.FileHash.hash_file>` so the
+       ``cache`` of ``file_hash`` is used, if it has one.
+
+    Files are read and hashed in parallel on a thread pool. Groups are yielded as
+    soon as they are found.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        import hashlib
+
+        from f_lib.utils import FileHash, find_duplicates, walk_files
+
+        entries = walk_files("cache")
+        for group in find_duplicates((entry.entry.path for entry in entries), FileHash(hashlib.sha256())):
+            print(group)
+
+    Args:
+        file_paths: Paths of the files to compare. Paths that are not regular files or
+            can't be accessed (e.g. broken symbolic links) are ignored.
+        file_hash: Used to calculate digests. Its running hash is not changed.
+        max_workers: Maximum number of threads used to hash files.
+        partial_size: Number of bytes read from the start and end of each file for the partial hash.
+
+    Yields:
+        Paths of files with the same contents, in the order they were provided.
+        Each group contains at least two paths.
+
+    """
+    by_size = _group_by_size(file_paths)
+    if len(empty := by_size.pop(0, [])) > 1:
+        yield empty  # no need to read empty files
+    candidates = [(size, path) for size, paths in sorted(by_size.items()) if len(paths) > 1 for path in paths]
+
+    def hash_partial(candidate: tuple[int, Path]) -> bytes:
+        return _hash_partial(file_hash, candidate[1], candidate[0], partial_size)
+
+    def hash_full(candidate: tuple[int, Path]) -> bytes:
+        return file_hash.hash_file(candidate[1])
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="find_duplicates") as executor:
+        remaining: list[tuple[int, Path]] = []
+        for size, group in _find_groups(executor, hash_partial, candidates, max_pending=max_workers * 2):
+            if size <= partial_size * 2:
+                yield [path for _, path in group]
+            else:
+                remaining.extend(group)
+        for _, group in _find_groups(executor, hash_full, remaining, max_pending=max_workers * 2):
+            yield [path for _, path in group]
+
+
+def _find_groups(
+    executor: Executor,
+    func: Callable[[tuple[int, Path]], bytes],
+    candidates: Iterable[tuple[int, Path]],
+    *,
+    max_pending: int,
+) -> Iterator[tuple[int, list[tuple[int, Path]]]]:
+    """Calculate a digest for each candidate and group candidates of the same size by digest.
+
+    Args:
+        executor: Used to calculate digests in parallel.
+        func: Calculates the digest of a candidate.
+        candidates: Size and path of each file, sorted by size.
+        max_pending: Maximum number of digests being calculated at a time.
+
+    Yields:
+        Size of the files and candidates with the same digest.
+
+    """
+    for size, results in groupby(
+        map_bounded(executor, func, candidates, max_pending=max_pending), key=lambda item: item[0][0]
+    ):
+        for group in _group_by_digest(results):
+            yield size, group
+
+
+def _group_by_digest(results: Iterable[tuple[_T, bytes]]) -> Iterator[list[_T]]:
+    """Group items by digest, keeping the order they were provided.
+
+    Yields:
+        Items with the same digest. Only groups with more than one item are yielded.
+
+    """
+    groups: dict[bytes, list[_T]] = {}
+    for item, digest in results:
+        groups.setdefault(digest, []).append(item)
+    yield from (group for group in groups.values() if len(group) > 1)
+
+
+def _group_by_size(file_paths: Iterable[StrPath]) -> dict[int, list[Path]]:
+    """Group regular files by size.
+
+    Paths that can't be accessed (e.g. broken symbolic links, files removed after
+    they were listed) are ignored.
+
+    """
+    by_size: dict[int, list[Path]] = {}
+    for file_path in file_paths:
+        path = Path(file_path)
+        try:
+            file_stat = path.stat()
+        except OSError:
+            continue
+        if stat.S_ISREG(file_stat.st_mode):
+            by_size.setdefault(file_stat.st_size, []).append(path)
+    return by_size
+
+
+def _hash_partial(file_hash: FileHash, path: Path, size: int, partial_size: int) -> bytes:
+    """Calculate the digest of the first and last ``partial_size`` bytes of a file."""
+    hash_obj = file_hash.new_hash()
+    with path.open("rb", buffering=0) as stream:
+        hash_obj.update(stream.read(partial_size))
+        if size > partial_size:
+            stream.seek(max(partial_size, size - partial_size))
+            hash_obj.update(stream.read(partial_size))
+    return hash_obj.digest()
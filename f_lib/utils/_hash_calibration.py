@@ -0,0 +1,195 @@
+"""Rank the hash algorithms available on this host by speed."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import platform
+import ssl
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from .._os_info import OsInfo
+
+if TYPE_CHECKING:
+    from _typeshed import StrPath
+
+CALIBRATION_FILE_NAME = "hash_calibration.json"
+"""Name of the file the ranking is cached in when a path is not provided."""
+
+CALIBRATION_FORMAT_VERSION = 1
+"""Version of the format of the file the ranking is cached in."""
+
+CALIBRATION_SIZE = 4 * 1024 * 1024  # 4 MiB
+"""Default number of bytes hashed to measure the speed of each algorithm."""
+
+HASH_SECURITY: dict[str, int] = {
+    "blake2b": 256,
+    "blake2s": 128,
+    "md5": 0,
+    "ripemd160": 80,
+    "sha1": 0,
+    "sha224": 112,
+    "sha256": 128,
+    "sha384": 192,
+    "sha3_224": 112,
+    "sha3_256": 128,
+    "sha3_384": 192,
+    "sha3_512": 256,
+    "sha512": 256,
+    "sha512_224": 112,
+    "sha512_256": 128,
+    "sm3": 128,
+}
+"""Collision resistance, in bits, of each hash algorithm that can be ranked.
+
+Algorithms with practical collision attacks (MD5, SHA-1) have a security of ``0``
+so they are only selected when security does not matter (e.g. change detection).
+Algorithms with variable length digests (e.g. SHAKE) are not included.
+
+"""
+
+
+class HashAlgorithmSpeed(NamedTuple):
+    """Measured speed of a hash algorithm."""
+
+    name: str
+    """Name of the algorithm, as accepted by :func:`hashlib.new`."""
+
+    bytes_per_second: float
+    """Number of bytes hashed per second."""
+
+    security: int
+    """Collision resistance of the algorithm in bits. See :data:`HASH_SECURITY`."""
+
+
+def calibrate_hash_algorithms(
+    *,
+    path: StrPath | None = None,
+    recalibrate: bool = False,
+    repeat: int = 3,
+    size: int = CALIBRATION_SIZE,
+) -> list[HashAlgorithmSpeed]:
+    """Rank the hash algorithms available on this host by speed.
+
+    The speed of each algorithm depends on the CPU (e.g. SHA-NI or ARMv8 crypto
+    extensions) and the build of Python/OpenSSL, so it is measured with a short
+    benchmark (typically well under a second in total). The ranking is cached in
+    a file and only measured again when the host, Python version, or format of
+    the file changes.
+
+    Args:
+        path: Path of the file the ranking is cached in.
+            Defaults to a file in :attr:`f_lib.OsInfo.user_data_dir`.
+        recalibrate: Measure the speed of each algorithm even if the ranking is cached.
+        repeat: Number of times each algorithm is measured. The fastest time is used.
+        size: Number of bytes hashed each time an algorithm is measured.
+
+    Returns:
+        Each available algorithm in :data:`HASH_SECURITY`, fastest first. Algorithms
+        that are listed as available but can't be used (e.g. ``md5`` when OpenSSL
+        is in FIPS mode) are excluded.
+
+    """
+    path = Path(path) if path else OsInfo().user_data_dir / CALIBRATION_FILE_NAME
+    host = _get_host()
+    if not recalibrate and (ranking := _load_ranking(path, host)) is not None:
+        return ranking
+    data = bytes(range(256)) * (size // 256 or 1)
+    measured = (
+        (name, _measure(name, data, repeat=repeat), security)
+        for name, security in HASH_SECURITY.items()
+        if name in hashlib.algorithms_available
+    )
+    ranking = sorted(
+        (
+            HashAlgorithmSpeed(name, bytes_per_second, security)
+            for name, bytes_per_second, security in measured
+            if bytes_per_second is not None
+        ),
+        key=lambda speed: speed.bytes_per_second,
+        reverse=True,
+    )
+    _save_ranking(path, host, ranking)
+    return ranking
+
+
+def _get_host() -> dict[str, str]:
+    """Get the properties of the host that affect the speed of hash algorithms.
+
+    Most algorithms are provided by OpenSSL so its version is included.
+
+    """
+    return {
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "openssl": ssl.OPENSSL_VERSION,
+        "python": sys.version,
+    }
+
+
+def _load_ranking(path: Path, host: dict[str, str]) -> list[HashAlgorithmSpeed] | None:
+    """Load a cached ranking.
+
+    Returns:
+        The ranking or ``None`` if it was not cached, can't be read, or was measured on a different host.
+
+    """
+    try:
+        data: dict[str, Any] = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != CALIBRATION_FORMAT_VERSION or data.get("host") != host:
+        return None
+    return [HashAlgorithmSpeed(**speed) for speed in data["algorithms"]]
+
+
+def _measure(name: str, data: bytes, *, repeat: int) -> float | None:
+    """Measure the speed of a hash algorithm.
+
+    Returns:
+        Number of bytes hashed per second or ``None`` if the algorithm can't be used.
+
+    """
+    try:
+        hashlib.new(name, data[:4096])  # warm up
+    except ValueError:  # e.g. disabled by OpenSSL 3 or FIPS mode
+        return None
+    fastest = float("inf")
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        hashlib.new(name, data)
+        fastest = min(fastest, time.perf_counter() - start)
+    return len(data) / max(fastest, 1e-9)
+
+
+def _save_ranking(path: Path, host: dict[str, str], ranking: list[HashAlgorithmSpeed]) -> None:
+    """Cache a ranking.
+
+    The file is written to a uniquely named temporary file then renamed so other
+    processes never read a partially written file. Nothing is cached if the file
+    can't be written (e.g. a read-only directory).
+
+    """
+    tmp_path: Path | None = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", delete=False, dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+        ) as file_obj:
+            tmp_path = Path(file_obj.name)
+            json.dump(
+                {
+                    "algorithms": [speed._asdict() for speed in ranking],
+                    "host": host,
+                    "version": CALIBRATION_FORMAT_VERSION,
+                },
+                file_obj,
+            )
+        tmp_path.replace(path)  # atomic so a partially written file is never read
+    except OSError:
+        if tmp_path:
+            tmp_path.unlink(missing_ok=True)
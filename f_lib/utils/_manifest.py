@@ -0,0 +1,244 @@
+"""Write and verify manifests of the digests of files in a directory tree."""
+
+from __future__ import annotations
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple
+
+from ._concurrent import map_bounded
+from ._walk import WalkEntry, walk_files
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import TextIO
+
+    from _typeshed import StrPath
+
+    from ._file_hash import FileHash
+
+ManifestFormat = Literal["checksum", "json"]
+"""Format of a manifest.
+
+``checksum``
+    Format used by ``sha256sum`` and similar tools of GNU coreutils.
+    It can be verified with ``sha256sum --check`` (or the tool for the algorithm used).
+
+``json``
+    JSON object containing the algorithm and the relative path, size, and digest of each file.
+
+"""
+
+
+class ManifestEntry(NamedTuple):
+    """File in a manifest."""
+
+    path: str
+    """Path of the file relative to the root of the manifest using ``/`` as the separator."""
+
+    digest: bytes
+    """Digest of the file's contents."""
+
+    size: int | None = None
+    """Size of the file in bytes, if known. Only included in JSON manifests."""
+
+
+class ManifestMismatch(NamedTuple):
+    """File that does not match a manifest."""
+
+    path: str
+    """Path of the file relative to the root of the manifest."""
+
+    expected: bytes
+    """Digest in the manifest."""
+
+    actual: bytes | None
+    """Digest of the file on disk. ``None`` if the file does not exist or its size does not match."""
+
+
+def read_manifest(path: StrPath, *, algorithm: str | None = None) -> Iterator[ManifestEntry]:
+    """Read the entries of a manifest written by :func:`write_manifest`.
+
+    The format is detected from the contents of the file. Checksum manifests are
+    read one line at a time. JSON manifests are loaded into memory in full.
+
+    Args:
+        path: Path of the manifest.
+        algorithm: Algorithm the manifest is expected to have been written with.
+            Only checked for JSON manifests since checksum manifests do not record it.
+
+    Yields:
+        Each file in the manifest.
+
+    Raises:
+        ValueError: A JSON manifest was written with an algorithm other than ``algorithm``.
+
+    """
+    with Path(path).open(encoding="utf-8", newline="\n") as stream:
+        if stream.read(1) == "{":
+            stream.seek(0)
+            data: dict[str, Any] = json.load(stream)
+            if algorithm is not None and data.get("algorithm") != algorithm:
+                msg = f"manifest was written with {data.get('algorithm')} not {algorithm}"
+                raise ValueError(msg)
+            for file in data["files"]:
+                yield ManifestEntry(file["path"], bytes.fromhex(file["digest"]), file.get("size"))
+            return
+        stream.seek(0)
+        for line in stream:
+            if line := line.rstrip("\r\n"):
+                yield _parse_checksum_line(line)
+
+
+def verify_manifest(
+    path: StrPath,
+    file_hash: FileHash,
+    *,
+    fail_fast: bool = False,
+    max_workers: int | None = None,
+    root: StrPath | None = None,
+) -> Iterator[ManifestMismatch]:
+    """Verify files on disk against a manifest.
+
+    Files are hashed in parallel on a thread pool and each mismatch is yielded
+    as soon as it is found, so mismatches are not necessarily in the order of
+    the manifest. The manifest is read with :func:`read_manifest`, so only
+    checksum manifests are read lazily. When the manifest contains the size of
+    a file, files whose size does not match are not read. Files on disk that
+    are not in the manifest are ignored.
+
+    Args:
+        path: Path of the manifest.
+        file_hash: Used to calculate digests. Must use the same algorithm that
+            was used to write the manifest. Its running hash is not changed.
+        fail_fast: Stop after the first mismatch. Files that have not started
+            being hashed are skipped.
+        max_workers: Maximum number of threads used to hash files.
+        root: Directory the paths in the manifest are relative to.
+            Defaults to the directory containing the manifest.
+
+    Yields:
+        Each file that does not match the manifest.
+
+    Raises:
+        ValueError: A JSON manifest was written with a different algorithm than
+            ``file_hash`` or the size of a digest in the manifest does not match it.
+
+    """
+    root = Path(root) if root is not None else Path(path).parent
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+
+    def hash_entry(entry: ManifestEntry) -> bytes | None:
+        if len(entry.digest) != file_hash.digest_size:
+            msg = f"digest of {entry.path} in manifest is not {file_hash.algorithm}"
+            raise ValueError(msg)
+        try:
+            file_stat = (root / entry.path).stat()
+        except FileNotFoundError:
+            return None
+        if entry.size is not None and entry.size != file_stat.st_size:
+            return None
+        return file_hash.hash_file(root / entry.path, file_stat=file_stat)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verify_manifest")
+    try:
+        for entry, digest in map_bounded(
+            executor,
+            hash_entry,
+            read_manifest(path, algorithm=file_hash.algorithm),
+            max_pending=max_workers * 2,
+            ordered=False,
+        ):
+            if digest != entry.digest:
+                yield ManifestMismatch(entry.path, entry.digest, digest)
+                if fail_fast:
+                    return
+    finally:
+        # files that have not started being hashed are skipped if verification stopped early
+        executor.shutdown(cancel_futures=True)
+
+
+def write_manifest(
+    root: StrPath,
+    stream: TextIO,
+    file_hash: FileHash,
+    *,
+    exclude: Iterable[str] | None = None,
+    include: Iterable[str] | None = None,
+    manifest_format: ManifestFormat = "checksum",
+    max_workers: int | None = None,
+) -> int:
+    r"""Write a manifest of the digests of files in a directory tree.
+
+    The tree is walked with :func:`~f_lib.utils.walk_files`. Files are hashed in
+    parallel on a thread pool and written to ``stream`` in the canonical order
+    it returns as soon as they are hashed so the manifest is never held in memory.
+
+    In a checksum manifest, each line is ``<hex digest>  <path>``. As with GNU
+    coreutils, if the path contains a backslash or newline, the line starts with
+    a backslash and those characters are escaped.
+
+    Args:
+        root: Root directory of the tree. Paths in the manifest are relative to it.
+        stream: Text stream the manifest is written to. It should be opened with
+            ``newline="\n"`` so the manifest is the same on all operating systems.
+        file_hash: Used to calculate digests. Its running hash is not changed.
+        exclude: Gitignore-style patterns of files and directories to exclude.
+        include: Gitignore-style patterns of files to include.
+        manifest_format: Format of the manifest.
+        max_workers: Maximum number of threads used to hash files.
+
+    Returns:
+        Number of files written to the manifest.
+
+    """
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+
+    def hash_entry(entry: WalkEntry) -> bytes:
+        return file_hash.hash_file(entry.entry.path, file_stat=entry.entry.stat() if file_hash.cache else None)
+
+    count = 0
+    if manifest_format == "json":
+        stream.write(f'{{"algorithm":{json.dumps(file_hash.algorithm)},"files":[')
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="write_manifest") as executor:
+        entries = walk_files(root, exclude=exclude, include=include)
+        for entry, digest in map_bounded(executor, hash_entry, entries, max_pending=max_workers * 2):
+            if manifest_format == "json":
+                file = {"digest": digest.hex(), "path": entry.path, "size": entry.entry.stat().st_size}
+                stream.write(("," if count else "") + "\n" + json.dumps(file, separators=(",", ":")))
+            else:
+                stream.write(_format_checksum_line(entry.path, digest))
+            count += 1
+    if manifest_format == "json":
+        stream.write("\n]}\n")
+    return count
+
+
+def _format_checksum_line(path: str, digest: bytes) -> str:
+    """Format a line of a checksum manifest."""
+    if "\\" in path or "\n" in path or "\r" in path:
+        escaped = path.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+        return f"\\{digest.hex()}  {escaped}\n"
+    return f"{digest.hex()}  {path}\n"
+
+
+def _parse_checksum_line(line: str) -> ManifestEntry:
+    """Parse a line of a checksum manifest.
+
+    Lines written in binary mode (``<hex digest> *<path>``) are also supported.
+
+    Raises:
+        ValueError: The line is not formatted correctly.
+
+    """
+    escaped = line.startswith("\\")
+    digest, separator, path = line.removeprefix("\\").partition(" ")
+    if not separator or len(path) < 2 or path[0] not in " *":
+        msg = f"invalid checksum line: {line!r}"
+        raise ValueError(msg)
+    path = path[1:]
+    if escaped:
+        path = path.replace("\\\\", "\0").replace("\\n", "\n").replace("\\r", "\r").replace("\0", "\\")
+    return ManifestEntry(path, bytes.fromhex(digest))
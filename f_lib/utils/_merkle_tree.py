@@ -0,0 +1,407 @@
+"""Merkle tree of the digests of a directory tree."""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple
+
+from ._walk import PathPatternList, walk_files
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from _typeshed import StrPath
+
+    from ._file_hash import FileHash
+
+
+class MerkleTreeChanges(NamedTuple):
+    """Changes detected when updating a :class:`MerkleTree`.
+
+    Paths are relative to the root of the tree using ``/`` as the separator.
+    The root directory is represented by an empty string.
+
+    """
+
+    added: list[str]
+    """Files that were added."""
+
+    modified: list[str]
+    """Files whose contents changed."""
+
+    removed: list[str]
+    """Files that were removed."""
+
+    directories: list[str]
+    """Directories whose digest changed, were added, or were removed."""
+
+    def __bool__(self) -> bool:
+        """Whether any changes were detected."""
+        return bool(self.added or self.modified or self.removed)
+
+
+class MerkleTreeFile(NamedTuple):
+    """File in a :class:`MerkleTree`."""
+
+    size: int
+    """Size of the file in bytes when it was hashed."""
+
+    mtime_ns: int
+    """Modification time of the file when it was hashed. ``0`` if it must be hashed again."""
+
+    digest: bytes
+    """Digest of the file's contents."""
+
+
+class MerkleTree:
+    r"""Merkle tree of the digests of a directory tree.
+
+    A digest is stored for each file and each directory. The digest of a directory
+    is calculated from the names and digests of its direct children so, when a file
+    changes, only the digests of that file and the directories containing it need to
+    be calculated again. Files are only hashed again if their size or modification
+    time changed.
+
+    The digest of a directory is calculated by hashing the following for each child,
+    sorted by the bytes of its name::
+
+        <type> <name> b"\0" <digest>
+
+    Where ``<type>`` is ``b"d"`` for directories or ``b"f"`` for files. Empty directories
+    are not included in the tree.
+
+    """
+
+    FORMAT_VERSION: ClassVar[int] = 1
+    """Version of the format used when saving the tree."""
+
+    RACY_WINDOW_NS: ClassVar[int] = 2_000_000_000
+    """Files modified this recently (in nanoseconds) when hashed are always hashed again."""
+
+    directories: dict[str, bytes]
+    """Digest of each directory, keyed by relative path. The root directory is ``""``."""
+
+    files: dict[str, MerkleTreeFile]
+    """Each file in the tree, keyed by relative path."""
+
+    root: Path
+    """Root directory of the tree."""
+
+    def __init__(
+        self,
+        root: StrPath,
+        file_hash: FileHash,
+        *,
+        exclude: Iterable[str] | None = None,
+        include: Iterable[str] | None = None,
+    ) -> None:
+        """Instantiate class.
+
+        The tree is empty until :meth:`update` is called.
+
+        Args:
+            root: Root directory of the tree.
+            file_hash: Used to calculate digests. Its running hash is not changed.
+            exclude: Gitignore-style patterns of files and directories to exclude.
+            include: Gitignore-style patterns of files to include.
+
+        """
+        self.root = Path(root)
+        self._children: dict[str, set[str]] | None = None  # built when the tree is first updated
+        self.directories = {}
+        self.exclude = list(exclude or [])
+        self.file_hash = file_hash
+        self.files = {}
+        self.include = list(include or [])
+
+    @property
+    def digest(self) -> bytes:
+        """Digest of the root directory."""
+        return self.directories.get("", self._hash_directory([]))
+
+    @property
+    def hexdigest(self) -> str:
+        """Digest of the root directory as a string of hexadecimal digits."""
+        return self.digest.hex()
+
+    def diff(self, other: MerkleTree, *, path: str = "") -> list[str]:
+        """Find directories whose digest differs from another tree (e.g. a previous snapshot).
+
+        Only directories that differ are descended into.
+
+        Args:
+            other: Tree to compare against.
+            path: Directory to start comparing from.
+
+        Returns:
+            Relative paths of directories that differ, including those that only exist in one tree.
+
+        """
+        children = self._child_directories()
+        for parent, names in other._child_directories().items():
+            children.setdefault(parent, set()).update(names)
+        result: list[str] = []
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            if self.directories.get(current) == other.directories.get(current):
+                continue
+            result.append(current)
+            stack.extend(children.get(current, ()))
+        return sorted(result, key=os.fsencode)
+
+    def update(self, *, max_workers: int | None = None) -> MerkleTreeChanges:
+        """Update the tree to match the directory tree on disk.
+
+        The directory tree is walked and the result of ``stat`` for each file is
+        compared with the tree. Only new or changed files are hashed and only the
+        directories containing them have their digest calculated again.
+
+        Args:
+            max_workers: Maximum number of threads used to hash files.
+
+        Returns:
+            Changes detected.
+
+        """
+        current = {
+            entry.path: entry.entry.stat()
+            for entry in walk_files(self.root, exclude=self.exclude, include=self.include)
+        }
+        return self._update_files(
+            current, [path for path in self.files if path not in current], max_workers=max_workers
+        )
+
+    def update_paths(self, paths: Iterable[str], *, max_workers: int | None = None) -> MerkleTreeChanges:
+        """Update only the given files of the tree to match the directory tree on disk.
+
+        Unlike :meth:`update`, the directory tree is not walked so this is much faster
+        when the files that may have changed are already known (e.g. from filesystem events).
+        A path that no longer exists, is not a file, or is excluded by the patterns of
+        the tree is removed from the tree.
+
+        Args:
+            paths: Paths of files relative to the root of the tree using ``/`` as the separator.
+            max_workers: Maximum number of threads used to hash files.
+
+        Returns:
+            Changes detected.
+
+        """
+        exclude = PathPatternList(self.exclude)
+        include = PathPatternList(self.include)
+        current: dict[str, os.stat_result] = {}
+        removed: list[str] = []
+        for path in dict.fromkeys(paths):
+            try:
+                file_stat = (self.root / path).stat()
+            except (FileNotFoundError, NotADirectoryError):
+                file_stat = None
+            if (
+                file_stat is not None
+                and stat.S_ISREG(file_stat.st_mode)
+                and not exclude.matches_or_parent_matches(path)
+                and (not include or include.matches_or_parent_matches(path))
+            ):
+                current[path] = file_stat
+            elif path in self.files:
+                removed.append(path)
+        return self._update_files(current, removed, max_workers=max_workers)
+
+    def save(self, path: StrPath) -> None:
+        """Save the tree to a file.
+
+        The tree is written to a uniquely named temporary file then renamed so a
+        partially written file is never read.
+
+        Args:
+            path: Path of the file to write.
+
+        """
+        data = {
+            "algorithm": self.file_hash.algorithm,
+            "directories": {name: digest.hex() for name, digest in self.directories.items()},
+            "exclude": self.exclude,
+            "files": {name: [file.size, file.mtime_ns, file.digest.hex()] for name, file in self.files.items()},
+            "include": self.include,
+            "root": str(self.root),
+            "version": self.FORMAT_VERSION,
+        }
+        path = Path(path)
+        tmp_path: Path | None = None
+        try:
+            with tempfile.NamedTemporaryFile(
+                "w", delete=False, dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+            ) as file_obj:
+                tmp_path = Path(file_obj.name)
+                json.dump(data, file_obj, separators=(",", ":"))
+            tmp_path.replace(path)  # atomic so a partially written file is never read
+        except OSError:
+            if tmp_path:
+                tmp_path.unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(cls, path: StrPath, file_hash: FileHash, *, root: StrPath | None = None) -> MerkleTree:
+        """Load a tree from a file.
+
+        If the file was saved with a different format version or hash algorithm,
+        an empty tree is returned so every file is hashed by the next :meth:`update`.
+
+        Args:
+            path: Path of the file to read.
+            file_hash: Used to calculate digests.
+            root: Root directory of the tree. Defaults to the root directory when the tree was saved.
+
+        """
+        data: dict[str, Any] = json.loads(Path(path).read_text())
+        tree = cls(root or data["root"], file_hash, exclude=data.get("exclude"), include=data.get("include"))
+        if data.get("version") != cls.FORMAT_VERSION or data.get("algorithm") != file_hash.algorithm:
+            return tree
+        tree.directories = {name: bytes.fromhex(digest) for name, digest in data["directories"].items()}
+        tree.files = {
+            name: MerkleTreeFile(size, mtime_ns, bytes.fromhex(digest))
+            for name, (size, mtime_ns, digest) in data["files"].items()
+        }
+        return tree
+
+    def _child_index(self) -> dict[str, set[str]]:
+        """Get the direct children (files and directories) of each directory.
+
+        The index is built from :attr:`files` and :attr:`directories` the first time
+        it is needed then kept up to date as the tree is updated.
+
+        """
+        if self._children is None:
+            self._children = {}
+            for path in chain(self.files, self.directories):
+                if path:
+                    self._children.setdefault(path.rpartition("/")[0], set()).add(path)
+        return self._children
+
+    def _child_directories(self) -> dict[str, set[str]]:
+        """Get the direct child directories of each directory."""
+        result: dict[str, set[str]] = {}
+        for path in self.directories:
+            if path:
+                result.setdefault(path.rpartition("/")[0], set()).add(path)
+        return result
+
+    def _hash_directory(self, children: Iterable[tuple[bytes, bytes, bytes]]) -> bytes:
+        """Calculate the digest of a directory from the type, name, and digest of its children."""
+        hash_obj = self.file_hash.new_hash()
+        for child_type, name, digest in sorted(children, key=lambda child: child[1]):
+            hash_obj.update(child_type + name + b"\0" + digest)
+        return hash_obj.digest()
+
+    def _unchanged_children(self, dirty: set[str]) -> dict[str, list[tuple[bytes, bytes, bytes]]]:
+        """Get the type, name, and digest of the children of directories that are not themselves dirty."""
+        index = self._child_index()
+        children: dict[str, list[tuple[bytes, bytes, bytes]]] = {path: [] for path in dirty}
+        for parent, result in children.items():
+            for path in index.get(parent, ()):
+                name = os.fsencode(path.rpartition("/")[2])
+                if path in self.files:
+                    result.append((b"f", name, self.files[path].digest))
+                elif path not in dirty:
+                    result.append((b"d", name, self.directories[path]))
+        return children
+
+    def _update_files(
+        self, current: dict[str, os.stat_result], removed: list[str], *, max_workers: int | None = None
+    ) -> MerkleTreeChanges:
+        """Update files of the tree.
+
+        Args:
+            current: Result of ``stat`` for each file that exists, keyed by relative path.
+            removed: Files in the tree that no longer exist.
+            max_workers: Maximum number of threads used to hash files.
+
+        Returns:
+            Changes detected.
+
+        """
+        added = [path for path in current if path not in self.files]
+        modified = [
+            path
+            for path, file_stat in current.items()
+            if path in self.files
+            and (
+                self.files[path].size != file_stat.st_size
+                or not self.files[path].mtime_ns
+                or self.files[path].mtime_ns != file_stat.st_mtime_ns
+            )
+        ]
+        to_hash = added + modified
+        index = self._child_index()
+        now = time.time_ns()
+
+        def hash_file(path: str) -> bytes:
+            return self.file_hash.hash_file(self.root / path, file_stat=current[path])
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="MerkleTree") as executor:
+            digests = executor.map(hash_file, to_hash)
+            unchanged: set[str] = set()
+            for path, digest in zip(to_hash, digests, strict=True):
+                file_stat = current[path]
+                if (previous := self.files.get(path)) and previous.digest == digest:
+                    unchanged.add(path)  # only the result of stat changed
+                mtime_ns = 0 if now - file_stat.st_mtime_ns < self.RACY_WINDOW_NS else file_stat.st_mtime_ns
+                self.files[path] = MerkleTreeFile(file_stat.st_size, mtime_ns, digest)
+        for path in added:
+            index.setdefault(path.rpartition("/")[0], set()).add(path)
+        for path in removed:
+            del self.files[path]
+            index[path.rpartition("/")[0]].discard(path)
+        modified = [path for path in modified if path not in unchanged]
+        directories = self._update_directories([*added, *modified, *removed])
+        return MerkleTreeChanges(
+            sorted(added, key=os.fsencode),
+            sorted(modified, key=os.fsencode),
+            sorted(removed, key=os.fsencode),
+            directories,
+        )
+
+    def _update_directories(self, changed_files: Iterable[str]) -> list[str]:
+        """Calculate the digest of each directory containing a changed file.
+
+        Returns:
+            Directories whose digest changed.
+
+        """
+        dirty: set[str] = set()
+        for changed_file in changed_files:
+            path = changed_file
+            while path:
+                path = path.rpartition("/")[0]
+                if path in dirty:
+                    break
+                dirty.add(path)
+        if not dirty:
+            return []
+        children = self._unchanged_children(dirty)
+        index = self._child_index()
+        changed: list[str] = []
+        # deepest directories first so the digest of each child directory is known
+        for path in sorted(dirty, key=lambda path: (-path.count("/") if path else 1, path)):
+            parent, _, name = path.rpartition("/")
+            if path and not children[path]:
+                if self.directories.pop(path, None) is not None:
+                    index[parent].discard(path)
+                    changed.append(path)
+                continue
+            digest = self._hash_directory(children[path])
+            if path:
+                children[parent].append((b"d", os.fsencode(name), digest))
+                index.setdefault(parent, set()).add(path)
+            if self.directories.get(path) != digest:
+                self.directories[path] = digest
+                changed.append(path)
+        return sorted(changed, key=os.fsencode)
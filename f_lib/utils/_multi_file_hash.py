@@ -0,0 +1,225 @@
+"""Calculate multiple hashes of files in a single pass."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, ClassVar, cast
+
+from ._file_hash import FileHash
+
+if TYPE_CHECKING:
+    import hashlib
+    from hashlib import _Hash
+
+    from _typeshed import ReadableBuffer, StrPath
+
+
+class MultiHash:
+    """Hash object that passes data to multiple hashlib hash objects.
+
+    Implements the same interface as a hashlib hash object. The digest is the
+    concatenation of the digest of each hash object, in the order they were provided.
+
+    """
+
+    PARALLEL_THRESHOLD: ClassVar[int] = 256 * 1024
+    """Data at least this many bytes is passed to the hash objects in parallel."""
+
+    _shared_executor: ClassVar[ThreadPoolExecutor | None] = None
+    """Thread pool used by instances that were not provided one."""
+
+    _shared_executor_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        *hash_algs: hashlib._Hash,
+        executor: ThreadPoolExecutor | None = None,
+        parallel: bool = True,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            *hash_algs: Instances of hashlib algorithms. Each must have a unique name.
+            executor: Thread pool used to update hash objects in parallel. If not
+                provided, a thread pool shared by all instances is used so threads
+                are not created for each instance.
+            parallel: Update hash objects in parallel on a thread pool when the
+                data is at least :attr:`PARALLEL_THRESHOLD` bytes. hashlib releases
+                the GIL while hashing large amounts of data.
+
+        """
+        if not hash_algs:
+            msg = "at least one hash algorithm is required"
+            raise ValueError(msg)
+        names = [hash_alg.name for hash_alg in hash_algs]
+        if len(set(names)) != len(names):
+            msg = f"hash algorithms must have unique names: {', '.join(names)}"
+            raise ValueError(msg)
+        self._hashes = hash_algs
+        self._executor = executor
+        self.parallel = parallel and len(hash_algs) > 1
+
+    @property
+    def block_size(self) -> int:
+        """Largest internal block size of the hash objects."""
+        return max(hash_obj.block_size for hash_obj in self._hashes)
+
+    @property
+    def digest_size(self) -> int:
+        """Size of the resulting hash in bytes."""
+        return sum(hash_obj.digest_size for hash_obj in self._hashes)
+
+    @property
+    def name(self) -> str:
+        """Name of the hash algorithms joined by ``+``."""
+        return "+".join(self.names)
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        """Name of each hash algorithm."""
+        return tuple(hash_obj.name for hash_obj in self._hashes)
+
+    def copy(self) -> MultiHash:
+        """Return a copy of the hash object."""
+        return MultiHash(
+            *(hash_obj.copy() for hash_obj in self._hashes),
+            executor=self._executor,
+            parallel=self.parallel,
+        )
+
+    def digest(self) -> bytes:
+        """Return the concatenated digests of the data passed to :meth:`update` so far."""
+        return b"".join(hash_obj.digest() for hash_obj in self._hashes)
+
+    def digests(self) -> dict[str, bytes]:
+        """Return the digest of each hash algorithm, keyed by name."""
+        return {hash_obj.name: hash_obj.digest() for hash_obj in self._hashes}
+
+    def hexdigest(self) -> str:
+        """Like :meth:`digest` except the digest is returned as a string of hexadecimal digits."""
+        return self.digest().hex()
+
+    def split_digest(self, digest: bytes) -> dict[str, bytes]:
+        """Split a digest returned by :meth:`digest` into the digest of each hash algorithm.
+
+        Args:
+            digest: Concatenated digests.
+
+        """
+        if len(digest) != self.digest_size:
+            msg = f"expected a digest of {self.digest_size} bytes but got {len(digest)}"
+            raise ValueError(msg)
+        result: dict[str, bytes] = {}
+        offset = 0
+        for hash_obj in self._hashes:
+            result[hash_obj.name] = digest[offset : offset + hash_obj.digest_size]
+            offset += hash_obj.digest_size
+        return result
+
+    def update(self, data: ReadableBuffer, /) -> None:
+        """Update the hash objects with data.
+
+        Args:
+            data: Bytes-like object.
+
+        """
+        if not self.parallel or memoryview(data).nbytes < self.PARALLEL_THRESHOLD:
+            for hash_obj in self._hashes:
+                hash_obj.update(data)
+            return
+        first, *others = self._hashes
+        executor = self._get_executor()
+        futures = [executor.submit(hash_obj.update, data) for hash_obj in others]
+        first.update(data)
+        for future in futures:
+            future.result()  # wait for completion & raise exceptions
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool used to update hash objects in parallel."""
+        if self._executor is not None:
+            return self._executor
+        with MultiHash._shared_executor_lock:
+            if MultiHash._shared_executor is None:
+                MultiHash._shared_executor = ThreadPoolExecutor(thread_name_prefix="MultiHash")
+            return MultiHash._shared_executor
+
+
+class MultiFileHash(FileHash):
+    """Calculate the hash of files using multiple algorithms while reading each file once.
+
+    Each chunk read from a file is passed to every hash object. All other
+    functionality of :class:`~f_lib.utils.FileHash` is supported. The digest of
+    this object is the concatenation of the digest of each algorithm. Use
+    :attr:`digests` to get the digest of each algorithm.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        import hashlib
+
+        from f_lib.utils import MultiFileHash
+
+        file_hash = MultiFileHash(hashlib.md5(), hashlib.sha256())
+        file_hash.add_file("artifact.zip")
+        file_hash.hexdigests["md5"]
+
+    """
+
+    def __init__(
+        self,
+        *hash_algs: hashlib._Hash,
+        chunk_size: int | None = None,
+        fadvise: bool = False,
+        mmap_threshold: int | None = FileHash.MMAP_THRESHOLD,
+        parallel: bool = True,
+        readahead: int | None = None,
+    ) -> None:
+        """Instantiate class.
+
+        Args:
+            *hash_algs: Instances of hashlib algorithms. Each must have a unique name.
+            chunk_size: When reading a file, it will be read this many bytes at a time.
+            fadvise: Keep files that are hashed from filling the page cache.
+            mmap_threshold: Files that are at least this many bytes are memory-mapped
+                instead of being read into a buffer.
+            parallel: Update hash objects in parallel on a thread pool when chunks are large.
+            readahead: Number of bytes ahead of the current position the kernel is asked
+                to read when ``fadvise`` is enabled.
+
+        """
+        super().__init__(
+            cast("_Hash", MultiHash(*hash_algs, parallel=parallel)),
+            chunk_size=chunk_size,
+            fadvise=fadvise,
+            mmap_threshold=mmap_threshold,
+            readahead=readahead,
+        )
+
+    @property
+    def digests(self) -> dict[str, bytes]:
+        """Digest of the data hashed so far for each algorithm, keyed by name."""
+        return self._multi_hash.digests()
+
+    @property
+    def _multi_hash(self) -> MultiHash:
+        """Hash object of this instance."""
+        return cast("MultiHash", self._hash)
+
+    @property
+    def hexdigests(self) -> dict[str, str]:
+        """Digest of the data hashed so far for each algorithm as hexadecimal digits, keyed by name."""
+        return {name: digest.hex() for name, digest in self.digests.items()}
+
+    def hash_file_digests(self, file_path: StrPath, *, use_mmap: bool | None = None) -> dict[str, bytes]:
+        """Calculate the digest of a single file's contents for each algorithm.
+
+        Args:
+            file_path: Path of the file to hash.
+            use_mmap: Whether to memory-map the file instead of reading it into a buffer.
+
+        Returns:
+            Digest of the file's contents for each algorithm, keyed by name.
+
+        """
+        return self._multi_hash.split_digest(self.hash_file(file_path, use_mmap=use_mmap))
@@ -0,0 +1,158 @@
+"""Compare directory trees."""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, NamedTuple
+
+from ._concurrent import map_bounded
+from ._merkle_tree import MerkleTree, MerkleTreeFile
+from ._walk import WalkEntry, walk_files
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from _typeshed import StrPath
+
+    from ._file_hash import FileHash
+
+
+class TreeDiff(NamedTuple):
+    """Differences between two directory trees.
+
+    Paths are relative to the root of the trees using ``/`` as the separator.
+
+    """
+
+    added: list[str]
+    """Files that are only in the new tree."""
+
+    modified: list[str]
+    """Files whose contents differ."""
+
+    removed: list[str]
+    """Files that are only in the old tree."""
+
+    def __bool__(self) -> bool:
+        """Whether the trees differ."""
+        return bool(self.added or self.modified or self.removed)
+
+
+def diff_trees(
+    old: StrPath | MerkleTree,
+    new: StrPath | MerkleTree,
+    file_hash: FileHash,
+    *,
+    exclude: Iterable[str] | None = None,
+    include: Iterable[str] | None = None,
+    max_workers: int | None = None,
+) -> TreeDiff:
+    """Find the files that were added, modified, or removed between two directory trees.
+
+    Each tree can be a directory on disk or a snapshot of one (a
+    :class:`~f_lib.utils.MerkleTree`, e.g. one loaded with
+    :meth:`MerkleTree.load() <f_lib.utils.MerkleTree.load>`).
+
+    Files are compared cheaply using the result of ``stat`` before any are read:
+
+    - Files whose size differs are modified.
+    - Files whose size and modification time are the same are unchanged.
+    - Only files whose size is the same but whose modification time differs are
+      hashed, in parallel on a thread pool. Files in a snapshot are not read
+      since their digest is already known.
+
+    When neither tree has changed, no files are read at all.
+
+    .. rubric:: Example
+    .. code-block:: python
+
+        import hashlib
+
+        from f_lib.utils import FileHash, MerkleTree, diff_trees
+
+        file_hash = FileHash(hashlib.sha256())
+        changes = diff_trees(MerkleTree.load("snapshot.json", file_hash), "build", file_hash)
+
+    Args:
+        old: Directory or snapshot to compare against.
+        new: Directory or snapshot to compare.
+        file_hash: Used to calculate digests. Must use the same algorithm as any
+            snapshots. Its running hash is not changed.
+        exclude: Gitignore-style patterns of files and directories to exclude
+            when walking a directory. Snapshots are not filtered.
+        include: Gitignore-style patterns of files to include when walking a directory.
+        max_workers: Maximum number of threads used to hash files.
+
+    Returns:
+        Differences between the trees.
+
+    """
+    exclude, include = list(exclude or []), list(include or [])
+    old_files = _list_files(old, exclude=exclude, include=include)
+    new_files = _list_files(new, exclude=exclude, include=include)
+    added = [path for path in new_files if path not in old_files]
+    removed = [path for path in old_files if path not in new_files]
+    modified: list[str] = []
+    to_hash: list[str] = []
+    for path, new_file in new_files.items():
+        if (old_file := old_files.get(path)) is None:
+            continue
+        result = _compare_stat(old_file, new_file)
+        if result is None:
+            to_hash.append(path)
+        elif result:
+            modified.append(path)
+
+    def digest(file: MerkleTreeFile | WalkEntry) -> bytes:
+        if isinstance(file, MerkleTreeFile):
+            return file.digest
+        return file_hash.hash_file(file.entry.path, file_stat=file.entry.stat())
+
+    def differs(path: str) -> bool:
+        return digest(old_files[path]) != digest(new_files[path])
+
+    if to_hash:
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="diff_trees") as executor:
+            modified.extend(
+                path
+                for path, result in map_bounded(executor, differs, to_hash, max_pending=max_workers * 2, ordered=False)
+                if result
+            )
+    return TreeDiff(sorted(added, key=os.fsencode), sorted(modified, key=os.fsencode), sorted(removed, key=os.fsencode))
+
+
+def _compare_stat(old: MerkleTreeFile | WalkEntry, new: MerkleTreeFile | WalkEntry) -> bool | None:
+    """Compare two files without reading them.
+
+    Returns:
+        Whether the files differ. ``None`` if they must be hashed to know.
+
+    """
+    if isinstance(old, MerkleTreeFile) and isinstance(new, MerkleTreeFile):
+        return old.digest != new.digest
+    old_size, old_mtime_ns = _stat(old)
+    new_size, new_mtime_ns = _stat(new)
+    if old_size != new_size:
+        return True
+    if old_mtime_ns and old_mtime_ns == new_mtime_ns:
+        return False
+    return None
+
+
+def _list_files(
+    tree: StrPath | MerkleTree, *, exclude: Iterable[str] | None, include: Iterable[str] | None
+) -> dict[str, MerkleTreeFile | WalkEntry]:
+    """List the files in a directory or snapshot, keyed by relative path."""
+    if isinstance(tree, MerkleTree):
+        return dict(tree.files)
+    return {entry.path: entry for entry in walk_files(tree, exclude=exclude, include=include)}
+
+
+def _stat(file: MerkleTreeFile | WalkEntry) -> tuple[int, int]:
+    """Get the size and modification time of a file. The modification time is ``0`` if it is not known."""
+    if isinstance(file, MerkleTreeFile):
+        return file.size, file.mtime_ns
+    file_stat = file.entry.stat()
+    return file_stat.st_size, file_stat.st_mtime_ns
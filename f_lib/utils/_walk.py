@@ -0,0 +1,201 @@
+"""Walk a directory tree."""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from _typeshed import StrPath
+
+
+class PathPattern:
+    """Gitignore-style pattern used to match paths relative to a root directory.
+
+    - ``*`` matches anything except ``/``, ``?`` matches any one character except ``/``,
+      and ``[...]`` matches one character in a range.
+    - ``**`` matches any number of directories (e.g. ``**/foo``, ``foo/**``, ``foo/**/bar``).
+    - A pattern that contains a ``/`` at the beginning or middle is matched relative
+      to the root directory. Otherwise, it can match at any level below the root.
+    - A pattern that ends with a ``/`` only matches directories.
+    - A pattern that starts with a ``!`` negates a match of a previous pattern.
+
+    """
+
+    def __init__(self, pattern: str) -> None:
+        """Instantiate class.
+
+        Args:
+            pattern: Gitignore-style pattern.
+
+        """
+        self.pattern = pattern
+        self.negate = pattern.startswith("!")
+        value = pattern[1:] if self.negate else pattern
+        self.dir_only = value.endswith("/")
+        value = value.rstrip("/")
+        anchored = "/" in value
+        value = value.lstrip("/")
+        self.regex = re.compile(("" if anchored else "(?:.*/)?") + self._translate(value) + r"\Z", re.DOTALL)
+
+    def matches(self, path: str, *, is_dir: bool = False) -> bool:
+        """Determine if a path matches the pattern.
+
+        Negation is not taken into account.
+
+        Args:
+            path: Path relative to the root directory using ``/`` as the separator.
+            is_dir: Whether the path is a directory.
+
+        """
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.match(path) is not None
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Translate a pattern into a regular expression."""
+        result: list[str] = []
+        index, length = 0, len(pattern)
+        while index < length:
+            char = pattern[index]
+            if pattern.startswith("**/", index):
+                result.append("(?:.*/)?")
+                index += 3
+            elif pattern.startswith("**", index):
+                result.append(".*")
+                index += 2
+            elif char == "*":
+                result.append("[^/]*")
+                index += 1
+            elif char == "?":
+                result.append("[^/]")
+                index += 1
+            elif char == "[" and (end := pattern.find("]", index + 2)) != -1:
+                content = pattern[index + 1 : end].replace("\\", "\\\\")
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                result.append(f"[{content}]")
+                index = end + 1
+            elif char == "\\" and index + 1 < length:
+                result.append(re.escape(pattern[index + 1]))
+                index += 2
+            else:
+                result.append(re.escape(char))
+                index += 1
+        return "".join(result)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the object."""
+        return f"{self.__class__.__name__}({self.pattern!r})"
+
+
+class PathPatternList:
+    """Ordered list of gitignore-style patterns where the last matching pattern wins."""
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        """Instantiate class.
+
+        Args:
+            patterns: Gitignore-style patterns. Blank lines and lines starting with ``#`` are ignored.
+
+        """
+        self.patterns = [
+            PathPattern(pattern) for pattern in patterns if pattern.strip() and not pattern.startswith("#")
+        ]
+
+    def matches(self, path: str, *, is_dir: bool = False) -> bool:
+        """Determine if a path matches the list of patterns.
+
+        Args:
+            path: Path relative to the root directory using ``/`` as the separator.
+            is_dir: Whether the path is a directory.
+
+        """
+        result = False
+        for pattern in self.patterns:
+            if pattern.negate == result and pattern.matches(path, is_dir=is_dir):
+                result = not pattern.negate
+        return result
+
+    def matches_or_parent_matches(self, path: str, *, is_dir: bool = False) -> bool:
+        """Determine if a path, or one of the directories containing it, matches the list of patterns.
+
+        Args:
+            path: Path relative to the root directory using ``/`` as the separator.
+            is_dir: Whether the path is a directory.
+
+        """
+        if self.matches(path, is_dir=is_dir):
+            return True
+        parent, sep, _ = path.rpartition("/")
+        while sep:
+            if self.matches(parent, is_dir=True):
+                return True
+            parent, sep, _ = parent.rpartition("/")
+        return False
+
+    def __bool__(self) -> bool:
+        """Whether the list contains any patterns."""
+        return bool(self.patterns)
+
+
+class WalkEntry(NamedTuple):
+    """File found when walking a directory tree."""
+
+    path: str
+    """Path relative to the root directory using ``/`` as the separator."""
+
+    entry: os.DirEntry[str]
+    """Directory entry of the file. The result of ``stat`` is cached by the entry."""
+
+
+def walk_files(
+    root: StrPath,
+    *,
+    exclude: Iterable[str] | None = None,
+    follow_symlinks: bool = False,
+    include: Iterable[str] | None = None,
+) -> list[WalkEntry]:
+    """Find all files in a directory tree.
+
+    The tree is walked using :func:`os.scandir` so information about each file
+    is retrieved from the directory listing when possible.
+
+    Args:
+        root: Root directory of the tree.
+        exclude: Gitignore-style patterns of files and directories to exclude.
+            Directories that are excluded are not walked.
+        follow_symlinks: Whether to walk symbolic links to directories.
+            Symbolic links to files are always included.
+        include: Gitignore-style patterns of files to include. If not provided,
+            all files that are not excluded are included. A file is included if it
+            or one of the directories containing it matches.
+
+    Returns:
+        Files in the tree, sorted by the UTF-8 (filesystem encoding) bytes of their relative path.
+
+    """
+    exclude_patterns = PathPatternList(exclude or ())
+    include_patterns = PathPatternList(include or ())
+    result: list[WalkEntry] = []
+    stack: list[tuple[str, str]] = [(os.fspath(root), "")]
+    while stack:
+        directory, prefix = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                rel_path = prefix + entry.name
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if not exclude_patterns.matches(rel_path, is_dir=True):
+                        stack.append((entry.path, rel_path + "/"))
+                elif (
+                    entry.is_file()
+                    and not exclude_patterns.matches(rel_path)
+                    and (not include_patterns or include_patterns.matches_or_parent_matches(rel_path))
+                ):
+                    result.append(WalkEntry(rel_path, entry))
+    result.sort(key=lambda walk_entry: os.fsencode(walk_entry.path))
+    return result
@@ -6,10 +6,11 @@ from typing import TYPE_CHECKING
 
 import pytest
 
-from f_lib.archive_extractor._archive_extractor import ArchiveExtractor
+from f_lib.archive_extractor._archive_extractor import ArchiveExtractor, MemberFilter
 from f_lib.archive_extractor.exceptions import ArchiveTypeError
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
     from pathlib import Path
 
     from pytest_mock import MockerFixture
@@ -18,7 +19,16 @@ if TYPE_CHECKING:
 class Extractor(ArchiveExtractor):
     """Subclass as Extractor is an ABC."""
 
-    def extract(self, destination: Path) -> Path:  # noqa: D102
+    def extract(  # noqa: D102
+        self,
+        destination: Path,
+        *,
+        delete: bool = False,  # noqa: ARG002
+        exclude: Iterable[str] | None = None,  # noqa: ARG002
+        include: Iterable[str] | None = None,  # noqa: ARG002
+        incremental: bool = False,  # noqa: ARG002
+        members: Iterable[str] | None = None,  # noqa: ARG002
+    ) -> Path:
         return destination
 
 
@@ -59,6 +69,31 @@ class TestArchiveExtractor:
             Extractor(gz_file)
         can_extract.assert_called_once_with(gz_file)
 
+    def test__delete_stale(self, tmp_path: Path) -> None:
+        """Test _delete_stale."""
+        for name in ["keep/file.txt", "keep/stale.txt", "stale/sub/file.txt", "excluded/file.txt", "file.log"]:
+            (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / name).touch()
+        (tmp_path / "empty").mkdir()
+        (tmp_path / "link").symlink_to(tmp_path / "keep", target_is_directory=True)
+        Extractor._delete_stale(tmp_path, ["keep/file.txt", "empty"], MemberFilter(exclude=["excluded/", "*.log"]))
+        assert sorted(path.relative_to(tmp_path).as_posix() for path in tmp_path.rglob("*")) == [
+            "empty",
+            "excluded",
+            "excluded/file.txt",
+            "file.log",
+            "keep",
+            "keep/file.txt",
+        ]
+
+    def test_sniff(self, mocker: MockerFixture) -> None:
+        """Test sniff."""
+        mocker.patch.object(Extractor, "MAGIC", ((0, b"AB"), (4, b"CD")))
+        assert Extractor.sniff(b"AB")
+        assert Extractor.sniff(b"....CD..")
+        assert not Extractor.sniff(b"..AB")
+        assert not Extractor.sniff(b"")
+
     def test___str__(self, gz_file: Path) -> None:
         """Test __str__."""
         assert str(Extractor(gz_file)) == str(gz_file)
@@ -76,3 +111,58 @@ class TestArchiveExtractor:
     def test_can_extract_false_file_not_found(self, tmp_path: Path) -> None:
         """Test can_extract False due to file not found."""
         assert not Extractor.can_extract(tmp_path)
+
+
+class TestMemberFilter:
+    """Test MemberFilter."""
+
+    def test___call__(self) -> None:
+        """Test __call__ without any filters."""
+        member_filter = MemberFilter()
+        assert not member_filter
+        assert member_filter("any/file.txt")
+        assert not member_filter.done
+
+    def test___call___exclude(self) -> None:
+        """Test __call__ with exclude."""
+        member_filter = MemberFilter(exclude=["*.pyc", "cache/"], members=["src"])
+        assert member_filter
+        assert member_filter("src/main.py")
+        assert not member_filter("src/main.pyc")
+        assert not member_filter("src/cache", is_dir=True)
+        assert not member_filter("src/cache/file.txt")
+        assert not member_filter("other.py")
+
+    def test___call___include(self) -> None:
+        """Test __call__ with include."""
+        member_filter = MemberFilter(include=["config/**", "*.md"], members=["bin/tool"])
+        assert member_filter("./config/app.yml")
+        assert member_filter("docs/README.md")
+        assert member_filter("bin/tool")
+        assert not member_filter("bin/other")
+        assert not member_filter.done  # anything could match include
+
+    def test___call___members(self) -> None:
+        """Test __call__ with members."""
+        member_filter = MemberFilter(members=["./bin/tool", "config/"])
+        assert member_filter.members == {"bin/tool", "config"}
+        assert member_filter("config", is_dir=True)
+        assert member_filter("./config/app.yml")
+        assert not member_filter("configuration.yml")
+        assert not member_filter.done  # a directory is never done
+        assert member_filter("/bin/tool")
+        assert not member_filter("bin/tool2")
+        assert not member_filter.done
+
+        member_filter = MemberFilter(members=["a.txt", "b.txt"])
+        assert member_filter("a.txt")
+        assert not member_filter.done
+        assert member_filter("b.txt")
+        assert member_filter.done
+
+    @pytest.mark.parametrize(
+        ("name", "expected"), [("a/b", "a/b"), ("./a/b/", "a/b"), ("././a", "a"), ("/a", "a"), ("./", "")]
+    )
+    def test_normalize(self, expected: str, name: str) -> None:
+        """Test normalize."""
+        assert MemberFilter.normalize(name) == expected
@@ -5,7 +5,7 @@ from __future__ import annotations
 import pickle
 from typing import TYPE_CHECKING
 
-from f_lib.archive_extractor.exceptions import ArchiveTypeError
+from f_lib.archive_extractor.exceptions import ArchiveTypeError, CompressionUnavailableError
 
 if TYPE_CHECKING:
     from pathlib import Path
@@ -24,3 +24,15 @@ class TestArchiveTypeError:
         assert str(round_trip) == str(exc)
         assert round_trip.archive == exc.archive
         assert round_trip.supported_suffix == exc.supported_suffix
+
+
+class TestCompressionUnavailableError:
+    """Test CompressionUnavailableError."""
+
+    def test_pickle(self) -> None:
+        """Test pickling."""
+        exc = CompressionUnavailableError("zst")
+
+        round_trip = pickle.loads(pickle.dumps(exc))
+        assert str(round_trip) == str(exc) == "zst compression is not supported by the current version of Python"
+        assert round_trip.compression == exc.compression
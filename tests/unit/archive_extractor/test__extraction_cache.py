@@ -0,0 +1,268 @@
+"""Test f_lib.archive_extractor._extraction_cache."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+import pytest
+
+from f_lib.archive_extractor._extraction_cache import ExtractionCache, _lock_file
+from f_lib.archive_extractor._zip_extractor import ZipExtractor
+from f_lib.utils import FileHash
+
+if TYPE_CHECKING:
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.archive_extractor._extraction_cache"
+
+
+def make_archive(path: Path, files: dict[str, bytes]) -> ZipExtractor:
+    """Create a zip archive and return an extractor for it."""
+    with zipfile.ZipFile(path, "w") as file_obj:
+        for name, content in files.items():
+            file_obj.writestr(name, content)
+    return ZipExtractor(path)
+
+
+def read_tree(root: Path) -> dict[str, bytes | None]:
+    """Read the contents of each file and directory in a directory tree."""
+    return {
+        path.relative_to(root).as_posix(): None if path.is_dir() else path.read_bytes()
+        for path in sorted(root.rglob("*"))
+    }
+
+
+class TestExtractionCache:
+    """Test ExtractionCache."""
+
+    def test___init__(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test __init__."""
+        mocker.patch(f"{MODULE}.OsInfo", return_value=Mock(user_data_dir=tmp_path / "data"))
+        obj = ExtractionCache()
+        assert obj.root == tmp_path / "data" / ExtractionCache.DIRECTORY_NAME
+        assert obj.file_hash.algorithm == "sha256-256"
+        assert obj.link == "hardlink"
+        assert obj.max_size is None
+
+    def test___init___raise_value_error(self, tmp_path: Path) -> None:
+        """Test __init__ raises ValueError."""
+        with pytest.raises(ValueError, match="link must be one of"):
+            ExtractionCache(tmp_path, link="copy")  # pyright: ignore[reportArgumentType]
+
+    def test_evict(self, tmp_path: Path) -> None:
+        """Test evict removes the least recently used trees."""
+        obj = ExtractionCache(tmp_path / "cache", max_size=25)
+        for index, size in enumerate([10, 10, 10]):
+            (tmp_path / "cache" / f"key{index}").mkdir(parents=True)
+            (tmp_path / "cache" / f"key{index}" / "file").write_bytes(b"0" * size)
+            obj._write_metadata(f"key{index}", size)
+            os.utime(tmp_path / "cache" / f"key{index}.json", (index, index))
+        (tmp_path / "cache" / "key1.json").unlink()  # recreated from the tree as most recently used
+        assert obj.evict(keep=("key0",)) == ["key2"]
+        assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == [
+            ".locks",
+            ".tmp",
+            "key0",
+            "key0.json",
+            "key1",
+            "key1.json",
+        ]
+        assert json.loads((tmp_path / "cache" / "key1.json").read_text()) == {"size": 10}
+        assert not list((tmp_path / "cache" / ".tmp").iterdir())
+        assert not list((tmp_path / "cache" / ".locks").iterdir())  # lock file of key2 removed
+
+    def test_evict_in_use(self, tmp_path: Path) -> None:
+        """Test evict does not remove trees or temporary directories that are in use."""
+        obj = ExtractionCache(tmp_path, max_size=0)
+        for key in ["key0", "key1"]:
+            (tmp_path / key).mkdir()
+            (tmp_path / key / "file").write_bytes(b"0")
+            (tmp_path / ".tmp" / f"{key}.abc123").mkdir(parents=True)
+        with obj._lock("key0", shared=True):
+            assert obj.evict() == ["key1"]
+        assert [path.name for path in (tmp_path / ".tmp").iterdir()] == ["key0.abc123"]
+        assert (tmp_path / "key0").is_dir()
+        assert obj.evict() == ["key0"]
+        assert not list((tmp_path / ".tmp").iterdir())
+
+    def test__lock_removed(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test _lock locks the new lock file when it was removed while waiting for the lock."""
+        obj = ExtractionCache(tmp_path)
+
+        def remove_then_lock(fileno: int, **kwargs: bool) -> bool:
+            if lock_file.call_count == 1:
+                (tmp_path / ".locks" / "key").unlink()  # evicted by another process
+            return _lock_file(fileno, **kwargs)
+
+        lock_file = mocker.patch(f"{MODULE}._lock_file", side_effect=remove_then_lock)
+        with obj._lock("key") as locked:
+            assert locked
+            assert (tmp_path / ".locks" / "key").is_file()
+        assert lock_file.call_count == 2
+
+    def test_evict_no_max_size(self, tmp_path: Path) -> None:
+        """Test evict without max_size."""
+        (tmp_path / "key").mkdir()
+        assert ExtractionCache(tmp_path).evict() == []
+        assert ExtractionCache(tmp_path / "missing", max_size=0).evict() == []
+        assert (tmp_path / "key").is_dir()
+
+    def test_extract(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract only extracts an archive once."""
+        extractor = make_archive(tmp_path / "archive.zip", {"dir/": b"", "dir/file.txt": b"file", "other.txt": b"o"})
+        extract = mocker.spy(extractor, "extract")
+        obj = ExtractionCache(tmp_path / "cache")
+        evict = mocker.spy(obj, "evict")
+        assert obj.extract(extractor, tmp_path / "first") == tmp_path / "first"
+        assert obj.extract(extractor, tmp_path / "second") == tmp_path / "second"
+        extract.assert_called_once()
+        evict.assert_called_once_with(keep=(obj.key(extractor.archive),))  # only when not cached
+        expected = {"dir": None, "dir/file.txt": b"file", "other.txt": b"o"}
+        assert read_tree(tmp_path / "first") == read_tree(tmp_path / "second") == expected
+        key = obj.key(extractor.archive)
+        assert (tmp_path / "second" / "other.txt").samefile(tmp_path / "cache" / key / "other.txt")
+        assert json.loads((tmp_path / "cache" / f"{key}.json").read_text()) == {"size": 5}
+
+    def test_extract_concurrent(self, tmp_path: Path) -> None:
+        """Test extract when the archive was extracted by another process at the same time."""
+        obj = ExtractionCache(tmp_path / "cache")
+        archive = tmp_path / "archive.zip"
+        archive.write_bytes(b"archive")
+        key = obj.key(archive)
+
+        def extract(destination: Path, **_: object) -> Path:
+            (tmp_path / "cache" / key).mkdir()
+            (tmp_path / "cache" / key / "winner.txt").write_bytes(b"winner")
+            (destination / "loser.txt").write_bytes(b"loser")
+            return destination
+
+        obj.extract(Mock(archive=archive, extract=extract), tmp_path / "out")
+        assert read_tree(tmp_path / "out") == {"winner.txt": b"winner"}
+        assert not list((tmp_path / "cache" / ".tmp").iterdir())
+
+    def test_extract_removed(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract extracts the archive again if the cached tree is removed without holding its lock."""
+        extractor = make_archive(tmp_path / "archive.zip", {"file.txt": b"file"})
+        obj = ExtractionCache(tmp_path / "cache")
+        obj.extract(extractor, tmp_path / "first")
+        touch = mocker.patch.object(obj, "_touch", side_effect=obj._remove)
+        obj.extract(extractor, tmp_path / "second")
+        touch.assert_called_once_with(obj.key(extractor.archive))
+        assert read_tree(tmp_path / "second") == {"file.txt": b"file"}
+        obj._remove("missing")  # already removed
+
+    def test__materialize_missing(self, tmp_path: Path) -> None:
+        """Test _materialize raises FileNotFoundError when the cached tree is missing."""
+        with pytest.raises(FileNotFoundError):
+            ExtractionCache(tmp_path / "cache")._materialize(tmp_path / "missing", tmp_path / "out")
+
+    def test_extract_error(self, tmp_path: Path) -> None:
+        """Test extract does not leave a partially extracted tree."""
+        obj = ExtractionCache(tmp_path / "cache")
+        archive = tmp_path / "archive.zip"
+        archive.write_bytes(b"archive")
+        with pytest.raises(zipfile.BadZipFile):
+            obj.extract(ZipExtractor(archive), tmp_path / "out")
+        assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == [".locks", ".tmp"]
+        assert not list((tmp_path / "cache" / ".tmp").iterdir())
+
+    def test_extract_raise_os_error(self, tmp_path: Path) -> None:
+        """Test extract raises OSError when the tree can't be moved into the cache."""
+        extractor = make_archive(tmp_path / "archive.zip", {"file.txt": b"file"})
+        obj = ExtractionCache(tmp_path / "cache")
+        (tmp_path / "cache").mkdir()
+        (tmp_path / "cache" / obj.key(extractor.archive)).touch()
+        with pytest.raises(OSError):  # noqa: PT011
+            obj.extract(extractor, tmp_path / "out")
+        assert not list((tmp_path / "cache" / ".tmp").iterdir())
+
+    def test_extract_evict(self, tmp_path: Path) -> None:
+        """Test extract evicts trees, except the one extracted, when max_size is exceeded."""
+        obj = ExtractionCache(tmp_path / "cache", max_size=5)
+        first = make_archive(tmp_path / "first.zip", {"file.txt": b"first"})
+        second = make_archive(tmp_path / "second.zip", {"file.txt": b"second"})
+        obj.extract(first, tmp_path / "first")
+        obj.extract(second, tmp_path / "second")
+        assert [path.name for path in (tmp_path / "cache").iterdir() if path.is_dir() and path.name[0] != "."] == [
+            obj.key(second.archive)
+        ]
+        assert (tmp_path / "first" / "file.txt").read_bytes() == b"first"
+
+    def test_extract_hardlink_fallback(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract copies files when they can't be hard linked."""
+        mocker.patch.object(Path, "hardlink_to", side_effect=OSError)
+        extractor = make_archive(tmp_path / "archive.zip", {"file.txt": b"file"})
+        obj = ExtractionCache(tmp_path / "cache")
+        obj.extract(extractor, tmp_path / "out")
+        assert (tmp_path / "out" / "file.txt").read_bytes() == b"file"
+        assert not (tmp_path / "out" / "file.txt").samefile(
+            tmp_path / "cache" / obj.key(extractor.archive) / "file.txt"
+        )
+
+    def test_extract_members(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract caches trees with different members separately."""
+        extractor = make_archive(tmp_path / "archive.zip", {"a.txt": b"a", "b.txt": b"b"})
+        extract = mocker.spy(extractor, "extract")
+        obj = ExtractionCache(tmp_path / "cache")
+        obj.extract(extractor, tmp_path / "a", members=iter(["a.txt"]))
+        obj.extract(extractor, tmp_path / "b", include=["b.*"])
+        obj.extract(extractor, tmp_path / "a2", members=["a.txt"])
+        assert extract.call_count == 2
+        assert read_tree(tmp_path / "a") == read_tree(tmp_path / "a2") == {"a.txt": b"a"}
+        assert read_tree(tmp_path / "b") == {"b.txt": b"b"}
+        assert obj.key(extractor.archive, members=["a.txt"]) != obj.key(extractor.archive)
+
+    @pytest.mark.skipif(sys.platform != "linux", reason="requires Linux")
+    @pytest.mark.parametrize("supported", [False, True])
+    def test_extract_reflink(self, mocker: MockerFixture, supported: bool, tmp_path: Path) -> None:
+        """Test extract with reflink."""
+        ioctl = mocker.patch("fcntl.ioctl", side_effect=None if supported else OSError)
+        copy2 = mocker.spy(__import__(MODULE, fromlist=["shutil"]).shutil, "copy2")
+        extractor = make_archive(tmp_path / "archive.zip", {"file.txt": b"file"})
+        ExtractionCache(tmp_path / "cache", link="reflink").extract(extractor, tmp_path / "out")
+        ioctl.assert_called_once()
+        assert copy2.call_count == (0 if supported else 1)
+        assert (tmp_path / "out" / "file.txt").is_file()
+
+    def test_extract_replace(self, tmp_path: Path) -> None:
+        """Test extract replaces files and symbolic links in the destination."""
+        extractor = make_archive(tmp_path / "archive.zip", {"file.txt": b"file"})
+        obj = ExtractionCache(tmp_path / "cache")
+        key = obj.key(extractor.archive)
+        obj.extract(extractor, tmp_path / "out")
+        (tmp_path / "cache" / key / "link").symlink_to("file.txt")
+        (tmp_path / "cache" / key / "dir_link").symlink_to(".", target_is_directory=True)
+        (tmp_path / "cache" / f"{key}.json").unlink()  # recreated when used
+        (tmp_path / "out" / "file.txt").unlink()
+        (tmp_path / "out" / "file.txt").write_bytes(b"modified")
+        (tmp_path / "out" / "link").write_bytes(b"not a link")
+        obj.extract(extractor, tmp_path / "out")
+        assert (tmp_path / "out" / "file.txt").read_bytes() == b"file"
+        assert (tmp_path / "out" / "link").readlink() == Path("file.txt")
+        assert (tmp_path / "out" / "dir_link").readlink() == Path()
+        assert (tmp_path / "cache" / f"{key}.json").is_file()
+
+    def test_extract_symlink(self, tmp_path: Path) -> None:
+        """Test extract with symlink."""
+        extractor = make_archive(tmp_path / "archive.zip", {"file.txt": b"file"})
+        obj = ExtractionCache(tmp_path / "cache", link="symlink")
+        obj.extract(extractor, tmp_path / "out" / "sub")
+        obj.extract(extractor, tmp_path / "out" / "sub")
+        assert (tmp_path / "out" / "sub").readlink() == (tmp_path / "cache" / obj.key(extractor.archive)).resolve()
+        assert read_tree(tmp_path / "out" / "sub") == {"file.txt": b"file"}
+
+    def test_key(self, tmp_path: Path) -> None:
+        """Test key."""
+        (tmp_path / "archive.zip").write_bytes(b"archive")
+        obj = ExtractionCache(tmp_path, file_hash=FileHash(hashlib.md5()))  # noqa: S324
+        assert obj.key(tmp_path / "archive.zip") == f"md5-128-{hashlib.md5(b'archive').hexdigest()}"  # noqa: S324
+        assert obj.key(tmp_path / "archive.zip", exclude=["*.txt"]) != obj.key(
+            tmp_path / "archive.zip", include=["*.txt"]
+        )
@@ -0,0 +1,101 @@
+"""Test f_lib.archive_extractor._registry."""
+
+from __future__ import annotations
+
+import shutil
+import zipfile
+from typing import TYPE_CHECKING, ClassVar
+
+import pytest
+
+from f_lib.archive_extractor._registry import get_extractor, register_extractor
+from f_lib.archive_extractor._tar_extractor import TarExtractor
+from f_lib.archive_extractor._zip_extractor import ZipExtractor
+from f_lib.archive_extractor.exceptions import ArchiveTypeError
+
+from ...utils import get_archive_fixture
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+    from ...utils import ArchiveFixtureLiteral
+
+MODULE = "f_lib.archive_extractor._registry"
+
+
+class CustomExtractor(ZipExtractor):
+    """Extractor registered in tests."""
+
+    MAGIC: ClassVar[tuple[tuple[int, bytes], ...]] = ((0, b"PK\x03\x04"),)
+
+
+@pytest.fixture
+def extractors(mocker: MockerFixture) -> list[type[object]]:
+    """Isolate the registered extractors."""
+    return mocker.patch(f"{MODULE}.EXTRACTORS", [ZipExtractor, TarExtractor])
+
+
+class TestGetExtractor:
+    """Test get_extractor."""
+
+    @pytest.mark.parametrize(
+        ("archive_name", "expected"),
+        [
+            ("bz2_file", TarExtractor),
+            ("gz_file", TarExtractor),
+            ("gzip_file", TarExtractor),
+            ("tar_file", TarExtractor),
+            ("xz_file", TarExtractor),
+            ("zip_file", ZipExtractor),
+        ],
+    )
+    def test_get_extractor(
+        self,
+        archive_name: ArchiveFixtureLiteral,
+        expected: type[object],
+        request: pytest.FixtureRequest,
+        tmp_path: Path,
+    ) -> None:
+        """Test get_extractor selects the extractor by magic bytes, ignoring the suffix."""
+        archive = shutil.copyfile(get_archive_fixture(request, archive_name), tmp_path / "archive.bin")
+        extractor = get_extractor(archive)
+        assert type(extractor) is expected
+        assert extractor.archive == archive
+
+    def test_get_extractor_suffix(self, tmp_path: Path) -> None:
+        """Test get_extractor falls back to the suffix."""
+        archive = tmp_path / "archive.zip"
+        archive.write_bytes(b"#!/bin/sh\nexit 0\n")
+        with zipfile.ZipFile(archive, "a") as file_obj:  # self extracting archive
+            file_obj.writestr("file.txt", b"file")
+        assert type(get_extractor(str(archive))) is ZipExtractor
+
+    def test_get_extractor_raise_archive_type_error(self, tmp_path: Path) -> None:
+        """Test get_extractor raises ArchiveTypeError."""
+        (tmp_path / "archive.bin").write_bytes(b"not an archive")
+        with pytest.raises(ArchiveTypeError, match=r"\.tar\.zst"):
+            get_extractor(tmp_path / "archive.bin")
+
+    def test_get_extractor_raise_file_not_found(self, tmp_path: Path) -> None:
+        """Test get_extractor raises FileNotFoundError."""
+        with pytest.raises(FileNotFoundError):
+            get_extractor(tmp_path / "missing.zip")
+
+
+class TestRegisterExtractor:
+    """Test register_extractor."""
+
+    @pytest.mark.usefixtures("extractors")
+    def test_register_extractor(self, zip_file: Path) -> None:
+        """Test register_extractor gives the extractor precedence."""
+        assert register_extractor(CustomExtractor) is CustomExtractor
+        assert type(get_extractor(zip_file)) is CustomExtractor
+        register_extractor(ZipExtractor)
+        assert type(get_extractor(zip_file)) is ZipExtractor
+
+    def test_register_extractor_order(self, extractors: list[type[object]]) -> None:
+        """Test register_extractor does not register an extractor more than once."""
+        register_extractor(TarExtractor)
+        assert extractors == [TarExtractor, ZipExtractor]
@@ -2,13 +2,18 @@
 
 from __future__ import annotations
 
+import io
+import os
+import tarfile
+import threading
 from typing import TYPE_CHECKING
 from unittest.mock import MagicMock, Mock
 
 import pytest
 
 from f_lib.archive_extractor._tar_extractor import TarExtractor
-from f_lib.archive_extractor.exceptions import ArchiveTypeError, Pep706Error
+from f_lib.archive_extractor._tar_index import TarIndex
+from f_lib.archive_extractor.exceptions import ArchiveTypeError, CompressionUnavailableError, Pep706Error
 
 from ...utils import get_archive_fixture
 
@@ -58,3 +63,152 @@ class TestTarExtractor:
         tmp_file.touch()
         with pytest.raises(Pep706Error):
             TarExtractor(tmp_file).extract(tmp_path)
+
+    @pytest.mark.parametrize("archive_name", ["bz2_file", "gz_file", "gzip_file", "tar_file", "xz_file"])
+    def test_extract_stream(
+        self, archive_name: ArchiveFixtureLiteral, request: pytest.FixtureRequest, tmp_path: Path
+    ) -> None:
+        """Test extract_stream with a pipe, which can't seek."""
+        archive = get_archive_fixture(request, archive_name)
+        read_fd, write_fd = os.pipe()
+
+        def write() -> None:
+            with os.fdopen(write_fd, "wb") as stream:
+                stream.write(archive.read_bytes())
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        with os.fdopen(read_fd, "rb") as stream:
+            assert TarExtractor.extract_stream(stream, tmp_path / "out") == tmp_path / "out"
+        writer.join()
+        assert (tmp_path / "out" / "src" / "test.txt").is_file()
+
+    def test_extract_stream_data_filter(self, tmp_path: Path) -> None:
+        """Test extract_stream uses the data filter."""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as file_obj:
+            info = tarfile.TarInfo("../outside.txt")
+            file_obj.addfile(info, io.BytesIO(b""))
+        buffer.seek(0)
+        with pytest.raises(tarfile.OutsideDestinationError):
+            TarExtractor.extract_stream(buffer, tmp_path / "out")
+        assert not (tmp_path / "outside.txt").exists()
+
+    def test_extract_stream_raise_pep706(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract_stream raises Pep706Error."""
+        tar_file = mocker.patch(f"{MODULE}.tarfile")
+        del tar_file.data_filter
+        with pytest.raises(Pep706Error):
+            TarExtractor.extract_stream(io.BytesIO(), tmp_path)
+        tar_file.open.assert_not_called()
+
+    def test_extract_members(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract with members stops reading the archive once they are found."""
+        archive = tmp_path / "archive.tar.gz"
+        with tarfile.open(archive, mode="w:gz") as file_obj:
+            for name in ["./bin/tool", "./config/app.yml", *(f"./data/{index}.bin" for index in range(20))]:
+                info = tarfile.TarInfo(name)
+                info.size = len(name)
+                file_obj.addfile(info, io.BytesIO(name.encode()))
+        next_member = mocker.spy(tarfile.TarFile, "next")
+        TarExtractor(archive).extract(tmp_path / "out", members=["bin/tool", "config/app.yml"])
+        assert sorted(path.relative_to(tmp_path / "out").as_posix() for path in (tmp_path / "out").rglob("*.*")) == [
+            "config/app.yml"
+        ]
+        assert (tmp_path / "out" / "bin" / "tool").read_bytes() == b"./bin/tool"
+        assert next_member.call_count <= 3  # the first member is read when opened
+
+    def test_extract_stream_filter(self, tmp_path: Path, tar_file: Path) -> None:
+        """Test extract_stream with include and exclude."""
+        with tar_file.open("rb") as stream:
+            TarExtractor.extract_stream(stream, tmp_path / "out", include=["*.txt"], exclude=["other/"])
+        assert (tmp_path / "out" / "src" / "test.txt").is_file()
+        with tar_file.open("rb") as stream:
+            TarExtractor.extract_stream(stream, tmp_path / "excluded", exclude=["*.txt"])
+        assert not list((tmp_path / "excluded").rglob("*.txt"))
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_extract_incremental(self, mocker: MockerFixture, stream: bool, tmp_path: Path) -> None:
+        """Test extract incremental only writes members that changed and delete removes stale files."""
+        archive = tmp_path / "archive.tar"
+        contents = {"same.txt": b"same", "size.txt": b"new size", "mtime.txt": b"mtime", "dir/new.txt": b"new"}
+        with tarfile.open(archive, mode="w") as file_obj:
+            info = tarfile.TarInfo("dir")
+            info.type = tarfile.DIRTYPE
+            file_obj.addfile(info)
+            for name, content in contents.items():
+                info = tarfile.TarInfo(name)
+                info.size, info.mtime = len(content), 1_700_000_000
+                file_obj.addfile(info, io.BytesIO(content))
+        out = tmp_path / "out"
+        out.mkdir()
+        for name, content in {"same.txt": b"same", "size.txt": b"old", "mtime.txt": b"MTIME", "stale.txt": b""}.items():
+            (out / name).write_bytes(content)
+            os.utime(out / name, (1_700_000_000, 1_700_000_000 + (name == "mtime.txt")))
+        (out / "excluded.txt").touch()
+        extract = mocker.spy(tarfile.TarFile, "_extract_one")
+        if stream:
+            with archive.open("rb") as file_obj:
+                TarExtractor.extract_stream(file_obj, out, delete=True, exclude=["excluded.txt"], incremental=True)
+        else:
+            TarExtractor(archive).extract(out, delete=True, exclude=["excluded.txt"], incremental=True)
+        assert sorted(call.args[1].name for call in extract.call_args_list) == [
+            "dir",
+            "dir/new.txt",
+            "mtime.txt",
+            "size.txt",
+        ]
+        assert {name: (out / name).read_bytes() for name in contents} == contents
+        assert sorted(path.relative_to(out).as_posix() for path in out.rglob("*")) == [
+            "dir",
+            "dir/new.txt",
+            "excluded.txt",
+            "mtime.txt",
+            "same.txt",
+            "size.txt",
+        ]
+
+    def test_index(self, mocker: MockerFixture, xz_file: Path) -> None:
+        """Test index builds and saves the index once."""
+        build = mocker.spy(TarIndex, "build")
+        extractor = TarExtractor(xz_file)
+        index = extractor.index()
+        assert index.path.is_file()
+        assert extractor.index().members == index.members
+        build.assert_called_once_with(xz_file, checkpoint_interval=None)
+        extractor.index(checkpoint_interval=1, rebuild=True)
+        assert build.call_count == 2
+        with tarfile.open(xz_file) as file_obj:
+            expected = file_obj.extractfile("src/test.txt").read()  # pyright: ignore[reportOptionalMemberAccess]
+        assert extractor.read_member("src/test.txt") == expected
+
+    def test_index_cached(self, mocker: MockerFixture, xz_file: Path) -> None:
+        """Test index is kept by the instance until the archive changes."""
+        extractor = TarExtractor(xz_file)
+        index = extractor.index()
+        load = mocker.spy(TarIndex, "load")
+        assert extractor.index() is index
+        assert extractor.read_member("src/test.txt")
+        load.assert_not_called()
+        os.utime(xz_file, ns=(0, 0))
+        assert extractor.index() is not index
+        load.assert_called_once_with(xz_file)
+
+    def test_index_save_error(self, mocker: MockerFixture, xz_file: Path) -> None:
+        """Test index is returned when it can't be saved."""
+        mocker.patch.object(TarIndex, "save", side_effect=PermissionError)
+        index = TarExtractor(xz_file).index()
+        assert not index.path.exists()
+        assert index.members
+
+    def test_extract_zst(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract with zstd compression."""
+        archive = tmp_path / "archive.tar.zst"
+        archive.write_bytes(b"\x28\xb5\x2f\xfd" + b"\0" * 100)
+        mocker.patch.dict(tarfile.TarFile.OPEN_METH, clear=True, values={"tar": "taropen"})
+        with pytest.raises(CompressionUnavailableError, match="zst compression"):
+            TarExtractor(archive).extract(tmp_path / "out")
+        mocker.patch.dict(tarfile.TarFile.OPEN_METH, {"zst": "taropen"})
+        tarfile_open = mocker.patch(f"{MODULE}.tarfile.open")
+        assert TarExtractor(archive).extract(tmp_path / "out") == tmp_path / "out"
+        tarfile_open.assert_called_once_with(archive, mode="r:*")
@@ -0,0 +1,172 @@
+"""Test f_lib.archive_extractor._tar_index."""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import tarfile
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+import pytest
+
+from f_lib.archive_extractor._tar_index import (
+    TarIndex,
+    _DecompressingReader,
+    _new_decompressor,
+    _read_xz_block_header,
+    _xz_checkpoints,
+)
+from f_lib.archive_extractor.exceptions import CompressionUnavailableError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.archive_extractor._tar_index"
+
+CONTENTS = {f"./data/{index}.bin": bytes([index]) * (index * 3000) for index in range(20)}
+
+COMPRESS: dict[str, Callable[[bytes], bytes]] = {
+    "": lambda data: data,
+    "bz2": bz2.compress,
+    "gz": gzip.compress,
+    "xz": lambda data: lzma.compress(data, format=lzma.FORMAT_XZ) + b"\0" * 4,  # with stream padding
+}
+
+
+def make_archive(path: Path, compression: str, *, pieces: int = 4) -> Path:
+    """Create a ``.tar`` archive compressed as a series of streams."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w", format=tarfile.PAX_FORMAT) as file_obj:
+        directory = tarfile.TarInfo("./data")
+        directory.type = tarfile.DIRTYPE
+        file_obj.addfile(directory)
+        for name, content in CONTENTS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            file_obj.addfile(info, io.BytesIO(content))
+        link = tarfile.TarInfo("./link")
+        link.type, link.linkname = tarfile.SYMTYPE, "data/1.bin"
+        file_obj.addfile(link)
+    data = buffer.getvalue()
+    step = -(-len(data) // pieces)
+    path.write_bytes(b"".join(COMPRESS[compression](data[start : start + step]) for start in range(0, len(data), step)))
+    return path
+
+
+class TestTarIndex:
+    """Test TarIndex."""
+
+    @pytest.mark.parametrize("compression", ["", "bz2", "gz", "xz"])
+    def test_build(self, compression: str, tmp_path: Path) -> None:
+        """Test build and read."""
+        archive = make_archive(tmp_path / "archive.tar", compression)
+        index = TarIndex.build(archive, checkpoint_interval=1)
+        assert index.compression == compression
+        assert len(index.checkpoints) == (4 if compression else 1)
+        assert index.checkpoints[0].uncompressed_offset == 0
+        assert sorted(index.members) == sorted(name[2:] for name in CONTENTS)
+        for name, content in CONTENTS.items():
+            assert index.read(name) == content
+        assert not index.stale
+
+    def test_build_checkpoint_interval(self, tmp_path: Path) -> None:
+        """Test build only records checkpoints at least checkpoint_interval apart."""
+        archive = make_archive(tmp_path / "archive.tar.gz", "gz", pieces=8)
+        assert len(TarIndex.build(archive).checkpoints) == 1
+        assert 1 < len(TarIndex.build(archive, checkpoint_interval=200_000).checkpoints) < 8
+
+    def test_load(self, tmp_path: Path) -> None:
+        """Test load."""
+        archive = make_archive(tmp_path / "archive.tar.xz", "xz")
+        assert TarIndex.load(archive) is None
+        index = TarIndex.build(archive)
+        assert index.save() == tmp_path / f"archive.tar.xz{TarIndex.SUFFIX}"
+        loaded = TarIndex.load(archive)
+        assert loaded
+        assert loaded.checkpoints == index.checkpoints
+        assert loaded.members == index.members
+        assert loaded.read("data/19.bin") == CONTENTS["./data/19.bin"]
+        assert index.save(tmp_path / "other.json") == tmp_path / "other.json"
+        assert TarIndex.load(archive, path=tmp_path / "other.json")
+
+    def test_load_invalid(self, tmp_path: Path) -> None:
+        """Test load with an invalid, outdated, or stale sidecar file."""
+        archive = make_archive(tmp_path / "archive.tar", "")
+        index = TarIndex.build(archive)
+        index.path.write_text("{")
+        assert TarIndex.load(archive) is None
+        index.path.write_text(json.dumps({"version": 0}))
+        assert TarIndex.load(archive) is None
+        index.save()
+        os.utime(archive, ns=(0, 0))
+        assert TarIndex.load(archive) is None
+
+    def test_read_raise_key_error(self, tmp_path: Path) -> None:
+        """Test read raises KeyError for members that are not files."""
+        index = TarIndex.build(make_archive(tmp_path / "archive.tar", ""))
+        for name in ["data", "link", "missing"]:
+            with pytest.raises(KeyError):
+                index.read(name)
+
+    @pytest.mark.parametrize("compression", ["gz", "xz"])
+    def test_read_raise_read_error(self, compression: str, tmp_path: Path) -> None:
+        """Test read raises ReadError when the archive changed or is truncated."""
+        archive = make_archive(tmp_path / "archive.tar", compression)
+        index = TarIndex.build(archive)
+        archive.write_bytes(archive.read_bytes()[:-200])
+        with pytest.raises(tarfile.ReadError, match="changed since it was indexed"):
+            index.read("data/19.bin")
+        index.size, index.mtime_ns = archive.stat().st_size, archive.stat().st_mtime_ns
+        with pytest.raises(tarfile.ReadError, match="unexpected end of archive"):
+            index.read("data/19.bin")
+        archive.unlink()
+        assert index.stale
+
+    def test__new_decompressor_zst(self, mocker: MockerFixture) -> None:
+        """Test _new_decompressor with zstd compression."""
+        mocker.patch(f"{MODULE}._zstd", None)
+        with pytest.raises(CompressionUnavailableError):
+            _new_decompressor("zst")
+        zstd = mocker.patch(f"{MODULE}._zstd", Mock())
+        assert _new_decompressor("zst") is zstd.ZstdDecompressor.return_value
+
+    def test_build_zst(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test build detects zstd compression."""
+        mocker.patch(f"{MODULE}._zstd", None)
+        archive = tmp_path / "archive.tar.zst"
+        archive.write_bytes(b"\x28\xb5\x2f\xfd" + b"\0" * 100)
+        with pytest.raises(CompressionUnavailableError):
+            TarIndex.build(archive)
+
+    def test__read_xz_block_header(self) -> None:
+        """Test _read_xz_block_header with compressed and uncompressed sizes."""
+        header = b"\x02\xc0\x10\x20\x21\x01\x16\x00\x00\x00\x00\x00"
+        assert _read_xz_block_header(io.BytesIO(header + b"data")) == [
+            {"id": lzma.FILTER_LZMA2, "dict_size": 8 * 1024 * 1024}
+        ]
+
+    def test__xz_checkpoints_raise_read_error(self) -> None:
+        """Test _xz_checkpoints raises ReadError."""
+        with pytest.raises(tarfile.ReadError, match="invalid xz stream footer"):
+            _xz_checkpoints(io.BytesIO(b"\xfd7zXZ\x00 not an xz file"))
+
+
+class TestDecompressingReader:
+    """Test _DecompressingReader."""
+
+    @pytest.mark.parametrize("compression", ["", "bz2", "gz", "xz"])
+    def test_read(self, compression: str) -> None:
+        """Test read until the end of a series of compressed streams."""
+        data = COMPRESS[compression](b"first") + COMPRESS[compression](b"second")
+        reader = _DecompressingReader(io.BytesIO(data), compression, checkpoint_interval=1)
+        assert reader.readable()
+        assert reader.read() == b"firstsecond"
+        assert reader.checkpoints[-1].uncompressed_offset == (5 if compression else 0)
@@ -2,6 +2,11 @@
 
 from __future__ import annotations
 
+import os
+import time
+import zipfile
+import zlib
+from contextlib import nullcontext
 from typing import TYPE_CHECKING
 from unittest.mock import MagicMock, Mock
 
@@ -18,6 +23,14 @@ if TYPE_CHECKING:
 MODULE = "f_lib.archive_extractor._zip_extractor"
 
 
+def read_tree(root: Path) -> dict[str, bytes | None]:
+    """Read the contents of each file and directory in a directory tree."""
+    return {
+        path.relative_to(root).as_posix(): None if path.is_dir() else path.read_bytes()
+        for path in sorted(root.rglob("*"))
+    }
+
+
 class TestZipExtractor:
     """Test ZipExtractor."""
 
@@ -36,3 +49,120 @@ class TestZipExtractor:
         assert ZipExtractor(zip_file).extract(tmp_path) == tmp_path
         zipfile_kls.assert_called_once_with(zip_file, mode="r")
         extract.assert_called_once_with(tmp_path)
+
+    @pytest.mark.parametrize("max_workers", [None, 1, 3])
+    def test_extract_parallel(self, max_workers: int | None, tmp_path: Path) -> None:
+        """Test extract in parallel is the same as extracting serially."""
+        archive = tmp_path / "archive.zip"
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as file_obj:
+            file_obj.writestr("empty/", b"")
+            file_obj.writestr("empty.txt", b"")
+            for index in range(50):
+                file_obj.writestr(f"dir{index % 5}/sub{index % 3}/file{index}.bin", os.urandom(index * 1000))
+            file_obj.writestr("../outside.txt", b"outside")
+            file_obj.writestr("./dir0/./dot.txt", b"dot")
+            file_obj.writestr("dir1/duplicate.txt", b"first")
+            for content in (b"second", b"third"):
+                with pytest.warns(UserWarning, match="Duplicate name"):
+                    file_obj.writestr("dir1/duplicate.txt", content)
+
+        extractor = ZipExtractor(archive)
+        assert extractor.extract(tmp_path / "serial") == tmp_path / "serial"
+        assert extractor.extract(tmp_path / "parallel", max_workers=max_workers, parallel=True) == tmp_path / "parallel"
+        assert read_tree(tmp_path / "parallel") == read_tree(tmp_path / "serial")
+        assert (tmp_path / "parallel" / "dir1" / "duplicate.txt").read_bytes() == b"third"
+        assert (tmp_path / "parallel" / "outside.txt").is_file()
+
+    def test_extract_parallel_empty(self, tmp_path: Path) -> None:
+        """Test extract in parallel with an archive that does not contain any files."""
+        archive = tmp_path / "archive.zip"
+        with zipfile.ZipFile(archive, "w") as file_obj:
+            file_obj.writestr("empty/", b"")
+        assert ZipExtractor(archive).extract(tmp_path / "out", parallel=True) == tmp_path / "out"
+        assert read_tree(tmp_path / "out") == {"empty": None}
+
+    @pytest.mark.parametrize("parallel", [False, True])
+    def test_extract_members(self, mocker: MockerFixture, parallel: bool, tmp_path: Path) -> None:
+        """Test extract with members, include, and exclude only reads selected members."""
+        archive = tmp_path / "archive.zip"
+        with zipfile.ZipFile(archive, "w") as file_obj:
+            file_obj.writestr("bin/", b"")
+            for name in ["bin/tool", "bin/other", "config/app.yml", "config/secret.yml", "data/large.bin"]:
+                file_obj.writestr(name, name)
+        zip_open = mocker.spy(zipfile.ZipFile, "open")
+        ZipExtractor(archive).extract(
+            tmp_path / "out", exclude=["secret.*"], include=["config/**"], members=["bin/tool"], parallel=parallel
+        )
+        assert read_tree(tmp_path / "out") == {
+            "bin": None,
+            "bin/tool": b"bin/tool",
+            "config": None,
+            "config/app.yml": b"config/app.yml",
+        }
+        assert sorted(call.args[1].filename for call in zip_open.call_args_list) == ["bin/tool", "config/app.yml"]
+
+    @pytest.mark.parametrize("parallel", [False, True])
+    def test_extract_incremental(self, mocker: MockerFixture, parallel: bool, tmp_path: Path) -> None:
+        """Test extract incremental only writes members that changed and delete removes stale files."""
+        archive = tmp_path / "archive.zip"
+        date_time = (2024, 1, 2, 3, 4, 6)
+        mtime = time.mktime((*date_time, 0, 0, -1))
+        contents = {
+            "crc.txt": b"crc",
+            "dir/new.txt": b"new",
+            "dup.txt": b"second",
+            "fixed.txt": b"new!",  # same size and modification time
+            "mtime.txt": b"mtime",
+            "same.txt": b"same",
+            "size.txt": b"new size",
+        }
+        with zipfile.ZipFile(archive, "w") as file_obj:
+            file_obj.writestr("dir/", b"")
+            file_obj.writestr(zipfile.ZipInfo("dup.txt", date_time), b"first")
+            for name, content in contents.items():
+                with pytest.warns(UserWarning, match="Duplicate name") if name == "dup.txt" else nullcontext():
+                    file_obj.writestr(zipfile.ZipInfo(name, date_time), content)
+        out = tmp_path / "out"
+        out.mkdir()
+        for name, content in {
+            "crc.txt": b"crc",
+            "dup.txt": b"second",
+            "fixed.txt": b"old!",
+            "mtime.txt": b"MTIME",
+            "same.txt": b"same",
+            "size.txt": b"old",
+            "stale.txt": b"",
+        }.items():
+            (out / name).write_bytes(content)
+            os.utime(out / name, (mtime, mtime if name in ("fixed.txt", "same.txt") else mtime - 60))
+        (out / "excluded.txt").touch()
+        zip_open = mocker.spy(zipfile.ZipFile, "open")
+        ZipExtractor(archive).extract(out, delete=True, exclude=["excluded.txt"], incremental=True, parallel=parallel)
+        assert sorted(call.args[1].filename for call in zip_open.call_args_list) == [
+            "dir/new.txt",
+            "fixed.txt",
+            "mtime.txt",
+            "size.txt",
+        ]
+        assert {name: (out / name).read_bytes() for name in contents} == contents
+        assert {(out / name).stat().st_mtime for name in contents} == {mtime}
+        assert sorted(read_tree(out)) == sorted(["dir", *contents, "excluded.txt"])
+
+    def test_extract_incremental_mtime(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test extract incremental trusts the modification time when the archive does not use fixed timestamps."""
+        archive = tmp_path / "archive.zip"
+        date_times = {"a.txt": (2024, 1, 2, 3, 4, 6), "b.txt": (2024, 1, 2, 3, 4, 8)}
+        with zipfile.ZipFile(archive, "w") as file_obj:
+            for name, date_time in date_times.items():
+                file_obj.writestr(zipfile.ZipInfo(name, date_time), b"new")
+        out = tmp_path / "out"
+        out.mkdir()
+        for name, date_time in date_times.items():
+            (out / name).write_bytes(b"old")
+            mtime = time.mktime((*date_time, 0, 0, -1))
+            os.utime(out / name, (mtime, mtime if name == "a.txt" else mtime - 60))
+        crc32 = mocker.patch(f"{MODULE}._crc32", return_value=zlib.crc32(b"old"))
+        ZipExtractor(archive).extract(out, incremental=True)
+        assert (out / "a.txt").read_bytes() == b"old"  # same size and modification time so not read
+        assert (out / "b.txt").read_bytes() == b"new"
+        crc32.assert_called_once_with(out / "b.txt")
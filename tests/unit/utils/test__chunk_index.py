@@ -0,0 +1,112 @@
+"""Test f_lib.utils._chunk_index."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+import pytest
+
+from f_lib.utils._chunk_index import ChunkIndex
+from f_lib.utils._content_defined_chunker import Chunk
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._chunk_index"
+
+
+def chunks(*digests: bytes) -> list[Chunk]:
+    """Create consecutive chunks with a size equal to the length of their digest."""
+    result: list[Chunk] = []
+    offset = 0
+    for digest in digests:
+        result.append(Chunk(offset, len(digest), digest))
+        offset += len(digest)
+    return result
+
+
+class TestChunkIndex:
+    """Test ChunkIndex."""
+
+    def test___init__(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test __init__."""
+        mocker.patch(f"{MODULE}.OsInfo", return_value=Mock(user_data_dir=tmp_path / "data"))
+        with ChunkIndex() as obj:
+            assert obj.path == tmp_path / "data" / ChunkIndex.FILE_NAME
+            assert obj.path.is_file()
+            assert len(obj) == 0
+
+    def test_add(self, tmp_path: Path) -> None:
+        """Test add."""
+        with ChunkIndex(tmp_path / "index.db") as obj:
+            assert obj.add("v1", chunks(b"a", b"bb", b"a")) == chunks(b"a", b"bb")
+            assert obj.add("v2", chunks(b"a", b"ccc")) == [Chunk(1, 3, b"ccc")]
+            assert len(obj) == 3
+            assert b"bb" in obj
+            assert obj.names() == ["v1", "v2"]
+            assert obj.get("v1") == chunks(b"a", b"bb", b"a")
+            assert obj.get("missing") == []
+
+            assert obj.add("v1", chunks(b"ccc", b"dddd")) == [Chunk(3, 4, b"dddd")]
+            assert b"bb" not in obj  # no longer used
+            assert b"a" in obj  # still used by v2
+            assert len(obj) == 3
+
+    def test_add_unlocked(self, tmp_path: Path) -> None:
+        """Test add collects the chunks before locking the index."""
+        with ChunkIndex(tmp_path / "index.db") as obj:
+
+            def unlocked_chunks() -> Iterator[Chunk]:
+                assert not obj._lock.locked()
+                assert not obj._connection.in_transaction
+                yield from chunks(b"a", b"bb")
+
+            assert obj.add("v1", unlocked_chunks()) == chunks(b"a", b"bb")
+
+    def test_add_rollback(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add does not change the index if an exception is raised."""
+
+        def failing_chunks() -> Iterator[Chunk]:
+            yield Chunk(0, 1, b"b")
+            raise ValueError
+
+        with ChunkIndex(tmp_path / "index.db") as obj:
+            obj.add("v1", chunks(b"a"))
+            with pytest.raises(ValueError):  # noqa: PT011
+                obj.add("v1", failing_chunks())
+            mocker.patch.object(obj, "_delete_unused_chunks", side_effect=ValueError)
+            with pytest.raises(ValueError):  # noqa: PT011
+                obj.add("v1", chunks(b"b"))
+            assert obj.get("v1") == chunks(b"a")
+            assert len(obj) == 1
+
+    def test_diff(self, tmp_path: Path) -> None:
+        """Test diff."""
+        with ChunkIndex(tmp_path / "index.db") as obj:
+            obj.add("v1", chunks(b"a", b"bb", b"ccc"))
+            obj.add("v2", chunks(b"a", b"dddd", b"ccc"))
+            assert obj.diff("v2", "v1") == [Chunk(1, 4, b"dddd")]
+            assert obj.diff("v1", "missing") == obj.get("v1")
+
+    def test_missing(self, tmp_path: Path) -> None:
+        """Test missing."""
+        with ChunkIndex(tmp_path / "index.db") as obj:
+            obj.add("v1", chunks(b"a"))
+            assert obj.missing(chunks(b"a", b"bb", b"bb")) == [Chunk(1, 2, b"bb")]
+            assert len(obj) == 1
+
+    def test_remove(self, tmp_path: Path) -> None:
+        """Test remove."""
+        with ChunkIndex(tmp_path / "index.db") as obj:
+            obj.add("v1", chunks(b"a", b"bb"))
+            obj.add("v2", chunks(b"a"))
+            obj.remove("v1")
+            assert obj.names() == ["v2"]
+            assert b"a" in obj
+            assert b"bb" not in obj
+            obj.remove("missing")
+            assert len(obj) == 1
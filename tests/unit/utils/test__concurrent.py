@@ -0,0 +1,46 @@
+"""Test f_lib.utils._concurrent."""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._concurrent import map_bounded
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+MODULE = "f_lib.utils._concurrent"
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+def test_map_bounded(ordered: bool) -> None:
+    """Test map_bounded."""
+    max_pending = 0
+    pending = 0
+    lock = threading.Lock()
+
+    def items() -> Iterator[int]:
+        nonlocal max_pending, pending
+        for item in range(20):
+            with lock:
+                pending += 1
+                max_pending = max(max_pending, pending)
+            yield item
+
+    def func(item: int) -> int:
+        nonlocal pending
+        with lock:
+            pending -= 1
+        return item * 2
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = list(map_bounded(executor, func, items(), max_pending=3, ordered=ordered))
+    if ordered:
+        assert result == [(item, item * 2) for item in range(20)]
+    else:
+        assert sorted(result) == [(item, item * 2) for item in range(20)]
+    assert max_pending <= 3
@@ -0,0 +1,100 @@
+"""Test f_lib.utils._content_defined_chunker."""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import random
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._content_defined_chunker import Chunk, ContentDefinedChunker
+from f_lib.utils._file_hash import FileHash
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+MODULE = "f_lib.utils._content_defined_chunker"
+
+
+def random_bytes(size: int, seed: int = 0) -> bytes:
+    """Create random but reproducible data."""
+    return random.Random(seed).randbytes(size)  # noqa: S311
+
+
+class TestContentDefinedChunker:
+    """Test ContentDefinedChunker."""
+
+    @pytest.mark.parametrize(
+        ("kwargs", "match"),
+        [
+            ({"avg_size": 32}, "power of 2 from 64"),
+            ({"avg_size": 100}, "power of 2 from 64"),
+            ({"avg_size": 2**28}, "power of 2 from 64"),
+            ({"avg_size": 64, "max_size": 32}, "min_size <= avg_size <= max_size"),
+            ({"avg_size": 64, "min_size": 0}, "min_size <= avg_size <= max_size"),
+        ],
+    )
+    def test___init___raise(self, kwargs: dict[str, int], match: str) -> None:
+        """Test __init__ raises ValueError for invalid sizes."""
+        with pytest.raises(ValueError, match=match):
+            ContentDefinedChunker(FileHash(hashlib.sha256()), **kwargs)
+
+    def test_chunk_file(self, tmp_path: Path) -> None:
+        """Test chunk_file."""
+        data = random_bytes(20_000)
+        (tmp_path / "test.bin").write_bytes(data)
+        chunker = ContentDefinedChunker(FileHash(hashlib.sha256()), avg_size=1024)
+        chunks = list(chunker.chunk_file(tmp_path / "test.bin"))
+        assert chunks == list(chunker.chunk_stream(io.BytesIO(data)))
+        assert all(chunk.digest == hashlib.sha256(data[chunk.offset : chunk.end]).digest() for chunk in chunks)
+
+    def test_chunk_stream(self) -> None:
+        """Test chunk_stream."""
+        data = random_bytes(100_000)
+        file_hash = FileHash(hashlib.sha256(), chunk_size=1000)
+        chunker = ContentDefinedChunker(file_hash, avg_size=1024)
+        chunks = list(chunker.chunk_stream(io.BytesIO(data)))
+        assert sum(chunk.size for chunk in chunks) == len(data)
+        assert [chunk.offset for chunk in chunks] == [0, *(chunk.end for chunk in chunks[:-1])]
+        assert all(chunker.min_size <= chunk.size <= chunker.max_size for chunk in chunks[:-1])
+        assert 512 < len(data) / len(chunks) < 2048
+        for chunk in chunks:
+            assert chunk.digest == hashlib.sha256(data[chunk.offset : chunk.end]).digest()
+        assert file_hash.digest == hashlib.sha256().digest()
+
+    def test_chunk_stream_empty(self) -> None:
+        """Test chunk_stream with an empty stream."""
+        assert not list(ContentDefinedChunker(FileHash(hashlib.sha256())).chunk_stream(io.BytesIO()))
+
+    def test_chunk_stream_shift(self) -> None:
+        """Test chunk_stream finds the same chunks after data is inserted."""
+        data = random_bytes(100_000)
+        changed = data[:50_000] + b"inserted" + data[50_000:]
+        chunker = ContentDefinedChunker(FileHash(hashlib.sha256()), avg_size=1024)
+        digests = [chunk.digest for chunk in chunker.chunk_stream(io.BytesIO(data))]
+        changed_digests = [chunk.digest for chunk in chunker.chunk_stream(io.BytesIO(changed))]
+        assert len(set(changed_digests) - set(digests)) <= 2
+        assert changed_digests[:10] == digests[:10]
+        assert changed_digests[-10:] == digests[-10:]
+
+    def test_find_boundary(self) -> None:
+        """Test find_boundary."""
+        chunker = ContentDefinedChunker(FileHash(hashlib.sha256()), avg_size=64, max_size=128, min_size=16)
+        assert chunker.find_boundary(b"\0" * 10) == 10
+        assert chunker.find_boundary(b"\0" * 1000) == 128  # never matches the mask
+        data = random_bytes(1000)
+        assert 16 < chunker.find_boundary(data) <= 128
+        assert chunker.find_boundary(data) == chunker.find_boundary(memoryview(data)[:128])
+
+    def test_gear(self) -> None:
+        """Test GEAR is stable."""
+        assert len(ContentDefinedChunker.GEAR) == 256
+        assert all(0 <= value < 2**29 for value in ContentDefinedChunker.GEAR)
+        assert ContentDefinedChunker.GEAR[0] == int.from_bytes(hashlib.sha256(b"\0").digest()[:4], "big") >> 3
+
+
+def test_chunk() -> None:
+    """Test Chunk."""
+    assert Chunk(10, 5, b"").end == 15
@@ -0,0 +1,126 @@
+"""Test f_lib.utils._digest_cache."""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+import pytest
+
+from f_lib.utils._digest_cache import DigestCache
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._digest_cache"
+
+
+def mock_stat(*, inode: int = 1, mtime_ns: int | None = None, size: int = 10) -> Mock:
+    """Create a mock ``os.stat_result``."""
+    return Mock(
+        st_dev=1,
+        st_ino=inode,
+        st_mtime_ns=time.time_ns() - 10_000_000_000 if mtime_ns is None else mtime_ns,
+        st_size=size,
+    )
+
+
+class TestDigestCache:
+    """Test DigestCache."""
+
+    def test___init__(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test __init__."""
+        mocker.patch(f"{MODULE}.OsInfo", return_value=Mock(user_data_dir=tmp_path / "data"))
+        with DigestCache() as obj:
+            assert obj.path == tmp_path / "data" / DigestCache.FILE_NAME
+            assert obj.path.is_file()
+            assert obj.hits == 0
+            assert obj.misses == 0
+            assert len(obj) == 0
+
+    def test_clear(self, tmp_path: Path) -> None:
+        """Test clear."""
+        with DigestCache(tmp_path / "cache.db") as obj:
+            file_stat = mock_stat()
+            obj.set(file_stat, "sha256-256", b"digest")
+            assert obj.get(file_stat, "sha256-256") == b"digest"
+            obj.clear()
+            assert len(obj) == 0
+            assert obj.hits == 0
+            assert obj.misses == 0
+
+    def test_evict(self, tmp_path: Path) -> None:
+        """Test evict removes the least recently used entries."""
+        with DigestCache(tmp_path / "cache.db", max_entries=2) as obj:
+            stats = [mock_stat(inode=i) for i in range(3)]
+            for i, file_stat in enumerate(stats):
+                obj.set(file_stat, "sha256-256", str(i).encode())
+            assert obj.get(stats[0], "sha256-256") == b"0"  # most recently used
+            assert obj.evict() == 1
+            assert len(obj) == 2
+            assert obj.get(stats[1], "sha256-256") is None
+            assert obj.get(stats[0], "sha256-256") == b"0"
+            assert obj.get(stats[2], "sha256-256") == b"2"
+            assert obj.evict() == 0
+
+    def test_get(self, tmp_path: Path) -> None:
+        """Test get."""
+        with DigestCache(tmp_path / "cache.db") as obj:
+            file_stat = mock_stat()
+            assert obj.get(file_stat, "sha256-256") is None
+            obj.set(file_stat, "sha256-256", b"digest")
+            assert obj.get(file_stat, "sha256-256") == b"digest"
+            assert obj.get(file_stat, "md5-128") is None
+            assert obj.get(mock_stat(size=11, mtime_ns=file_stat.st_mtime_ns), "sha256-256") is None
+            assert obj.get(mock_stat(mtime_ns=file_stat.st_mtime_ns + 1), "sha256-256") is None
+            assert obj.hits == 1
+            assert obj.misses == 4
+
+    def test_get_accessed(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test get writes when entries were last used in batches."""
+        mocker.patch.object(DigestCache, "ACCESS_UPDATE_INTERVAL", 2)
+        time_ns = mocker.patch(f"{MODULE}.time.time_ns", return_value=10_000_000_000)
+        stats = [mock_stat(inode=i, mtime_ns=0) for i in range(2)]
+        query = "SELECT inode, accessed_ns FROM digests ORDER BY inode"
+        with DigestCache(tmp_path / "cache.db") as obj:
+            for file_stat in stats:
+                obj.set(file_stat, "sha256-256", b"digest")
+            time_ns.return_value = 20_000_000_000
+            obj.get(stats[0], "sha256-256")
+            assert obj._connection.execute(query).fetchall() == [(0, 10_000_000_000), (1, 10_000_000_000)]
+            obj.get(stats[1], "sha256-256")
+            assert obj._connection.execute(query).fetchall() == [(0, 20_000_000_000), (1, 20_000_000_000)]
+            time_ns.return_value = 30_000_000_000
+            obj.get(stats[0], "sha256-256")
+        with DigestCache(tmp_path / "cache.db") as obj:  # pending update written when closed
+            assert obj._connection.execute(query).fetchall() == [(0, 30_000_000_000), (1, 20_000_000_000)]
+
+    def test_get_other_connection(self, tmp_path: Path) -> None:
+        """Test get with an entry stored by another connection (e.g. another process)."""
+        file_stat = mock_stat()
+        with DigestCache(tmp_path / "cache.db") as obj0, DigestCache(tmp_path / "cache.db") as obj1:
+            obj0.set(file_stat, "sha256-256", b"digest")
+            assert obj1.get(file_stat, "sha256-256") == b"digest"
+
+    def test_set_evict(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test set periodically evicts entries."""
+        mocker.patch.object(DigestCache, "EVICTION_INTERVAL", 2)
+        with DigestCache(tmp_path / "cache.db", max_entries=1) as obj:
+            evict = mocker.spy(obj, "evict")
+            obj.set(mock_stat(inode=0), "sha256-256", b"0")
+            evict.assert_not_called()
+            obj.set(mock_stat(inode=1), "sha256-256", b"1")
+            evict.assert_called_once_with()
+            assert len(obj) == 1
+
+    @pytest.mark.parametrize("age_ns", [0, DigestCache.RACY_WINDOW_NS - 100_000_000])
+    def test_set_recently_modified(self, age_ns: int, tmp_path: Path) -> None:
+        """Test set does not store the digest of recently modified files."""
+        with DigestCache(tmp_path / "cache.db") as obj:
+            file_stat = mock_stat(mtime_ns=time.time_ns() - age_ns)
+            obj.set(file_stat, "sha256-256", b"digest")
+            assert obj.get(file_stat, "sha256-256") is None
+            assert len(obj) == 0
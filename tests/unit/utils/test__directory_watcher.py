@@ -0,0 +1,215 @@
+"""Test f_lib.utils._directory_watcher."""
+
+from __future__ import annotations
+
+import hashlib
+import queue
+import shutil
+import sys
+import time
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._directory_watcher import IN_ISDIR, IN_MOVE_SELF, IN_Q_OVERFLOW, DirectoryWatcher, _Inotify
+from f_lib.utils._file_hash import FileHash
+from f_lib.utils._merkle_tree import MerkleTree, MerkleTreeChanges
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._directory_watcher"
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="requires inotify")
+
+
+@pytest.fixture
+def tree_dir(tmp_path: Path) -> Path:
+    """Create a directory tree."""
+    root = tmp_path / "root"
+    for name in ["a.txt", "x/b.txt", "x/y/c.txt", "ignored/d.txt"]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(name)
+    return root
+
+
+def expected_digest(root: Path) -> bytes:
+    """Calculate the expected digest of a directory tree."""
+    tree = MerkleTree(root, FileHash(hashlib.sha256()), exclude=["ignored/"])
+    tree.update()
+    return tree.digest
+
+
+def watch(root: Path) -> tuple[DirectoryWatcher, queue.Queue[MerkleTreeChanges]]:
+    """Create a watcher that puts changes in a queue."""
+    changes: queue.Queue[MerkleTreeChanges] = queue.Queue()
+    watcher = DirectoryWatcher(
+        root, FileHash(hashlib.sha256()), debounce=0.01, exclude=["ignored/"], on_change=changes.put
+    )
+    return watcher, changes
+
+
+class TestDirectoryWatcher:
+    """Test DirectoryWatcher."""
+
+    def test_directories(self, tmp_path: Path, tree_dir: Path) -> None:
+        """Test directories that are created, moved, or removed."""
+        watcher, changes = watch(tree_dir)
+        with watcher:
+            (tree_dir / "new" / "sub").mkdir(parents=True)
+            (tree_dir / "new" / "sub" / "e.txt").write_text("e")
+            while "new/sub/e.txt" not in changes.get(timeout=5).added:
+                pass
+            assert watcher.digest == expected_digest(tree_dir)
+
+            (tree_dir / "x").rename(tmp_path / "x")
+            assert changes.get(timeout=5).removed == ["x/b.txt", "x/y/c.txt"]
+            (tmp_path / "x" / "b.txt").write_text("outside")  # no longer watched
+            (tmp_path / "x").rename(tree_dir / "moved")
+            assert changes.get(timeout=5).added == ["moved/b.txt", "moved/y/c.txt"]
+
+            shutil.rmtree(tree_dir / "moved")
+            assert changes.get(timeout=5).removed == ["moved/b.txt", "moved/y/c.txt"]
+            assert watcher.digest == expected_digest(tree_dir)
+            assert sorted(watcher._watches.values()) == ["", "new", "new/sub"]
+
+    def test_files(self, tree_dir: Path) -> None:
+        """Test files that are created, modified, or removed."""
+        watcher, changes = watch(tree_dir)
+        assert watcher.digest == hashlib.sha256().digest()
+        with watcher:
+            assert watcher.running
+            assert changes.get_nowait().added == ["a.txt", "x/b.txt", "x/y/c.txt"]  # initial update
+            assert watcher.digest == expected_digest(tree_dir)
+            assert sorted(watcher._watches.values()) == ["", "x", "x/y"]
+
+            (tree_dir / "x" / "y" / "c.txt").write_text("changed")
+            assert changes.get(timeout=5).modified == ["x/y/c.txt"]
+            assert watcher.digest == expected_digest(tree_dir)
+            assert watcher.hexdigest == watcher.digest.hex()
+
+            (tree_dir / "ignored" / "d.txt").write_text("changed")  # not watched
+            (tree_dir / "new.txt").write_text("new")
+            (tree_dir / "a.txt").unlink()
+            assert changes.get(timeout=5) == MerkleTreeChanges(["new.txt"], [], ["a.txt"], [""])
+            assert watcher.digest == expected_digest(tree_dir)
+        assert not watcher.running
+        assert not watcher._watches
+        watcher.stop()  # already stopped
+
+    def test_max_delay(self, tree_dir: Path) -> None:
+        """Test changes are processed after max_delay while events are still received."""
+        changes: queue.Queue[MerkleTreeChanges] = queue.Queue()
+        watcher = DirectoryWatcher(
+            tree_dir, FileHash(hashlib.sha256()), debounce=60, max_delay=0.1, on_change=changes.put
+        )
+        with watcher:
+            changes.get_nowait()  # initial update
+            deadline = time.monotonic() + 5
+            while changes.empty() and time.monotonic() < deadline:  # never quiet for debounce seconds
+                (tree_dir / "a.txt").write_text(str(time.monotonic()))
+                time.sleep(0.01)
+            assert changes.get_nowait().modified == ["a.txt"]
+
+    def test_handle_event(self, tree_dir: Path) -> None:
+        """Test _handle_event with events that are not generated by the other tests."""
+        watcher, _ = watch(tree_dir)
+        inotify = _Inotify()
+        try:
+            assert not list(inotify.read_events())
+            watcher._watches = {1: "", 2: "x"}
+            paths: set[str] = set()
+            assert watcher._handle_event(inotify, -1, IN_Q_OVERFLOW, "", paths)
+            assert not watcher._handle_event(inotify, 3, 0, "unknown", paths)
+            assert watcher._handle_event(inotify, 1, IN_MOVE_SELF, "", paths)
+            assert not watcher._handle_event(inotify, 2, IN_MOVE_SELF, "", paths)
+            assert not watcher._handle_event(inotify, 2, IN_ISDIR, "y", paths)  # e.g. attributes changed
+            assert not paths
+        finally:
+            inotify.close()
+
+    def test_start_linux_only(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test start raises OSError on other operating systems."""
+        mocker.patch(f"{MODULE}.sys.platform", "darwin")
+        with pytest.raises(OSError, match="only available on Linux"):
+            DirectoryWatcher(tree_dir, FileHash(hashlib.sha256())).start()
+
+    def test_start_missing(self, tmp_path: Path) -> None:
+        """Test start when the root directory does not exist."""
+        watcher = DirectoryWatcher(tmp_path / "missing", FileHash(hashlib.sha256()))
+        with pytest.raises(FileNotFoundError):
+            watcher.start()
+        assert not watcher.running
+        assert not watcher._watches
+
+    def test_start_update_error(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test start raises errors hashing the tree."""
+        watcher = DirectoryWatcher(tree_dir, FileHash(hashlib.sha256()))
+        mocker.patch.object(watcher.tree, "update", side_effect=PermissionError)
+        with pytest.raises(PermissionError):
+            watcher.start()
+        assert not watcher.running
+        assert not watcher._watches
+
+    def test_start_running(self, tree_dir: Path) -> None:
+        """Test start raises RuntimeError when already running."""
+        with DirectoryWatcher(tree_dir, FileHash(hashlib.sha256())) as watcher, pytest.raises(RuntimeError):
+            watcher.start()
+
+    def test_start_subdirectory_removed(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test start when a subdirectory is removed before it can be watched."""
+        add_watch = mocker.patch.object(_Inotify, "add_watch", side_effect=[1, FileNotFoundError])
+        with DirectoryWatcher(tree_dir, FileHash(hashlib.sha256()), exclude=["ignored/"]) as watcher:
+            assert watcher._watches == {1: ""}
+        assert add_watch.call_count == 2
+
+    def test_update_error(self, caplog: pytest.LogCaptureFixture, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test errors updating the tree in the background thread are logged and the update is retried."""
+        watcher, changes = watch(tree_dir)
+        with watcher:
+            changes.get_nowait()  # initial update
+            digest = watcher.digest
+            update_paths = mocker.patch.object(watcher.tree, "update_paths", side_effect=PermissionError)
+            update = mocker.spy(watcher.tree, "update")
+            (tree_dir / "a.txt").write_text("changed")
+            assert changes.get(timeout=5) == MerkleTreeChanges([], ["a.txt"], [], [""])
+            assert update_paths.called
+            update.assert_called_once_with()  # retried by walking the whole tree
+            assert watcher.digest != digest
+        assert watcher.digest == expected_digest(tree_dir)
+        assert "failed to update digest" in caplog.text
+
+    def test_update_on_change_error(
+        self, caplog: pytest.LogCaptureFixture, mocker: MockerFixture, tree_dir: Path
+    ) -> None:
+        """Test errors raised by on_change in the background thread are logged and do not stop the thread."""
+        on_change = mocker.Mock(side_effect=[None, RuntimeError, None])
+        watcher = DirectoryWatcher(
+            tree_dir, FileHash(hashlib.sha256()), debounce=0.01, exclude=["ignored/"], on_change=on_change
+        )
+        with watcher:
+            (tree_dir / "a.txt").write_text("changed")
+            for _ in range(500):
+                if on_change.call_count == 2:
+                    break
+                time.sleep(0.01)
+            (tree_dir / "x" / "b.txt").write_text("changed")
+            for _ in range(500):
+                if on_change.call_count == 3:
+                    break
+                time.sleep(0.01)
+            assert watcher.running
+        assert on_change.call_count == 3
+        assert watcher.digest == expected_digest(tree_dir)
+        assert "error in on_change callback" in caplog.text
+
+    def test_update_on_change_error_not_running(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test errors raised by on_change are raised when the watcher is not running."""
+        watcher = DirectoryWatcher(
+            tree_dir, FileHash(hashlib.sha256()), on_change=mocker.Mock(side_effect=RuntimeError)
+        )
+        with pytest.raises(RuntimeError):
+            watcher.start()
+        assert not watcher.running
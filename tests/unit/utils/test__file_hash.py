@@ -2,16 +2,31 @@
 
 from __future__ import annotations
 
+import array
+import asyncio
 import hashlib
-from typing import TYPE_CHECKING
+import io
+import mmap
+import os
+import stat
+import subprocess
+import sys
+import threading
+import tracemalloc
+from typing import TYPE_CHECKING, Any, cast
+from unittest.mock import Mock
 
 import pytest
 
-from f_lib.utils._file_hash import FileHash
+from f_lib.utils._digest_cache import DigestCache
+from f_lib.utils._file_hash import FileHash, FileTreeDigest
+from f_lib.utils._hash_calibration import HashAlgorithmSpeed
 
 if TYPE_CHECKING:
     from pathlib import Path
 
+    from pytest_mock import MockerFixture
+
 MODULE = "f_lib.utils._file_hash"
 
 ALGS_TO_TEST = ["md5", "sha256"]
@@ -36,6 +51,90 @@ class TestFileHash:
         assert result.digest == expected.digest()
         assert result.hexdigest == expected.hexdigest()
 
+    @pytest.mark.parametrize("chunk_size", [1, 5, 12, 4096, None])
+    def test_add_file_chunk_size(self, chunk_size: int | None, tmp_path: Path) -> None:
+        """Test add_file with chunk sizes that do and don't divide the file size."""
+        content = os.urandom(10_000)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+
+        result = FileHash(hashlib.sha256(), chunk_size=chunk_size)
+        result.add_file(test_file)
+        assert result.digest == hashlib.sha256(content).digest()
+
+    def test_add_file_memory_is_bounded(self, tmp_path: Path) -> None:
+        """Test add_file memory use does not depend on the size of the file."""
+        chunk_size = 64 * 1024
+        test_file = tmp_path / "test.bin"
+        with test_file.open("wb") as stream:
+            for _ in range(256):  # 16 MiB
+                stream.write(os.urandom(chunk_size))
+
+        result = FileHash(hashlib.sha256(), chunk_size=chunk_size)
+        tracemalloc.start()
+        try:
+            result.add_file(test_file)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < chunk_size * 4
+        assert result.digest == hashlib.sha256(test_file.read_bytes()).digest()
+
+    @pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="requires posix_fadvise")
+    @pytest.mark.parametrize(("readahead", "expected_readahead"), [(None, FileHash.READAHEAD_SIZE), (4096, 4096)])
+    def test_add_file_fadvise(
+        self, expected_readahead: int, mocker: MockerFixture, readahead: int | None, tmp_path: Path
+    ) -> None:
+        """Test add_file with fadvise."""
+        content = os.urandom(10_000)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        posix_fadvise = mocker.spy(os, "posix_fadvise")
+
+        result = FileHash(hashlib.sha256(), chunk_size=4000, fadvise=True, readahead=readahead)
+        result.add_file(test_file)
+        assert result.digest == hashlib.sha256(content).digest()
+        assert [call.args[1:] for call in posix_fadvise.call_args_list] == [
+            (0, 0, os.POSIX_FADV_SEQUENTIAL),
+            (0, expected_readahead, os.POSIX_FADV_WILLNEED),
+            (0, 4000, os.POSIX_FADV_DONTNEED),
+            (expected_readahead, 4000, os.POSIX_FADV_WILLNEED),
+            (4000, 4000, os.POSIX_FADV_DONTNEED),
+            (4000 + expected_readahead, 4000, os.POSIX_FADV_WILLNEED),
+            (8000, 2000, os.POSIX_FADV_DONTNEED),
+            (8000 + expected_readahead, 2000, os.POSIX_FADV_WILLNEED),
+        ]
+
+    def test_add_file_fadvise_not_available(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        """Test add_file with fadvise where posix_fadvise is not available."""
+        monkeypatch.delattr(os, "posix_fadvise", raising=False)
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+        result = FileHash(hashlib.sha256(), fadvise=True)
+        result.add_file(test_file)
+        assert result.digest == hashlib.sha256(b"hello world!").digest()
+
+    @pytest.mark.parametrize(("min_security", "expected"), [(0, "md5"), (128, "blake2s"), (200, "sha512")])
+    def test_fastest(self, expected: str, mocker: MockerFixture, min_security: int) -> None:
+        """Test fastest."""
+        mocker.patch(
+            f"{MODULE}.calibrate_hash_algorithms",
+            return_value=[
+                HashAlgorithmSpeed("md5", 3.0, 0),
+                HashAlgorithmSpeed("blake2s", 2.0, 128),
+                HashAlgorithmSpeed("sha512", 1.0, 256),
+            ],
+        )
+        result = FileHash.fastest(min_security=min_security, chunk_size=10)
+        assert result._hash.name == expected
+        assert result.chunk_size == 10
+
+    def test_fastest_raise_value_error(self, mocker: MockerFixture) -> None:
+        """Test fastest raises ValueError when no algorithm is secure enough."""
+        mocker.patch(f"{MODULE}.calibrate_hash_algorithms", return_value=[HashAlgorithmSpeed("md5", 3.0, 0)])
+        with pytest.raises(ValueError, match="at least 128 bits"):
+            FileHash.fastest(min_security=128)
+
     @pytest.mark.parametrize("alg", ALGS_TO_TEST)
     def test_add_file_name(self, alg: str, tmp_path: Path) -> None:
         """Test add_file_name."""
@@ -119,3 +218,488 @@ class TestFileHash:
         assert result.digest_size == expected.digest_size
         assert result.digest == expected.digest()
         assert result.hexdigest == expected.hexdigest()
+
+    @pytest.mark.parametrize("alg", ALGS_TO_TEST)
+    def test_add_files_parallel(self, alg: str, tmp_path: Path) -> None:
+        """Test add_files_parallel."""
+        test_files = [tmp_path / f"test{i}.txt" for i in range(10)]
+        for i, test_file in enumerate(test_files):
+            test_file.write_text(f"hello world {i}!")
+
+        expected = hashlib.new(alg)
+        expected.update(f"f-lib.FileHash.v{FileHash.COMBINED_DIGEST_VERSION}\0".encode())
+        for test_file in test_files:
+            expected.update((str(test_file.relative_to(tmp_path)) + "\0").encode())
+            expected.update(hashlib.new(alg, test_file.read_bytes()).digest())
+
+        result = FileHash(hashlib.new(alg), chunk_size=1024)
+        result.add_files_parallel(test_files, max_workers=3, relative_to=tmp_path)
+        assert result.hexdigest == expected.hexdigest()
+
+    def test_add_files_parallel_worker_count(self, tmp_path: Path) -> None:
+        """Test add_files_parallel result does not depend on the number of workers."""
+        test_files = [tmp_path / f"test{i}.txt" for i in range(25)]
+        for i, test_file in enumerate(test_files):
+            test_file.write_text(str(i) * i)
+
+        results: set[str] = set()
+        for max_workers in (1, 2, 8, None):
+            result = FileHash(hashlib.sha256(), chunk_size=1024)
+            result.add_files_parallel(test_files, max_workers=max_workers)
+            results.add(result.hexdigest)
+        assert len(results) == 1
+
+    @pytest.mark.parametrize("alg", ALGS_TO_TEST)
+    def test_hash_file(self, alg: str, tmp_path: Path) -> None:
+        """Test hash_file."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+
+        obj = FileHash(hashlib.new(alg), chunk_size=1024)
+        initial = obj.digest
+        assert obj.hash_file(test_file) == hashlib.new(alg, b"hello world!").digest()
+        assert obj.digest == initial
+
+    @pytest.mark.parametrize(
+        ("chunk_size", "block_size", "expected"),
+        [
+            (10, 4096, 10),
+            (None, 0, FileHash.DEFAULT_CHUNK_SIZE),
+            (None, 4096, FileHash.DEFAULT_CHUNK_SIZE),
+            (None, 3000, 1050000),
+            (None, 4 * FileHash.DEFAULT_CHUNK_SIZE, 4 * FileHash.DEFAULT_CHUNK_SIZE),
+        ],
+    )
+    def test__get_chunk_size(self, block_size: int, chunk_size: int | None, expected: int) -> None:
+        """Test _get_chunk_size."""
+        file_stat = Mock(st_blksize=block_size)
+        assert FileHash(hashlib.sha256(), chunk_size=chunk_size)._get_chunk_size(file_stat) == expected
+
+    def test__get_chunk_size_no_block_size(self) -> None:
+        """Test _get_chunk_size when the platform does not provide st_blksize."""
+        assert FileHash(hashlib.sha256())._get_chunk_size(Mock(spec=[])) == FileHash.DEFAULT_CHUNK_SIZE
+
+    @pytest.mark.parametrize("use_mmap", [True, False, None])
+    def test_add_file_mmap(self, mocker: MockerFixture, tmp_path: Path, use_mmap: bool | None) -> None:
+        """Test add_file memory-maps the file when requested or when large enough."""
+        content = os.urandom(10_000)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        update_from_mmap = mocker.spy(FileHash, "_update_from_mmap")
+
+        result = FileHash(hashlib.sha256(), chunk_size=4096, mmap_threshold=len(content))
+        result.add_file(test_file, use_mmap=use_mmap)
+        assert result.digest == hashlib.sha256(content).digest()
+        if use_mmap is False:
+            update_from_mmap.assert_not_called()
+        else:
+            update_from_mmap.assert_called_once()
+
+    def test_add_file_mmap_default(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file memory-maps large files by default."""
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(b"0" * 10_000)
+        mocker.patch.object(FileHash, "MMAP_THRESHOLD", 10_000)
+        update_from_mmap = mocker.spy(FileHash, "_update_from_mmap")
+        FileHash(hashlib.sha256(), mmap_threshold=FileHash.MMAP_THRESHOLD).add_file(test_file)
+        update_from_mmap.assert_called_once()
+        assert FileHash(hashlib.sha256()).mmap_threshold == 64 * 1024 * 1024
+
+    def test_add_file_mmap_truncated(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file reads the rest of a memory-mapped file into a buffer when it is truncated."""
+        content = os.urandom(mmap.PAGESIZE * 4)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        fstat = os.fstat
+        calls: list[int] = []
+
+        def truncate_then_fstat(fd: int) -> os.stat_result:
+            calls.append(fd)
+            if len(calls) == 3:  # before the second slice is hashed
+                with test_file.open("r+b") as file_obj:
+                    file_obj.truncate(mmap.PAGESIZE * 2 + 10)
+            return fstat(fd)
+
+        mocker.patch(f"{MODULE}.os.fstat", side_effect=truncate_then_fstat)
+        result = FileHash(hashlib.sha256(), chunk_size=mmap.PAGESIZE * 2)
+        result.add_file(test_file, use_mmap=True)
+        assert result.digest == hashlib.sha256(content[: mmap.PAGESIZE * 2 + 10]).digest()
+
+    @pytest.mark.skipif(not hasattr(mmap, "MADV_DONTNEED"), reason="requires madvise")
+    def test_add_file_mmap_release(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file releases the pages of a memory-mapped file once they are hashed."""
+        content = os.urandom(mmap.PAGESIZE * 5 + 10)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        calls: list[tuple[int, int]] = []
+
+        class RecordingMmap(mmap.mmap):
+            def madvise(self, option: int, start: int = 0, length: int = 0) -> None:
+                if option == mmap.MADV_DONTNEED:
+                    calls.append((start, length))
+                super().madvise(option, start, length or len(self) - start)
+
+        mocker.patch(f"{MODULE}.mmap.mmap", RecordingMmap)
+        result = FileHash(hashlib.sha256(), chunk_size=mmap.PAGESIZE * 2)
+        result.add_file(test_file, use_mmap=True)
+        assert result.digest == hashlib.sha256(content).digest()
+        assert calls == [
+            (0, mmap.PAGESIZE * 2),
+            (mmap.PAGESIZE * 2, mmap.PAGESIZE * 2),
+            (mmap.PAGESIZE * 4, mmap.PAGESIZE),
+        ]
+
+    def test_add_file_mmap_empty_file(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file does not memory-map empty files."""
+        test_file = tmp_path / "test.bin"
+        test_file.touch()
+        update_from_mmap = mocker.spy(FileHash, "_update_from_mmap")
+
+        result = FileHash(hashlib.sha256())
+        result.add_file(test_file, use_mmap=True)
+        assert result.digest == hashlib.sha256().digest()
+        update_from_mmap.assert_not_called()
+
+    def test_add_file_mmap_fallback(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file falls back to reading into a buffer when the file can't be memory-mapped."""
+        content = os.urandom(10_000)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        mock_mmap = mocker.patch(f"{MODULE}.mmap.mmap", side_effect=OSError)
+
+        result = FileHash(hashlib.sha256(), chunk_size=4096)
+        result.add_file(test_file, use_mmap=True)
+        assert result.digest == hashlib.sha256(content).digest()
+        mock_mmap.assert_called_once()
+
+    @pytest.mark.parametrize(
+        ("mode", "size", "mmap_threshold", "use_mmap", "expected"),
+        [
+            (stat.S_IFREG, 10, 10, None, True),
+            (stat.S_IFREG, 9, 10, None, False),
+            (stat.S_IFREG, 9, 10, True, True),
+            (stat.S_IFREG, 10, 10, False, False),
+            (stat.S_IFREG, 10, None, None, False),
+            (stat.S_IFREG, 0, 0, True, False),
+            (stat.S_IFIFO, 10, 0, True, False),
+        ],
+    )
+    def test__should_mmap(
+        self, expected: bool, mmap_threshold: int | None, mode: int, size: int, use_mmap: bool | None
+    ) -> None:
+        """Test _should_mmap."""
+        obj = FileHash(hashlib.sha256(), mmap_threshold=mmap_threshold)
+        assert obj._should_mmap(Mock(st_mode=mode, st_size=size), use_mmap=use_mmap) is expected
+
+    @pytest.mark.parametrize(("use_mmap", "expected"), [(None, False), (True, True)])
+    def test__should_mmap_fadvise(self, expected: bool, use_mmap: bool | None) -> None:
+        """Test _should_mmap when fadvise is enabled."""
+        obj = FileHash(hashlib.sha256(), fadvise=True, mmap_threshold=0)
+        assert obj._should_mmap(Mock(st_mode=stat.S_IFREG, st_size=10), use_mmap=use_mmap) is expected
+
+    def test_hash_file_cache(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test hash_file with a cache."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+        os.utime(test_file, ns=(0, 0))
+        expected = hashlib.sha256(b"hello world!").digest()
+
+        with DigestCache(tmp_path / "cache.db") as cache:
+            obj = FileHash(hashlib.sha256(), cache=cache)
+            update_from_file = mocker.spy(obj, "_update_from_file")
+            assert obj.hash_file(test_file) == expected
+            assert obj.hash_file(test_file) == expected
+            update_from_file.assert_called_once()
+            assert cache.hits == 1
+            assert cache.misses == 1
+
+            test_file.write_text("hello world?")
+            assert obj.hash_file(test_file) == hashlib.sha256(b"hello world?").digest()
+            assert cache.misses == 2
+
+    def test_hash_file_cache_not_cacheable(self, tmp_path: Path) -> None:
+        """Test hash_file does not use the cache when the algorithm does not identify the digest."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+        os.utime(test_file, ns=(0, 0))
+        prefixed = hashlib.sha256(b"prefix")
+
+        with DigestCache(tmp_path / "cache.db") as cache:
+            for hash_alg in [
+                cast("hashlib._Hash", hashlib.blake2b(digest_size=16)),
+                cast("hashlib._Hash", hashlib.blake2b(digest_size=16, key=b"key")),
+                cast("hashlib._Hash", hashlib.blake2b(digest_size=16, person=b"person")),
+                prefixed,
+            ]:
+                expected = hash_alg.copy()
+                expected.update(b"hello world!")
+                assert FileHash(hash_alg, cache=cache).hash_file(test_file) == expected.digest()
+            assert len(cache) == 1
+            assert cache.misses == 1
+
+    @pytest.mark.parametrize(("name", "digest_size"), [("sha256", 16), ("unknown", 32)])
+    def test__cacheable_false(self, digest_size: int, name: str) -> None:
+        """Test _cacheable when a hash object can't be created from the name of the algorithm."""
+        hash_alg = Mock(digest_size=digest_size)
+        hash_alg.name = name
+        assert not FileHash(hash_alg)._cacheable
+
+    def test_algorithm(self) -> None:
+        """Test algorithm."""
+        assert FileHash(hashlib.sha256()).algorithm == "sha256-256"
+        assert FileHash(cast("hashlib._Hash", hashlib.blake2b(digest_size=16))).algorithm == "blake2b-128"
+
+    @pytest.mark.parametrize("parallel", [False, True])
+    def test_add_directory(self, parallel: bool, tmp_path: Path) -> None:
+        """Test add_directory."""
+        test_files = [tmp_path / "b.txt", tmp_path / "a" / "z.txt", tmp_path / "a.txt", tmp_path / "c.log"]
+        for test_file in test_files:
+            test_file.parent.mkdir(exist_ok=True)
+            test_file.write_text(test_file.name)
+
+        expected = FileHash(hashlib.sha256())
+        ordered = [tmp_path / "a.txt", tmp_path / "a" / "z.txt", tmp_path / "b.txt"]
+        if parallel:
+            expected.add_files_parallel(ordered, relative_to=tmp_path)
+        else:
+            expected.add_files(ordered, relative_to=tmp_path)
+
+        result = FileHash(hashlib.sha256())
+        result.add_directory(tmp_path, exclude=["*.log"], max_workers=2, parallel=parallel)
+        assert result.hexdigest == expected.hexdigest
+
+    def test_add_directory_cache(self, tmp_path: Path) -> None:
+        """Test add_directory uses the cache and the result of stat from walking the tree."""
+        root = tmp_path / "root"
+        root.mkdir()
+        for i in range(3):
+            (root / f"{i}.txt").write_text(str(i))
+            os.utime(root / f"{i}.txt", ns=(0, 0))
+
+        with DigestCache(tmp_path / "cache.db") as cache:
+            expected = FileHash(hashlib.sha256())
+            expected.add_directory(root, parallel=True)
+            for _ in range(2):
+                result = FileHash(hashlib.sha256(), cache=cache)
+                result.add_directory(root, parallel=True)
+                assert result.hexdigest == expected.hexdigest
+            assert cache.hits == 3
+            assert cache.misses == 3
+
+    @pytest.mark.parametrize(("size", "leaf_size"), [(0, 10), (10, 10), (25, 10), (1000, 64), (1000, 4096)])
+    def test_hash_file_tree(self, leaf_size: int, size: int, tmp_path: Path) -> None:
+        """Test hash_file_tree."""
+        content = os.urandom(size)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        expected_leaves = tuple(
+            hashlib.sha256(content[offset : offset + leaf_size]).digest() for offset in range(0, size, leaf_size)
+        )
+        expected_root = hashlib.sha256(
+            b"f-lib.FileHash.tree.v1\0"
+            + leaf_size.to_bytes(8, "big")
+            + size.to_bytes(8, "big")
+            + b"".join(expected_leaves)
+        ).digest()
+
+        obj = FileHash(hashlib.sha256(), chunk_size=7)
+        initial = obj.digest
+        for max_workers in (1, 4):
+            result = obj.hash_file_tree(test_file, leaf_size=leaf_size, max_workers=max_workers)
+            assert result == FileTreeDigest(expected_root, expected_leaves, leaf_size, size)
+            assert result.hexdigest == expected_root.hex()
+        assert obj.digest == initial
+
+    def test_add_file_tree(self, tmp_path: Path) -> None:
+        """Test add_file_tree."""
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(os.urandom(100))
+
+        obj = FileHash(hashlib.sha256())
+        result = obj.add_file_tree(test_file, leaf_size=16)
+        assert result == obj.hash_file_tree(test_file, leaf_size=16)
+        assert obj.digest == hashlib.sha256(result.root).digest()
+
+    def test_hash_file_tree_default_leaf_size(self, tmp_path: Path) -> None:
+        """Test hash_file_tree default leaf_size."""
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(b"foo")
+        result = FileHash(hashlib.sha256()).hash_file_tree(test_file)
+        assert result.leaf_size == FileHash.TREE_LEAF_SIZE
+        assert result.leaves == (hashlib.sha256(b"foo").digest(),)
+
+    def test_verify_file_tree(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test verify_file_tree."""
+        content = bytearray(os.urandom(100))
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        obj = FileHash(hashlib.sha256())
+        tree = obj.hash_file_tree(test_file, leaf_size=10)
+        assert obj.verify_file_tree(test_file, tree) == []
+
+        content[15] ^= 0xFF
+        content[99] ^= 0xFF
+        test_file.write_bytes(content)
+        assert obj.verify_file_tree(test_file, tree) == [1, 9]
+
+        hash_leaf = mocker.spy(obj, "_hash_leaf")
+        assert obj.verify_file_tree(test_file, tree, leaves=[0, 1, 20, -1]) == [-1, 1, 20]
+        assert hash_leaf.call_count == 2
+
+        test_file.write_bytes(content[:50])
+        assert obj.verify_file_tree(test_file, tree, leaves=[0, 2]) == [0, 2]
+
+    def test_add_file_async(self, tmp_path: Path) -> None:
+        """Test add_file_async."""
+        content = os.urandom(10_000)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+
+        obj = FileHash(hashlib.sha256(), chunk_size=1024)
+        asyncio.run(obj.add_file_async(test_file))
+        assert obj.digest == hashlib.sha256(content).digest()
+
+    def test_add_file_async_cancel(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file_async does not change the hash when cancelled."""
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(os.urandom(10_000))
+        started = threading.Event()
+        release = threading.Event()
+        update_from_stream = FileHash._update_from_stream
+
+        def _update_from_stream(*args: object) -> int:
+            started.set()
+            release.wait(5)
+            return update_from_stream(*args)  # type: ignore[arg-type]
+
+        mocker.patch.object(FileHash, "_update_from_stream", side_effect=_update_from_stream)
+        obj = FileHash(hashlib.sha256(), chunk_size=1024)
+        obj.add_file_name("foo")
+        initial = obj.digest
+
+        async def _run() -> None:
+            task = asyncio.create_task(obj.add_file_async(test_file))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            release.set()
+
+        asyncio.run(_run())
+        assert obj.digest == initial
+
+    @pytest.mark.parametrize("concurrency", [1, 3, None])
+    def test_add_files_async(self, concurrency: int | None, tmp_path: Path) -> None:
+        """Test add_files_async."""
+        test_files = [tmp_path / f"test{i}.txt" for i in range(10)]
+        for i, test_file in enumerate(test_files):
+            test_file.write_text(str(i) * i)
+
+        expected = FileHash(hashlib.sha256())
+        expected.add_files_parallel(test_files, relative_to=tmp_path)
+
+        obj = FileHash(hashlib.sha256())
+        asyncio.run(obj.add_files_async(test_files, concurrency=concurrency, relative_to=tmp_path))
+        assert obj.hexdigest == expected.hexdigest
+
+    def test_add_files_async_cancel(self, tmp_path: Path) -> None:
+        """Test add_files_async does not change the hash and cancels pending tasks when it raises."""
+        test_files = [tmp_path / f"test{i}.txt" for i in range(5)]
+        for test_file in test_files[1:]:
+            test_file.write_text(test_file.name)
+
+        obj = FileHash(hashlib.sha256())
+        initial = obj.digest
+
+        async def _run() -> list[asyncio.Task[Any]]:
+            with pytest.raises(FileNotFoundError):
+                await obj.add_files_async(test_files, concurrency=10)
+            return [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+        assert asyncio.run(_run()) == []
+        assert obj.digest == initial
+
+    def test_hash_file_async(self, tmp_path: Path) -> None:
+        """Test hash_file_async."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+        obj = FileHash(hashlib.sha256())
+        assert asyncio.run(obj.hash_file_async(test_file)) == hashlib.sha256(b"hello world!").digest()
+
+    def test_hash_file_async_cache(self, tmp_path: Path) -> None:
+        """Test hash_file_async with a cache."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+        os.utime(test_file, ns=(0, 0))
+
+        with DigestCache(tmp_path / "cache.db") as cache:
+            obj = FileHash(hashlib.sha256(), cache=cache)
+            for _ in range(2):
+                assert asyncio.run(obj.hash_file_async(test_file)) == hashlib.sha256(b"hello world!").digest()
+            assert cache.hits == 1
+            assert cache.misses == 1
+
+    def test_add_buffer(self, tmp_path: Path) -> None:
+        """Test add_buffer with objects that support the buffer protocol."""
+        numbers = array.array("d", [1.5, 2.5, 3.5])
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(b"mapped")
+        obj = FileHash(hashlib.sha256())
+        with test_file.open("rb") as stream, mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for buffer in [b"bytes", bytearray(b"bytearray"), memoryview(b"memoryview"), mapped, numbers]:
+                obj.add_buffer(buffer)
+        expected = hashlib.sha256(b"bytesbytearraymemoryviewmapped" + numbers.tobytes())
+        assert obj.digest == expected.digest()
+
+    def test_add_buffer_not_contiguous(self) -> None:
+        """Test add_buffer with a buffer that is not contiguous."""
+        with pytest.raises(BufferError):
+            FileHash(hashlib.sha256()).add_buffer(memoryview(b"abcdef")[::2])
+
+    def test_add_iter(self) -> None:
+        """Test add_iter."""
+        obj = FileHash(hashlib.sha256())
+        obj.add_iter(str(i).encode() for i in range(1000))
+        assert obj.digest == hashlib.sha256("".join(str(i) for i in range(1000)).encode()).digest()
+
+    @pytest.mark.parametrize(("chunk_size", "default_chunk_size"), [(None, None), (7, None), (None, 5), (7, 5)])
+    def test_add_stream(self, chunk_size: int | None, default_chunk_size: int | None, mocker: MockerFixture) -> None:
+        """Test add_stream."""
+        content = os.urandom(10_000)
+        stream = io.BytesIO(content)
+        readinto = mocker.spy(stream, "readinto")
+        obj = FileHash(hashlib.sha256(), chunk_size=default_chunk_size)
+        assert obj.add_stream(stream, chunk_size=chunk_size) == len(content)
+        assert obj.digest == hashlib.sha256(content).digest()
+        assert len(readinto.call_args_list[0].args[0]) == (
+            chunk_size or default_chunk_size or FileHash.DEFAULT_CHUNK_SIZE
+        )
+
+    def test_add_stream_pipe(self) -> None:
+        """Test add_stream with the output of a subprocess, which can't seek."""
+        script = "import sys\nfor i in range(1000): sys.stdout.buffer.write(str(i).encode() * 100)"
+        with subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE) as process:  # noqa: S603
+            assert process.stdout
+            obj = FileHash(hashlib.sha256())
+            size = obj.add_stream(process.stdout, chunk_size=4096)
+        expected = "".join(str(i) * 100 for i in range(1000)).encode()
+        assert size == len(expected)
+        assert obj.digest == hashlib.sha256(expected).digest()
+
+    def test_add_stream_read_only(self) -> None:
+        """Test add_stream with a stream that does not have a readinto method."""
+
+        class Reader:
+            def __init__(self, content: bytes) -> None:
+                self.stream = io.BytesIO(content)
+                self.sizes: list[int] = []
+
+            def read(self, size: int = -1) -> bytes:
+                self.sizes.append(size)
+                return self.stream.read(size)
+
+        reader = Reader(b"hello world!")
+        obj = FileHash(hashlib.sha256())
+        assert obj.add_stream(reader, chunk_size=5) == 12
+        assert obj.digest == hashlib.sha256(b"hello world!").digest()
+        assert reader.sizes == [5, 5, 5, 5]
@@ -0,0 +1,74 @@
+"""Test f_lib.utils._find_duplicates."""
+
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING
+
+from f_lib.utils._file_hash import FileHash
+from f_lib.utils._find_duplicates import find_duplicates
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._find_duplicates"
+
+
+def test_find_duplicates(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Test find_duplicates."""
+    contents = {
+        "empty0": b"",
+        "empty1": b"",
+        "large0": b"a" * 10 + b"b" * 10 + b"c" * 10,
+        "large1": b"a" * 10 + b"x" * 10 + b"c" * 10,  # same partial digest as large0
+        "large2": b"a" * 10 + b"b" * 10 + b"c" * 10,
+        "large3": b"z" * 30,
+        "small0": b"small",
+        "small1": b"other",
+        "small2": b"small",
+        "unique": b"unique size",
+    }
+    for name, content in contents.items():
+        (tmp_path / name).write_bytes(content)
+    (tmp_path / "dir").mkdir()
+    file_hash = FileHash(hashlib.sha256())
+    hash_file = mocker.spy(file_hash, "hash_file")
+
+    result = list(
+        find_duplicates(
+            [tmp_path / "dir", *(tmp_path / name for name in sorted(contents, reverse=True))],
+            file_hash,
+            max_workers=2,
+            partial_size=10,
+        )
+    )
+    assert result == [
+        [tmp_path / "empty1", tmp_path / "empty0"],
+        [tmp_path / "small2", tmp_path / "small0"],
+        [tmp_path / "large2", tmp_path / "large0"],
+    ]
+    assert sorted(call.args[0].name for call in hash_file.call_args_list) == ["large0", "large1", "large2"]
+    assert file_hash.digest == hashlib.sha256().digest()
+
+
+def test_find_duplicates_none(tmp_path: Path) -> None:
+    """Test find_duplicates without duplicates."""
+    (tmp_path / "empty").write_bytes(b"")
+    (tmp_path / "foo").write_bytes(b"foo")
+    (tmp_path / "bar").write_bytes(b"bar")
+    assert not list(find_duplicates(tmp_path.iterdir(), FileHash(hashlib.sha256())))
+
+
+def test_find_duplicates_inaccessible(tmp_path: Path) -> None:
+    """Test find_duplicates ignores paths that can't be accessed."""
+    (tmp_path / "foo0").write_bytes(b"foo")
+    (tmp_path / "foo1").write_bytes(b"foo")
+    (tmp_path / "broken").symlink_to(tmp_path / "missing")
+    assert list(
+        find_duplicates(
+            [tmp_path / "foo0", tmp_path / "broken", tmp_path / "missing", tmp_path / "foo1"],
+            FileHash(hashlib.sha256()),
+        )
+    ) == [[tmp_path / "foo0", tmp_path / "foo1"]]
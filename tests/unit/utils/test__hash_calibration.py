@@ -0,0 +1,98 @@
+"""Test f_lib.utils._hash_calibration."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING
+from unittest.mock import Mock
+
+from f_lib.utils._hash_calibration import (
+    CALIBRATION_FILE_NAME,
+    HASH_SECURITY,
+    HashAlgorithmSpeed,
+    calibrate_hash_algorithms,
+)
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._hash_calibration"
+
+
+class TestCalibrateHashAlgorithms:
+    """Test calibrate_hash_algorithms."""
+
+    def test_cached(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test the ranking is cached."""
+        mocker.patch(f"{MODULE}.OsInfo", return_value=Mock(user_data_dir=tmp_path / "data"))
+        measure = mocker.patch(f"{MODULE}._measure", return_value=1.0)
+        ranking = calibrate_hash_algorithms()
+        assert [path.name for path in (tmp_path / "data").iterdir()] == [CALIBRATION_FILE_NAME]
+        assert measure.call_count == len(ranking)
+        assert calibrate_hash_algorithms() == ranking
+        assert measure.call_count == len(ranking)
+        assert calibrate_hash_algorithms(recalibrate=True) == ranking
+        assert measure.call_count == len(ranking) * 2
+
+    def test_changed_host(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test the ranking is measured again on a different host."""
+        path = tmp_path / "calibration.json"
+        measure = mocker.patch(f"{MODULE}._measure", return_value=1.0)
+        calibrate_hash_algorithms(path=path)
+        mocker.patch(f"{MODULE}.platform.node", return_value="other")
+        calibrate_hash_algorithms(path=path)
+        assert json.loads(path.read_text())["host"]["node"] == "other"
+        assert measure.call_count == len(HASH_SECURITY) * 2
+
+    def test_changed_openssl(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test the ranking is measured again when the version of OpenSSL changes."""
+        path = tmp_path / "calibration.json"
+        measure = mocker.patch(f"{MODULE}._measure", return_value=1.0)
+        calibrate_hash_algorithms(path=path)
+        mocker.patch(f"{MODULE}.ssl.OPENSSL_VERSION", "OpenSSL 0.0.0")
+        calibrate_hash_algorithms(path=path)
+        assert json.loads(path.read_text())["host"]["openssl"] == "OpenSSL 0.0.0"
+        assert measure.call_count == len(HASH_SECURITY) * 2
+
+    def test_invalid_file(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test the ranking is measured again if the file can't be read."""
+        path = tmp_path / "calibration.json"
+        path.write_text("{")
+        measure = mocker.patch(f"{MODULE}._measure", return_value=1.0)
+        calibrate_hash_algorithms(path=path)
+        measure.assert_called()
+
+    def test_read_only(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test the ranking is returned without being cached if the file can't be written."""
+        mocker.patch(f"{MODULE}._measure", return_value=1.0)
+        mocker.patch(f"{MODULE}.Path.replace", side_effect=PermissionError)
+        assert calibrate_hash_algorithms(path=tmp_path / "data" / "calibration.json")
+        assert not list((tmp_path / "data").iterdir())
+        (tmp_path / "file").touch()
+        assert calibrate_hash_algorithms(path=tmp_path / "file" / "calibration.json")
+
+    def test_unusable(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test algorithms that are listed as available but can't be used are excluded."""
+        new = hashlib.new
+
+        def new_hash(name: str, *args: bytes) -> hashlib._Hash:
+            if name == "md5":
+                raise ValueError("unsupported hash type")  # noqa: EM101, TRY003
+            return new(name, *args)
+
+        mocker.patch(f"{MODULE}.hashlib.new", side_effect=new_hash)
+        ranking = calibrate_hash_algorithms(path=tmp_path / "calibration.json", repeat=1, size=1024)
+        assert "md5" not in {speed.name for speed in ranking}
+        assert ranking
+
+    def test_measure(self, tmp_path: Path) -> None:
+        """Test the speed of each algorithm is measured."""
+        ranking = calibrate_hash_algorithms(path=tmp_path / "calibration.json", repeat=1, size=1024)
+        assert {speed.name for speed in ranking} == set(HASH_SECURITY) & hashlib.algorithms_available
+        assert all(speed.bytes_per_second > 0 for speed in ranking)
+        assert ranking == sorted(ranking, key=lambda speed: speed.bytes_per_second, reverse=True)
+        assert all(speed.security == HASH_SECURITY[speed.name] for speed in ranking)
+        assert isinstance(ranking[0], HashAlgorithmSpeed)
@@ -0,0 +1,142 @@
+"""Test f_lib.utils._manifest."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import subprocess
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._file_hash import FileHash
+from f_lib.utils._manifest import ManifestEntry, ManifestMismatch, read_manifest, verify_manifest, write_manifest
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+MODULE = "f_lib.utils._manifest"
+
+
+def sha256(content: bytes) -> bytes:
+    """Calculate the SHA256 digest of content."""
+    return hashlib.sha256(content).digest()
+
+
+@pytest.fixture
+def tree_dir(tmp_path: Path) -> Path:
+    """Create a directory tree."""
+    root = tmp_path / "root"
+    for name in ["a.txt", "x/b.txt", "x/y/c.txt", "z.log"]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(name)
+    return root
+
+
+def test_read_manifest_binary_mode(tmp_path: Path) -> None:
+    """Test read_manifest with lines written in binary mode."""
+    (tmp_path / "SHA256SUMS").write_text(f"{sha256(b'').hex()} *a.txt\n\n")
+    assert list(read_manifest(tmp_path / "SHA256SUMS")) == [ManifestEntry("a.txt", sha256(b""))]
+
+
+@pytest.mark.parametrize("line", ["abcd", "abcd a.txt", "abcd  "])
+def test_read_manifest_invalid(line: str, tmp_path: Path) -> None:
+    """Test read_manifest with an invalid line."""
+    (tmp_path / "SHA256SUMS").write_text(line + "\n")
+    with pytest.raises(ValueError, match="invalid checksum line"):
+        list(read_manifest(tmp_path / "SHA256SUMS"))
+
+
+def test_verify_manifest(tmp_path: Path, tree_dir: Path) -> None:
+    """Test verify_manifest."""
+    file_hash = FileHash(hashlib.sha256())
+    with (tree_dir / "SHA256SUMS").open("w", newline="\n") as stream:
+        write_manifest(tree_dir, stream, file_hash, exclude=["SHA256SUMS"])
+    assert not list(verify_manifest(tree_dir / "SHA256SUMS", file_hash))
+
+    (tree_dir / "a.txt").write_text("changed")
+    (tree_dir / "x" / "b.txt").unlink()
+    (tree_dir / "new.txt").write_text("new")
+    assert sorted(verify_manifest(tree_dir / "SHA256SUMS", file_hash, max_workers=1)) == [
+        ManifestMismatch("a.txt", sha256(b"a.txt"), sha256(b"changed")),
+        ManifestMismatch("x/b.txt", sha256(b"x/b.txt"), None),
+    ]
+    assert len(list(verify_manifest(tree_dir / "SHA256SUMS", file_hash, fail_fast=True))) == 1
+
+    shutil.copytree(tree_dir, tmp_path / "copy")
+    (tmp_path / "copy" / "x" / "b.txt").write_text("x/b.txt")
+    assert list(verify_manifest(tree_dir / "SHA256SUMS", file_hash, root=tmp_path / "copy")) == [
+        ManifestMismatch("a.txt", sha256(b"a.txt"), sha256(b"changed"))
+    ]
+
+
+def test_verify_manifest_algorithm(tree_dir: Path) -> None:
+    """Test verify_manifest with a manifest written using a different algorithm."""
+    with (tree_dir / "MD5SUMS").open("w", newline="\n") as stream:
+        write_manifest(tree_dir, stream, FileHash(hashlib.md5()))  # noqa: S324
+    with pytest.raises(ValueError, match="in manifest is not sha256-256"):
+        list(verify_manifest(tree_dir / "MD5SUMS", FileHash(hashlib.sha256())))
+
+
+def test_verify_manifest_algorithm_json(tree_dir: Path) -> None:
+    """Test verify_manifest with a JSON manifest written using a different algorithm."""
+    with (tree_dir / "manifest.json").open("w", newline="\n") as stream:
+        write_manifest(tree_dir, stream, FileHash(hashlib.sha512()), manifest_format="json")
+    with pytest.raises(ValueError, match="manifest was written with sha512-512 not sha256-256"):
+        list(verify_manifest(tree_dir / "manifest.json", FileHash(hashlib.sha256())))
+
+
+def test_verify_manifest_size(tree_dir: Path) -> None:
+    """Test verify_manifest does not read files whose size does not match a JSON manifest."""
+    file_hash = FileHash(hashlib.sha256())
+    with (tree_dir / "manifest.json").open("w", newline="\n") as stream:
+        write_manifest(tree_dir, stream, file_hash, exclude=["manifest.json"], manifest_format="json")
+    (tree_dir / "a.txt").write_text("a")
+    assert list(verify_manifest(tree_dir / "manifest.json", file_hash)) == [
+        ManifestMismatch("a.txt", sha256(b"a.txt"), None)
+    ]
+
+
+def test_write_manifest(tree_dir: Path, tmp_path: Path) -> None:
+    """Test write_manifest."""
+    file_hash = FileHash(hashlib.sha256())
+    with (tmp_path / "SHA256SUMS").open("w", newline="\n") as stream:
+        assert write_manifest(tree_dir, stream, file_hash, exclude=["*.log"], max_workers=1) == 3
+    assert (tmp_path / "SHA256SUMS").read_text() == "".join(
+        f"{sha256(name.encode()).hex()}  {name}\n" for name in ["a.txt", "x/b.txt", "x/y/c.txt"]
+    )
+    assert list(read_manifest(tmp_path / "SHA256SUMS")) == [
+        ManifestEntry(name, sha256(name.encode())) for name in ["a.txt", "x/b.txt", "x/y/c.txt"]
+    ]
+    assert file_hash.digest == hashlib.sha256().digest()
+
+
+@pytest.mark.skipif(not shutil.which("sha256sum"), reason="requires sha256sum")
+def test_write_manifest_escape(tmp_path: Path) -> None:
+    """Test write_manifest with file names that must be escaped can be checked by sha256sum."""
+    names = ["back\\slash", "new\nline", "plain"]
+    for name in names:
+        (tmp_path / name).write_text(name)
+    with (tmp_path / "SHA256SUMS").open("w", newline="\n") as stream:
+        write_manifest(tmp_path, stream, FileHash(hashlib.sha256()), exclude=["SHA256SUMS"])
+    first_line = (tmp_path / "SHA256SUMS").read_text().splitlines()[0]
+    assert first_line == f"\\{sha256(names[0].encode()).hex()}  back\\\\slash"
+    assert [entry.path for entry in read_manifest(tmp_path / "SHA256SUMS")] == names
+    subprocess.run(["sha256sum", "--check", "--quiet", "SHA256SUMS"], check=True, cwd=tmp_path)  # noqa: S607
+
+
+def test_write_manifest_json(tree_dir: Path, tmp_path: Path) -> None:
+    """Test write_manifest JSON format."""
+    with (tmp_path / "manifest.json").open("w", newline="\n") as stream:
+        write_manifest(tree_dir, stream, FileHash(hashlib.sha256()), include=["x/"], manifest_format="json")
+    assert json.loads((tmp_path / "manifest.json").read_text()) == {
+        "algorithm": "sha256-256",
+        "files": [
+            {"digest": sha256(name.encode()).hex(), "path": name, "size": len(name)}
+            for name in ["x/b.txt", "x/y/c.txt"]
+        ],
+    }
+    assert list(read_manifest(tmp_path / "manifest.json")) == [
+        ManifestEntry(name, sha256(name.encode()), len(name)) for name in ["x/b.txt", "x/y/c.txt"]
+    ]
@@ -0,0 +1,218 @@
+"""Test f_lib.utils._merkle_tree."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._file_hash import FileHash
+from f_lib.utils._merkle_tree import MerkleTree, MerkleTreeChanges
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._merkle_tree"
+
+
+def write_file(path: Path, content: str) -> None:
+    """Write a file with a modification time that is not recent."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    mtime_ns = path.stat().st_mtime_ns - MerkleTree.RACY_WINDOW_NS * 2
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def tree_dir(tmp_path: Path) -> Path:
+    """Create a directory tree."""
+    root = tmp_path / "root"
+    for name in ["a.txt", "x/b.txt", "x/y/c.txt", "z/d.txt"]:
+        write_file(root / name, name)
+    return root
+
+
+class TestMerkleTree:
+    """Test MerkleTree."""
+
+    def test_digest(self, tree_dir: Path) -> None:
+        """Test digest."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash)
+        assert tree.digest == hashlib.sha256().digest()  # empty
+
+        tree.update()
+        expected_y = hashlib.sha256(b"fc.txt\0" + hashlib.sha256(b"x/y/c.txt").digest()).digest()
+        expected_x = hashlib.sha256(b"fb.txt\0" + hashlib.sha256(b"x/b.txt").digest() + b"dy\0" + expected_y).digest()
+        expected_z = hashlib.sha256(b"fd.txt\0" + hashlib.sha256(b"z/d.txt").digest()).digest()
+        expected = hashlib.sha256(
+            b"fa.txt\0" + hashlib.sha256(b"a.txt").digest() + b"dx\0" + expected_x + b"dz\0" + expected_z
+        ).digest()
+        assert tree.directories == {"": expected, "x": expected_x, "x/y": expected_y, "z": expected_z}
+        assert tree.digest == expected
+        assert tree.hexdigest == expected.hex()
+
+    def test_diff(self, tree_dir: Path) -> None:
+        """Test diff."""
+        file_hash = FileHash(hashlib.sha256())
+        previous = MerkleTree(tree_dir, file_hash)
+        previous.update()
+        tree = MerkleTree(tree_dir, file_hash)
+        tree.update()
+        assert tree.diff(previous) == []
+
+        write_file(tree_dir / "x" / "y" / "c.txt", "changed")
+        write_file(tree_dir / "new" / "e.txt", "new")
+        tree.update()
+        assert tree.diff(previous) == ["", "new", "x", "x/y"]
+        assert tree.diff(previous, path="x/y") == ["x/y"]
+        assert tree.diff(previous, path="z") == []
+
+    def test_save_load(self, tmp_path: Path, tree_dir: Path) -> None:
+        """Test save and load."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash, exclude=["z/"], include=["*.txt"])
+        tree.update()
+        tree.save(tmp_path / "tree.json")
+        assert [path.name for path in tmp_path.iterdir() if path.is_file()] == ["tree.json"]
+
+        loaded = MerkleTree.load(tmp_path / "tree.json", file_hash)
+        assert loaded.root == tree_dir
+        assert loaded.exclude == ["z/"]
+        assert loaded.include == ["*.txt"]
+        assert loaded.files == tree.files
+        assert loaded.directories == tree.directories
+        assert not loaded.update()
+
+        assert MerkleTree.load(tmp_path / "tree.json", file_hash, root=tmp_path).root == tmp_path
+
+    def test_save_error(self, mocker: MockerFixture, tmp_path: Path, tree_dir: Path) -> None:
+        """Test save removes the temporary file when it can't be written."""
+        tree = MerkleTree(tree_dir, FileHash(hashlib.sha256()))
+        tree.update()
+        mocker.patch(f"{MODULE}.json.dump", side_effect=OSError)
+        with pytest.raises(OSError):  # noqa: PT011
+            tree.save(tmp_path / "tree.json")
+        assert [path for path in tmp_path.iterdir() if path.is_file()] == []
+
+    def test_update_child_index(self, tree_dir: Path) -> None:
+        """Test the index of the children of each directory is kept up to date."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash)
+        tree.update()
+        assert tree._child_index() == {
+            "": {"a.txt", "x", "z"},
+            "x": {"x/b.txt", "x/y"},
+            "x/y": {"x/y/c.txt"},
+            "z": {"z/d.txt"},
+        }
+        assert sorted(tree._unchanged_children({"x"})["x"]) == [
+            (b"d", b"y", tree.directories["x/y"]),
+            (b"f", b"b.txt", tree.files["x/b.txt"].digest),
+        ]
+
+        (tree_dir / "x" / "y" / "c.txt").unlink()
+        write_file(tree_dir / "x" / "y" / "e.txt", "e")
+        tree.update()
+        assert tree._child_index()["x/y"] == {"x/y/e.txt"}
+        (tree_dir / "x" / "y" / "e.txt").unlink()
+        tree.update()
+        assert tree._child_index()["x"] == {"x/b.txt"}
+
+    @pytest.mark.parametrize("key", ["algorithm", "version"])
+    def test_load_incompatible(self, key: str, tmp_path: Path, tree_dir: Path) -> None:
+        """Test load a tree saved with a different algorithm or format version."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash)
+        tree.update()
+        tree.save(tmp_path / "tree.json")
+        data = json.loads((tmp_path / "tree.json").read_text())
+        data[key] = "other"
+        (tmp_path / "tree.json").write_text(json.dumps(data))
+
+        loaded = MerkleTree.load(tmp_path / "tree.json", file_hash)
+        assert not loaded.files
+        assert loaded.update().added == sorted(tree.files)
+        assert loaded.digest == tree.digest
+
+    def test_update(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test update only hashes changed files and recomputes their ancestors."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash)
+        assert tree.update() == MerkleTreeChanges(
+            ["a.txt", "x/b.txt", "x/y/c.txt", "z/d.txt"], [], [], ["", "x", "x/y", "z"]
+        )
+        initial = dict(tree.directories)
+
+        hash_file = mocker.spy(file_hash, "hash_file")
+        assert tree.update() == MerkleTreeChanges([], [], [], [])
+        hash_file.assert_not_called()
+
+        write_file(tree_dir / "x" / "y" / "c.txt", "changed")
+        changes = tree.update()
+        assert changes == MerkleTreeChanges([], ["x/y/c.txt"], [], ["", "x", "x/y"])
+        assert changes
+        hash_file.assert_called_once()
+        assert tree.directories["z"] == initial["z"]
+
+        write_file(tree_dir / "x" / "y" / "c.txt", "x/y/c.txt")
+        assert tree.update() == MerkleTreeChanges([], ["x/y/c.txt"], [], ["", "x", "x/y"])
+        assert tree.directories == initial
+
+        expected = MerkleTree(tree_dir, file_hash)
+        (tree_dir / "x" / "y" / "c.txt").unlink()
+        (tree_dir / "x" / "y").rmdir()
+        write_file(tree_dir / "z" / "e.txt", "e")
+        assert tree.update() == MerkleTreeChanges(["z/e.txt"], [], ["x/y/c.txt"], ["", "x", "x/y", "z"])
+        assert "x/y" not in tree.directories
+        expected.update()
+        assert tree.directories == expected.directories
+
+    def test_update_racy(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test update always hashes recently modified files again."""
+        (tree_dir / "a.txt").write_text("recent")
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash)
+        tree.update()
+        assert tree.files["a.txt"].mtime_ns == 0
+        assert tree.files["x/b.txt"].mtime_ns
+
+        hash_file = mocker.spy(file_hash, "hash_file")
+        assert not tree.update()  # content did not change
+        hash_file.assert_called_once_with(tree_dir / "a.txt", file_stat=mocker.ANY)
+
+    def test_update_touched(self, tree_dir: Path) -> None:
+        """Test update when only the modification time of a file changed."""
+        tree = MerkleTree(tree_dir, FileHash(hashlib.sha256()))
+        tree.update()
+        write_file(tree_dir / "a.txt", "a.txt")
+        os.utime(tree_dir / "a.txt", ns=(0, 0))
+        assert tree.update() == MerkleTreeChanges([], [], [], [])
+        assert tree.files["a.txt"].mtime_ns == 0
+
+    def test_update_paths(self, mocker: MockerFixture, tree_dir: Path) -> None:
+        """Test update_paths only checks the given files."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(tree_dir, file_hash, exclude=["z/"], include=["*.txt"])
+        tree.update()
+        hash_file = mocker.spy(file_hash, "hash_file")
+
+        write_file(tree_dir / "x" / "y" / "c.txt", "changed")
+        write_file(tree_dir / "new.txt", "new")
+        write_file(tree_dir / "a.txt", "changed")  # not checked
+        write_file(tree_dir / "z" / "e.txt", "excluded")
+        write_file(tree_dir / "new.log", "not included")
+        (tree_dir / "x" / "b.txt").unlink()
+        assert tree.update_paths(
+            ["x/y/c.txt", "new.txt", "x/b.txt", "z/e.txt", "new.log", "x", "missing/f.txt", "x/y/c.txt"]
+        ) == MerkleTreeChanges(["new.txt"], ["x/y/c.txt"], ["x/b.txt"], ["", "x", "x/y"])
+        assert hash_file.call_count == 2
+        assert tree.update() == MerkleTreeChanges([], ["a.txt"], [], [""])
+        expected = MerkleTree(tree_dir, file_hash, exclude=["z/"], include=["*.txt"])
+        expected.update()
+        assert tree.directories == expected.directories
@@ -0,0 +1,160 @@
+"""Test f_lib.utils._multi_file_hash."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._hash_calibration import HashAlgorithmSpeed
+from f_lib.utils._multi_file_hash import MultiFileHash, MultiHash
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._multi_file_hash"
+
+
+class TestMultiHash:
+    """Test MultiHash."""
+
+    def test___init___raise_duplicate(self) -> None:
+        """Test __init__ raises ValueError for duplicate algorithms."""
+        with pytest.raises(ValueError, match="unique names: md5, md5"):
+            MultiHash(hashlib.md5(), hashlib.md5())  # noqa: S324
+
+    def test___init___raise_empty(self) -> None:
+        """Test __init__ raises ValueError without algorithms."""
+        with pytest.raises(ValueError, match="at least one"):
+            MultiHash()
+
+    def test_attributes(self) -> None:
+        """Test attributes."""
+        obj = MultiHash(hashlib.md5(), hashlib.sha256())  # noqa: S324
+        assert obj.block_size == 64
+        assert obj.digest_size == 48
+        assert obj.name == "md5+sha256"
+        assert obj.names == ("md5", "sha256")
+        assert not MultiHash(hashlib.md5()).parallel  # noqa: S324
+
+    def test_copy(self) -> None:
+        """Test copy."""
+        obj = MultiHash(hashlib.md5(), hashlib.sha256())  # noqa: S324
+        obj.update(b"foo")
+        copy = obj.copy()
+        copy.update(b"bar")
+        assert obj.digests() == {"md5": hashlib.md5(b"foo").digest(), "sha256": hashlib.sha256(b"foo").digest()}  # noqa: S324
+        assert copy.digests() == {
+            "md5": hashlib.md5(b"foobar").digest(),  # noqa: S324
+            "sha256": hashlib.sha256(b"foobar").digest(),
+        }
+        assert copy._executor is obj._executor
+
+    def test__get_executor(self) -> None:
+        """Test _get_executor shares a thread pool between instances that were not provided one."""
+        executor = MultiHash(hashlib.md5())._get_executor()  # noqa: S324
+        assert MultiHash(hashlib.sha256())._get_executor() is executor
+        with ThreadPoolExecutor(max_workers=1) as provided:
+            assert MultiHash(hashlib.sha256(), executor=provided)._get_executor() is provided
+
+    def test_split_digest(self) -> None:
+        """Test split_digest."""
+        obj = MultiHash(hashlib.md5(), hashlib.sha256())  # noqa: S324
+        obj.update(b"foo")
+        assert obj.split_digest(obj.digest()) == obj.digests()
+        assert obj.hexdigest() == obj.digest().hex()
+        with pytest.raises(ValueError, match="expected a digest of 48 bytes but got 1"):
+            obj.split_digest(b"0")
+
+    @pytest.mark.parametrize("parallel", [False, True])
+    @pytest.mark.parametrize("size", [10, MultiHash.PARALLEL_THRESHOLD])
+    def test_update(self, mocker: MockerFixture, parallel: bool, size: int) -> None:
+        """Test update."""
+        data = os.urandom(size)
+        obj = MultiHash(hashlib.md5(), hashlib.sha256(), hashlib.sha512(), parallel=parallel)  # noqa: S324
+        get_executor = mocker.spy(obj, "_get_executor")
+        obj.update(data)
+        obj.update(memoryview(data))
+        assert obj.digests() == {
+            "md5": hashlib.md5(data + data).digest(),  # noqa: S324
+            "sha256": hashlib.sha256(data + data).digest(),
+            "sha512": hashlib.sha512(data + data).digest(),
+        }
+        if parallel and size >= MultiHash.PARALLEL_THRESHOLD:
+            assert get_executor.call_count == 2
+        else:
+            get_executor.assert_not_called()
+
+
+class TestMultiFileHash:
+    """Test MultiFileHash."""
+
+    @pytest.mark.parametrize("use_mmap", [False, True])
+    def test_add_file(self, tmp_path: Path, use_mmap: bool) -> None:
+        """Test add_file reads the file once."""
+        content = os.urandom(MultiHash.PARALLEL_THRESHOLD * 3 + 10)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+
+        obj = MultiFileHash(hashlib.md5(), hashlib.sha256(), chunk_size=MultiHash.PARALLEL_THRESHOLD)  # noqa: S324
+        obj.add_file(test_file, use_mmap=use_mmap)
+        assert obj.digests == {"md5": hashlib.md5(content).digest(), "sha256": hashlib.sha256(content).digest()}  # noqa: S324
+        assert obj.hexdigests == {name: digest.hex() for name, digest in obj.digests.items()}
+        assert obj.digest == obj.digests["md5"] + obj.digests["sha256"]
+        assert obj.algorithm == "md5+sha256-384"
+
+    @pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="requires posix_fadvise")
+    def test_add_file_fadvise(self, mocker: MockerFixture, tmp_path: Path) -> None:
+        """Test add_file with fadvise."""
+        content = os.urandom(10_000)
+        test_file = tmp_path / "test.bin"
+        test_file.write_bytes(content)
+        posix_fadvise = mocker.spy(os, "posix_fadvise")
+
+        obj = MultiFileHash(hashlib.md5(), hashlib.sha256(), fadvise=True, readahead=4096)  # noqa: S324
+        obj.add_file(test_file)
+        assert obj.digests == {"md5": hashlib.md5(content).digest(), "sha256": hashlib.sha256(content).digest()}  # noqa: S324
+        assert posix_fadvise.call_args_list[1].args[1:] == (0, 4096, os.POSIX_FADV_WILLNEED)
+
+    def test_add_files_parallel(self, tmp_path: Path) -> None:
+        """Test add_files_parallel."""
+        test_files = [tmp_path / f"{i}.txt" for i in range(5)]
+        for test_file in test_files:
+            test_file.write_text(test_file.name)
+
+        expected = hashlib.sha256()
+        expected.update(b"f-lib.FileHash.v1\0")
+        for test_file in test_files:
+            content = test_file.read_bytes()
+            expected.update(test_file.name.encode() + b"\0")
+            expected.update(hashlib.md5(content).digest() + hashlib.sha256(content).digest())  # noqa: S324
+
+        obj = MultiFileHash(hashlib.md5(), hashlib.sha256())  # noqa: S324
+        obj.add_files_parallel(test_files, relative_to=tmp_path)
+        assert obj.digests["sha256"] == expected.digest()
+
+    def test_fastest(self, mocker: MockerFixture) -> None:
+        """Test fastest creates an instance of the subclass."""
+        mocker.patch(
+            "f_lib.utils._file_hash.calibrate_hash_algorithms",
+            return_value=[HashAlgorithmSpeed("md5", 2.0, 0), HashAlgorithmSpeed("sha256", 1.0, 128)],
+        )
+        result = MultiFileHash.fastest(min_security=128, chunk_size=10)
+        assert isinstance(result, MultiFileHash)
+        assert result._multi_hash.name == "sha256"
+        assert result.chunk_size == 10
+
+    def test_hash_file_digests(self, tmp_path: Path) -> None:
+        """Test hash_file_digests."""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text("hello world!")
+        obj = MultiFileHash(hashlib.md5(), hashlib.sha256())  # noqa: S324
+        assert obj.hash_file_digests(test_file) == {
+            "md5": hashlib.md5(b"hello world!").digest(),  # noqa: S324
+            "sha256": hashlib.sha256(b"hello world!").digest(),
+        }
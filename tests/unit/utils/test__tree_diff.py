@@ -0,0 +1,118 @@
+"""Test f_lib.utils._tree_diff."""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._file_hash import FileHash
+from f_lib.utils._merkle_tree import MerkleTree
+from f_lib.utils._tree_diff import TreeDiff, diff_trees
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from pytest_mock import MockerFixture
+
+MODULE = "f_lib.utils._tree_diff"
+
+
+def write_file(path: Path, content: str, mtime_ns: int = 1_000_000_000_000_000_000) -> None:
+    """Write a file with a modification time that is not recent."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def old_dir(tmp_path: Path) -> Path:
+    """Create a directory tree."""
+    root = tmp_path / "old"
+    for name in ["a.txt", "b.txt", "x/c.txt", "x/d.txt", "x/e.txt", "ignored/f.txt"]:
+        write_file(root / name, name)
+    return root
+
+
+@pytest.fixture
+def new_dir(old_dir: Path, tmp_path: Path) -> Path:
+    """Create a modified copy of a directory tree."""
+    root = tmp_path / "new"
+    shutil.copytree(old_dir, root)
+    write_file(root / "b.txt", "size changed")
+    write_file(root / "x/c.txt", "x/C.txt", mtime_ns=2_000_000_000_000_000_000)  # same size
+    write_file(root / "x/d.txt", "x/d.txt", mtime_ns=2_000_000_000_000_000_000)  # touched
+    write_file(root / "ignored/f.txt", "changed")
+    write_file(root / "y/g.txt", "added")
+    (root / "a.txt").unlink()
+    return root
+
+
+EXPECTED = TreeDiff(["y/g.txt"], ["b.txt", "x/c.txt"], ["a.txt"])
+
+
+class TestDiffTrees:
+    """Test diff_trees."""
+
+    def test_directories(self, mocker: MockerFixture, new_dir: Path, old_dir: Path) -> None:
+        """Test comparing two directories."""
+        file_hash = FileHash(hashlib.sha256())
+        hash_file = mocker.spy(file_hash, "hash_file")
+        assert diff_trees(old_dir, new_dir, file_hash, exclude=["ignored/"]) == EXPECTED
+        assert sorted(call.args[0] for call in hash_file.call_args_list) == [
+            str(new_dir / "x/c.txt"),
+            str(new_dir / "x/d.txt"),
+            str(old_dir / "x/c.txt"),
+            str(old_dir / "x/d.txt"),
+        ]
+        assert diff_trees(old_dir, new_dir, file_hash, include=["x/"], max_workers=1) == TreeDiff([], ["x/c.txt"], [])
+
+    def test_directories_unchanged(self, mocker: MockerFixture, old_dir: Path, tmp_path: Path) -> None:
+        """Test comparing two directories that are the same."""
+        file_hash = FileHash(hashlib.sha256())
+        hash_file = mocker.spy(file_hash, "hash_file")
+        shutil.copytree(old_dir, tmp_path / "copy")
+        result = diff_trees(old_dir, tmp_path / "copy", file_hash)
+        assert not result
+        assert result == TreeDiff([], [], [])
+        hash_file.assert_not_called()
+
+    def test_snapshot(self, mocker: MockerFixture, new_dir: Path, old_dir: Path) -> None:
+        """Test comparing a snapshot with a directory."""
+        file_hash = FileHash(hashlib.sha256())
+        tree = MerkleTree(old_dir, file_hash, exclude=["ignored/"])
+        tree.update()
+        hash_file = mocker.spy(file_hash, "hash_file")
+        assert diff_trees(tree, new_dir, file_hash, exclude=["ignored/"]) == EXPECTED
+        assert sorted(call.args[0] for call in hash_file.call_args_list) == [
+            str(new_dir / "x/c.txt"),
+            str(new_dir / "x/d.txt"),
+        ]
+        assert diff_trees(new_dir, tree, file_hash, exclude=["ignored/"]) == TreeDiff(
+            EXPECTED.removed, EXPECTED.modified, EXPECTED.added
+        )
+
+    def test_snapshot_racy(self, old_dir: Path) -> None:
+        """Test comparing a snapshot of files that were hashed too soon after they were modified."""
+        file_hash = FileHash(hashlib.sha256())
+        write_file(old_dir / "a.txt", "a.txt", mtime_ns=0)
+        tree = MerkleTree(old_dir, file_hash)
+        tree.update()
+        assert not tree.files["a.txt"].mtime_ns
+        assert not diff_trees(tree, old_dir, file_hash)
+        write_file(old_dir / "a.txt", "A.txt", mtime_ns=0)
+        assert diff_trees(tree, old_dir, file_hash) == TreeDiff([], ["a.txt"], [])
+
+    def test_snapshots(self, mocker: MockerFixture, new_dir: Path, old_dir: Path) -> None:
+        """Test comparing two snapshots."""
+        file_hash = FileHash(hashlib.sha256())
+        old_tree = MerkleTree(old_dir, file_hash, exclude=["ignored/"])
+        old_tree.update()
+        new_tree = MerkleTree(new_dir, file_hash, exclude=["ignored/"])
+        new_tree.update()
+        hash_file = mocker.spy(file_hash, "hash_file")
+        assert diff_trees(old_tree, new_tree, file_hash) == EXPECTED
+        hash_file.assert_not_called()
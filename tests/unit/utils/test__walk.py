@@ -0,0 +1,176 @@
+"""Test f_lib.utils._walk."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import pytest
+
+from f_lib.utils._walk import PathPattern, PathPatternList, walk_files
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+MODULE = "f_lib.utils._walk"
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    """Create a directory tree."""
+    for name in [
+        "a.txt",
+        "a/b.txt",
+        "a/b/c.py",
+        "a.b/c.txt",
+        "config/app.yml",
+        "config/nested/db.yml",
+        "node_modules/pkg/index.js",
+        "src/main.py",
+        "src/__pycache__/main.cpython-311.pyc",
+    ]:
+        path = tmp_path / "root" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(name)
+    return tmp_path / "root"
+
+
+class TestPathPattern:
+    """Test PathPattern."""
+
+    @pytest.mark.parametrize(
+        ("pattern", "path", "is_dir", "expected"),
+        [
+            ("*.py", "main.py", False, True),
+            ("*.py", "src/main.py", False, True),
+            ("*.py", "src/main.pyc", False, False),
+            ("/*.py", "main.py", False, True),
+            ("/*.py", "src/main.py", False, False),
+            ("src/*.py", "src/main.py", False, True),
+            ("src/*.py", "src/nested/main.py", False, False),
+            ("src/*.py", "other/src/main.py", False, False),
+            ("src/**/*.py", "src/main.py", False, True),
+            ("src/**/*.py", "src/nested/deep/main.py", False, True),
+            ("**/main.py", "main.py", False, True),
+            ("**/main.py", "src/main.py", False, True),
+            ("config/**", "config/app.yml", False, True),
+            ("config/**", "config/nested/db.yml", False, True),
+            ("config/**", "other/config/app.yml", False, False),
+            ("build/", "build", True, True),
+            ("build/", "build", False, False),
+            ("build/", "src/build", True, True),
+            ("ma?n.py", "main.py", False, True),
+            ("ma?n.py", "ma/n.py", False, False),
+            ("[mn]ain.py", "main.py", False, True),
+            ("[!mn]ain.py", "main.py", False, False),
+            ("[!mn]ain.py", "rain.py", False, True),
+            ("[a-c].txt", "b.txt", False, True),
+            ("[.txt", "[.txt", False, True),
+            ("\\*.txt", "*.txt", False, True),
+            ("\\*.txt", "a.txt", False, False),
+            ("!*.py", "main.py", False, True),
+        ],
+    )
+    def test_matches(self, expected: bool, is_dir: bool, path: str, pattern: str) -> None:
+        """Test matches."""
+        assert PathPattern(pattern).matches(path, is_dir=is_dir) is expected
+
+    def test_negate(self) -> None:
+        """Test negate."""
+        assert PathPattern("!*.py").negate
+        assert not PathPattern("*.py").negate
+
+    def test___repr__(self) -> None:
+        """Test __repr__."""
+        assert repr(PathPattern("*.py")) == "PathPattern('*.py')"
+
+
+class TestPathPatternList:
+    """Test PathPatternList."""
+
+    def test___bool__(self) -> None:
+        """Test __bool__."""
+        assert PathPatternList(["*.py"])
+        assert not PathPatternList([])
+        assert not PathPatternList(["", "# comment"])
+
+    @pytest.mark.parametrize(
+        ("path", "expected"),
+        [
+            ("main.py", True),
+            ("keep.py", False),
+            ("src/keep.py", False),
+            ("readme.md", False),
+        ],
+    )
+    def test_matches(self, expected: bool, path: str) -> None:
+        """Test matches."""
+        assert PathPatternList(["*.py", "!keep.py"]).matches(path) is expected
+
+    def test_matches_last_pattern_wins(self) -> None:
+        """Test matches when a later pattern overrides a negation."""
+        assert PathPatternList(["*.py", "!keep.py", "src/keep.py"]).matches("src/keep.py")
+
+    @pytest.mark.parametrize(
+        ("path", "expected"),
+        [
+            ("config", True),
+            ("config/app.yml", True),
+            ("config/nested/db.yml", True),
+            ("src/app.yml", False),
+        ],
+    )
+    def test_matches_or_parent_matches(self, expected: bool, path: str) -> None:
+        """Test matches_or_parent_matches."""
+        assert PathPatternList(["/config/"]).matches_or_parent_matches(path, is_dir=path == "config") is expected
+
+
+def test_walk_files(tree: Path) -> None:
+    """Test walk_files."""
+    result = walk_files(tree)
+    assert [entry.path for entry in result] == [
+        "a.b/c.txt",
+        "a.txt",
+        "a/b.txt",
+        "a/b/c.py",
+        "config/app.yml",
+        "config/nested/db.yml",
+        "node_modules/pkg/index.js",
+        "src/__pycache__/main.cpython-311.pyc",
+        "src/main.py",
+    ]
+    for entry in result:
+        assert entry.entry.path == str(tree / entry.path)
+        assert entry.entry.stat().st_size == len(entry.path)
+
+
+def test_walk_files_exclude(tree: Path) -> None:
+    """Test walk_files with exclude."""
+    assert [entry.path for entry in walk_files(tree, exclude=["node_modules/", "__pycache__/", "*.txt"])] == [
+        "a/b/c.py",
+        "config/app.yml",
+        "config/nested/db.yml",
+        "src/main.py",
+    ]
+
+
+def test_walk_files_include(tree: Path) -> None:
+    """Test walk_files with include."""
+    assert [entry.path for entry in walk_files(tree, include=["config/", "*.py"], exclude=["nested/"])] == [
+        "a/b/c.py",
+        "config/app.yml",
+        "src/main.py",
+    ]
+
+
+@pytest.mark.skipif(os.name == "nt", reason="requires symlinks")
+@pytest.mark.parametrize("follow_symlinks", [False, True])
+def test_walk_files_symlinks(follow_symlinks: bool, tree: Path) -> None:
+    """Test walk_files with symbolic links."""
+    (tree / "link.txt").symlink_to(tree / "a.txt")
+    (tree / "link").symlink_to(tree / "config")
+    result = [entry.path for entry in walk_files(tree, follow_symlinks=follow_symlinks, include=["link*"])]
+    if follow_symlinks:
+        assert result == ["link.txt", "link/app.yml", "link/nested/db.yml"]
+    else:
+        assert result == ["link.txt"]